@@ -0,0 +1,39 @@
+"""
+Query Argument Helpers
+
+Parsing of the query-string flags and integers shared by the API blueprints,
+so every endpoint answers malformed arguments the same way.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from flask import request, abort
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def flag_arg(name: str) -> Optional[bool]:
+    """Tri-state query flag: None when absent or empty, else True for 1/true/yes/on, False otherwise."""
+    raw = (request.args.get(name) or "").strip()
+    if not raw:
+        return None
+    return raw.lower() in TRUE_VALUES
+
+
+def int_arg(name: str, default: int, lo: int = 0, hi: Optional[int] = None) -> int:
+    """
+    Integer query argument: default when absent or empty, 400 when it is not an
+    integer or below lo; values above hi are capped at hi.
+    """
+    raw = (request.args.get(name) or "").strip()
+    if not raw:
+        return default
+    try:
+        val = int(raw)
+    except ValueError:
+        abort(400, description=f"{name} must be an integer")
+    if val < lo:
+        abort(400, description=f"{name} must be >= {lo}")
+    return min(val, hi) if hi is not None else val
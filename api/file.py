@@ -1,7 +1,10 @@
 from __future__ import annotations
+import os
 from pathlib import Path
 from flask import Blueprint, request, send_file, abort
 
+from core.ingest import in_ingest_roots
+
 WORKSPACES_ROOT = Path("data/workspaces").resolve()
 
 bp_file = Blueprint("file", __name__)
@@ -9,10 +12,13 @@ bp_file = Blueprint("file", __name__)
 
 def _safe_under(base: Path, rel: str) -> Path:
     rel = rel.lstrip("/\\")
-    p = (base / rel).resolve()
     base = base.resolve()
+    p = (base / rel).resolve()
     if base not in p.parents and p != base:
-        abort(403, description="path traversal blocked")
+        # Images of server-side imports are symlinks into an ingest root (see core/ingest.py)
+        lexical = Path(os.path.normpath(base / rel))
+        if base not in lexical.parents or not in_ingest_roots(p):
+            abort(403, description="path traversal blocked")
     return p
 
 
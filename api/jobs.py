@@ -0,0 +1,86 @@
+"""
+Jobs API Blueprint
+
+Progress, results and cancellation of background jobs (see core/jobs.py):
+imports, commits, exports and deletes.
+"""
+
+from __future__ import annotations
+
+from flask import Blueprint, request, jsonify, abort, send_file
+
+from core.jobs import FINAL_STATES, get_job, list_jobs, cancel_job, job_output
+
+bp_jobs = Blueprint("jobs_api", __name__)
+
+JOB_LIST_MAX = 200
+
+
+@bp_jobs.get("/jobs")
+def jobs_list():
+    """
+    Recent jobs, newest first.
+
+    GET /api/jobs[?workspace_id=...][&status=queued|running|done|failed|cancelled][&kind=...][&limit=50]
+    Returns: {"jobs": [job, ...]}
+    """
+    try:
+        limit = max(1, min(JOB_LIST_MAX, int(request.args.get("limit", 50))))
+    except ValueError:
+        abort(400, "limit must be an integer")
+    jobs = list_jobs(
+        workspace_id=(request.args.get("workspace_id") or "").strip() or None,
+        status=(request.args.get("status") or "").strip() or None,
+        kind=(request.args.get("kind") or "").strip() or None,
+        limit=limit,
+    )
+    return jsonify({"jobs": jobs})
+
+
+@bp_jobs.get("/jobs/<job_id>")
+def job_status(job_id: str):
+    """
+    Poll a background job.
+
+    GET /api/jobs/<id>
+
+    Returns:
+        {
+            "id": str,
+            "kind": "import-zip" | "commit" | "export" | "delete",
+            "workspace_id": str | null,
+            "status": "queued" | "running" | "done" | "failed" | "cancelled",
+            "phase": str | null, "done": int, "total": int,
+            "message": str | null,      # error message of a failed job
+            "result": {...} | null,
+            ...
+        }
+    """
+    job = get_job(job_id)
+    if not job:
+        abort(404, f"Job not found: {job_id}")
+    return jsonify(job)
+
+
+@bp_jobs.delete("/jobs/<job_id>")
+def job_cancel(job_id: str):
+    """Cancel a queued or running job (a running job stops at its next progress step)."""
+    job = cancel_job(job_id)
+    if not job:
+        abort(404, f"Job not found: {job_id}")
+    return jsonify(job)
+
+
+@bp_jobs.get("/jobs/<job_id>/file")
+def job_file(job_id: str):
+    """Download the file a finished job produced (e.g. the ZIP of an export job)."""
+    job = get_job(job_id)
+    if not job:
+        abort(404, f"Job not found: {job_id}")
+    if job["status"] not in FINAL_STATES:
+        abort(409, "job has not finished yet")
+    path = job_output(job_id)
+    if path is None or job["status"] != "done":
+        abort(404, "job has no file")
+    name = (job.get("result") or {}).get("filename") or path.name
+    return send_file(str(path), as_attachment=True, download_name=name, conditional=True)
@@ -7,14 +7,44 @@ Provides endpoints for AI-powered transcription using local LLM (Ollama).
 from __future__ import annotations
 
 from pathlib import Path
-from flask import Blueprint, request, jsonify, abort
+from flask import Blueprint, Response, request, jsonify, abort, stream_with_context
+from werkzeug.exceptions import HTTPException
 from PIL import Image
 import base64
-import io
+import json
 import logging
-
-from core.ollama_client import OllamaClient
+import os
+
+from core.ollama_client import build_line_prompt, build_batch_prompt
+from core.ollama_pool import OllamaPool, parse_backends
+from core.llm_cache import cache_key, get_cached, put_cached, cache_stats
+from core.llm_jobs import (
+    RetryableJobError,
+    DeferJob,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_BATCH,
+    PRIORITY_BACKGROUND,
+    FINAL_STATES,
+    interactive_call,
+    interactive_busy,
+    register_handler,
+    enqueue,
+    get_job,
+    cancel_job,
+    ensure_workers,
+    configure_workers,
+)
+from core.llm_suggestions import (
+    claim_line,
+    set_job,
+    save_suggestion,
+    get_suggestions,
+    pending_outside,
+    delete_suggestions,
+)
 from core.page import parse_pcgts, collect_lines, page_coords
+from core.line_image import LineImageOptions, prepare_line_image
+from api.upload import _ws_paths, _load_state, _extract_from_mets_rich
 
 logger = logging.getLogger(__name__)
 
@@ -22,19 +52,31 @@ bp_llm = Blueprint("llm_api", __name__)
 
 WORKSPACES_ROOT = Path("data/workspaces").resolve()
 
-# Global Ollama client (lazy initialization)
-_ollama_client: OllamaClient | None = None
+LINE_IMAGE_OPTIONS = LineImageOptions.from_env()
+
+# Lines per Ollama request for /llm/transcribe-batch (and the most a client may ask for) and how they are packed
+BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "8"))
+BATCH_SIZE_MAX = int(os.getenv("LLM_BATCH_SIZE_MAX", "16"))
+BATCH_LAYOUT = os.getenv("LLM_BATCH_LAYOUT", "images")
+BATCH_LAYOUTS = ("images", "stacked")
+
+# Pages ahead of the current one that /llm/prefetch pre-transcribes
+PREFETCH_PAGES = int(os.getenv("LLM_PREFETCH_PAGES", "2"))
+
+# Global Ollama backend pool (lazy initialization)
+_ollama_client: OllamaPool | None = None
+
+# Let every backend work on two requests at once unless LLM_WORKERS says otherwise
+configure_workers(2 * len(parse_backends()))
 
 
-def get_ollama_client() -> OllamaClient:
-    """Get or create Ollama client singleton."""
+def get_ollama_client() -> OllamaPool:
+    """Get or create the Ollama backend pool singleton."""
     global _ollama_client
     if _ollama_client is None:
         # Read config from environment or use defaults
-        import os
-        base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
         model = os.getenv("OLLAMA_MODEL", "llama3.2-vision")
-        _ollama_client = OllamaClient(base_url=base_url, model=model)
+        _ollama_client = OllamaPool(parse_backends(), model=model)
     return _ollama_client
 
 
@@ -50,7 +92,11 @@ def llm_status():
             "available": bool,
             "models": [str],
             "base_url": str,
-            "current_model": str
+            "current_model": str,
+            "cache": {"entries": int, "bytes": int, "max_bytes": int},
+            "backends": [{"url": str, "healthy": bool, "outstanding": int, "requests": int,
+                          "completed": int, "failures": int, "avg_latency_ms": int,
+                          "throughput_per_min": int, ...}]
         }
     """
     client = get_ollama_client()
@@ -60,7 +106,9 @@ def llm_status():
         "available": available,
         "models": client.list_models() if available else [],
         "base_url": client.base_url,
-        "current_model": client.model
+        "current_model": client.model,
+        "cache": cache_stats(),
+        "backends": client.stats()
     })
 
 
@@ -76,42 +124,500 @@ def llm_transcribe():
             "path": str,              # PAGE-XML path
             "line_id": str,           # TextLine ID
             "existing_text": str,     # Optional: existing transcription to correct
-            "language": str           # Optional: language (default: "German")
+            "language": str,          # Optional: language (default: "German")
+            "force": bool             # Optional: bypass the result cache (also ?force=1)
         }
 
     Returns:
         {
             "ok": bool,
             "transcription": str,
-            "mode": "transcribe" | "correct"
+            "mode": "transcribe" | "correct",
+            "cached": bool
         }
     """
+    payload = request.get_json(silent=True) or {}
+    fields = _line_request_fields(payload)
+    fields["force"] = fields["force"] or _truthy(request.args.get("force"))
+
+    try:
+        with interactive_call():
+            result = _transcribe(**fields)
+    except _OllamaUnavailable as e:
+        abort(503, str(e))
+    except RetryableJobError as e:
+        abort(500, str(e))
+
+    return jsonify({"ok": True, **result})
+
+
+@bp_llm.post("/llm/transcribe/stream")
+def llm_transcribe_stream():
+    """
+    Transcribe or correct a text line, relaying tokens as Server-Sent Events.
+
+    POST /api/llm/transcribe/stream
+    JSON payload: same as /api/llm/transcribe
+
+    Event stream:
+        event: token   data: {"text": str}                                  # one per fragment
+        event: done    data: {"transcription": str, "mode": str, "cached": bool}
+        event: error   data: {"message": str}
+    """
+    payload = request.get_json(silent=True) or {}
+    fields = _line_request_fields(payload)
+    fields["force"] = fields["force"] or _truthy(request.args.get("force"))
+
+    # Resolve everything up front so request errors still map to HTTP status codes
     client = get_ollama_client()
+    line_image_base64 = _line_image_for(fields["ws_id"], fields["rel"], fields["line_id"])
+    existing_text, language = fields["existing_text"], fields["language"]
+    mode = "correct" if existing_text else "transcribe"
 
-    if not client.is_available():
+    template, _ = build_line_prompt(existing_text or None, language)
+    key = cache_key(base64.b64decode(line_image_base64), client.model, template, language, existing_text)
+    cached = None if fields["force"] else get_cached(key)
+
+    if cached is None and not client.is_available():
         abort(503, "LLM service (Ollama) is not available. Please start Ollama first.")
 
+    def events():
+        if cached is not None:
+            yield _sse("done", {"transcription": cached, "mode": mode, "cached": True})
+            return
+        parts = []
+        try:
+            with interactive_call():
+                for fragment in client.transcribe_line_stream(
+                        image_base64=line_image_base64,
+                        existing_text=existing_text if existing_text else None,
+                        language=language
+                ):
+                    parts.append(fragment)
+                    yield _sse("token", {"text": fragment})
+        except Exception as e:
+            logger.error(f"Ollama streaming failed: {e}")
+            yield _sse("error", {"message": "LLM transcription failed. Check Ollama logs."})
+            return
+        transcription = "".join(parts).strip()
+        if transcription:
+            put_cached(key, transcription, model=client.model, mode=mode)
+        yield _sse("done", {"transcription": transcription, "mode": mode, "cached": False})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bp_llm.post("/llm/transcribe-batch")
+def llm_transcribe_batch():
+    """
+    Queue transcription of several lines of one page: one job per batch_size lines,
+    each packed into a single LLM request. Returns immediately; poll /llm/jobs/<id>.
+
+    POST /api/llm/transcribe-batch
+    JSON payload:
+        {
+            "workspace_id": str,
+            "path": str,              # PAGE-XML path
+            "line_ids": [str],        # TextLine IDs in reading order
+            "language": str,          # Optional (default: "German")
+            "batch_size": int,        # Optional: lines per request (default: LLM_BATCH_SIZE, max LLM_BATCH_SIZE_MAX)
+            "layout": str,            # Optional: "images" | "stacked" (default: LLM_BATCH_LAYOUT)
+            "force": bool,            # Optional: bypass the result cache
+            "priority": int           # Optional: higher runs first (default: batch)
+        }
+
+    Returns (202):
+        {
+            "ok": true,
+            "job_id": str,                                 # first job
+            "jobs": [{"line_ids": [str], "job_id": str}]   # one per batch, in order
+        }
+
+    A finished job's result is
+        {
+            "results": [{"line_id": str, "transcription": str | null, "cached": bool}],
+            "requests": int,          # LLM requests made
+            "fallbacks": int          # batches that had to be retried line by line
+        }
+    """
+    payload = request.get_json(silent=True) or {}
+    fields = _line_request_fields(payload)
+    line_ids = [str(x).strip() for x in (payload.get("line_ids") or []) if str(x).strip()]
+    if not fields["ws_id"] or not fields["rel"] or not line_ids:
+        abort(400, "workspace_id, path, and line_ids are required")
+    layout = (payload.get("layout") or BATCH_LAYOUT).strip()
+    if layout not in BATCH_LAYOUTS:
+        abort(400, f"layout must be one of: {', '.join(BATCH_LAYOUTS)}")
+    try:
+        batch_size = min(BATCH_SIZE_MAX, max(1, int(payload.get("batch_size") or BATCH_SIZE)))
+        priority = int(payload.get("priority", PRIORITY_BATCH))
+    except (TypeError, ValueError):
+        abort(400, "batch_size and priority must be integers")
+
+    jobs = []
+    for start in range(0, len(line_ids), batch_size):
+        chunk = line_ids[start:start + batch_size]
+        job_id = enqueue("transcribe_batch", {
+            "ws_id": fields["ws_id"],
+            "rel": fields["rel"],
+            "line_ids": chunk,
+            "language": fields["language"],
+            "force": fields["force"] or _truthy(request.args.get("force")),
+            "layout": layout,
+            "batch_size": batch_size,
+        }, priority=priority)
+        jobs.append({"line_ids": chunk, "job_id": job_id})
+
+    return jsonify({"ok": True, "job_id": jobs[0]["job_id"], "jobs": jobs}), 202
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@bp_llm.post("/llm/jobs")
+def llm_enqueue():
+    """
+    Queue transcription/correction of one or more lines and return immediately.
+
+    POST /api/llm/jobs
+    JSON payload: same as /api/llm/transcribe, plus optionally
+        {
+            "line_ids": [str],        # queue one job per line (batch page transcription)
+            "priority": int           # higher runs first (default: interactive)
+        }
+
+    Returns (202):
+        {
+            "ok": true,
+            "job_id": str,                             # first job
+            "jobs": [{"line_id": str, "job_id": str}]
+        }
+    """
     payload = request.get_json(silent=True) or {}
-    ws_id = (payload.get("workspace_id") or "").strip()
-    rel = (payload.get("path") or "").strip()
-    line_id = (payload.get("line_id") or "").strip()
-    existing_text = (payload.get("existing_text") or "").strip()
-    language = (payload.get("language") or "German").strip()
+    line_ids = [str(x).strip() for x in (payload.get("line_ids") or []) if str(x).strip()]
+    if not line_ids:
+        line_ids = [(payload.get("line_id") or "").strip()]
+    try:
+        priority = int(payload.get("priority", PRIORITY_INTERACTIVE if len(line_ids) == 1 else PRIORITY_BATCH))
+    except (TypeError, ValueError):
+        abort(400, "priority must be an integer")
+
+    jobs = []
+    for line_id in line_ids:
+        fields = _line_request_fields({**payload, "line_id": line_id})
+        if not fields["ws_id"] or not fields["rel"] or not fields["line_id"]:
+            abort(400, "workspace_id, path, and line_id (or line_ids) are required")
+        # Existing text only makes sense for a single line
+        if len(line_ids) > 1:
+            fields["existing_text"] = ""
+        jobs.append({"line_id": line_id, "job_id": enqueue("transcribe", fields, priority=priority)})
+
+    return jsonify({"ok": True, "job_id": jobs[0]["job_id"], "jobs": jobs}), 202
+
+
+@bp_llm.get("/llm/jobs/<job_id>")
+def llm_job_status(job_id: str):
+    """
+    Poll a queued LLM job.
+
+    GET /api/llm/jobs/<id>
 
+    Returns:
+        {
+            "id": str,
+            "status": "queued" | "running" | "done" | "failed" | "cancelled",
+            "attempts": int,
+            "result": {"transcription": str, "mode": str, "cached": bool} | null,
+            "error": str | null,
+            ...
+        }
+    """
+    ensure_workers()
+    job = get_job(job_id)
+    if not job:
+        abort(404, f"Job not found: {job_id}")
+    return jsonify(job)
+
+
+@bp_llm.delete("/llm/jobs/<job_id>")
+def llm_job_cancel(job_id: str):
+    """Cancel a queued or running LLM job."""
+    job = cancel_job(job_id)
+    if not job:
+        abort(404, f"Job not found: {job_id}")
+    return jsonify(job)
+
+
+@bp_llm.post("/llm/prefetch")
+def llm_prefetch():
+    """
+    Pre-transcribe the untranscribed lines of the pages after the current one in the
+    background. Results are stored as suggestions (see /llm/suggestions), never in the
+    PAGE-XML. Background jobs yield to interactive requests.
+
+    POST /api/llm/prefetch
+    JSON payload:
+        {
+            "workspace_id": str,
+            "path": str,              # page the user is working on
+            "pages": int,             # Optional: pages ahead (default: LLM_PREFETCH_PAGES)
+            "language": str           # Optional (default: "German")
+        }
+
+    Returns (202):
+        {"ok": true, "pages": [str], "queued": int, "dropped": int}
+    """
+    payload = request.get_json(silent=True) or {}
+    fields = _line_request_fields(payload)
+    ws_id, rel, language = fields["ws_id"], fields["rel"], fields["language"]
+    if not ws_id or not rel:
+        abort(400, "workspace_id and path are required")
+    try:
+        ahead = max(0, int(payload.get("pages", PREFETCH_PAGES)))
+    except (TypeError, ValueError):
+        abort(400, "pages must be an integer")
+
+    order = _page_order(ws_id)
+    idx = order.index(rel) if rel in order else -1
+    window = order[idx + 1: idx + 1 + ahead]
+
+    # The user moved on: drop queued work for pages that are no longer ahead
+    dropped = 0
+    for row in pending_outside(ws_id, keep_paths=[rel, *window]):
+        if row.get("job_id"):
+            cancel_job(row["job_id"])
+        delete_suggestions(ws_id, row["path"], row["line_id"], pending_only=True)
+        dropped += 1
+
+    queued = 0
+    base = (WORKSPACES_ROOT / ws_id).resolve()
+    for page in window:
+        page_xml = _resolve_page_xml(base, page)
+        if not page_xml:
+            continue
+        try:
+            pcgts = parse_pcgts(str(page_xml))
+            lines = collect_lines(pcgts, page_coords(pcgts), page_xml)
+        except Exception as e:
+            logger.warning(f"Prefetch skipped {page}: {e}")
+            continue
+        existing = get_suggestions(ws_id, page)
+        for ln in lines:
+            line_id = ln.get("id")
+            if not line_id or (ln.get("text") or "").strip():
+                continue
+            prior = existing.get(line_id)
+            if prior and prior["status"] == "pending":
+                job = get_job(prior["job_id"]) if prior.get("job_id") else None
+                if job is None or job["status"] in FINAL_STATES:
+                    # Failed, cancelled or lost earlier: try again
+                    delete_suggestions(ws_id, page, line_id, pending_only=True)
+            if not claim_line(ws_id, page, line_id):
+                continue
+            job_id = enqueue("suggest", {"ws_id": ws_id, "rel": page, "line_id": line_id, "language": language},
+                             priority=PRIORITY_BACKGROUND)
+            set_job(ws_id, page, line_id, job_id)
+            queued += 1
+
+    return jsonify({"ok": True, "pages": window, "queued": queued, "dropped": dropped}), 202
+
+
+@bp_llm.get("/llm/suggestions")
+def llm_suggestions():
+    """
+    Background transcriptions for the lines of one page.
+
+    GET /api/llm/suggestions?workspace_id=...&path=...
+
+    Returns:
+        {"suggestions": {line_id: str}, "pending": int}
+    """
+    ws_id = (request.args.get("workspace_id") or "").strip()
+    rel = (request.args.get("path") or "").strip()
+    if not ws_id or not rel:
+        abort(400, "workspace_id and path are required")
+    rows = get_suggestions(ws_id, rel)
+    return jsonify({
+        "suggestions": {lid: r["text"] for lid, r in rows.items() if r["status"] == "done" and r["text"]},
+        "pending": sum(1 for r in rows.values() if r["status"] == "pending"),
+    })
+
+
+class _OllamaUnavailable(RetryableJobError):
+    """Ollama could not be reached at all."""
+
+
+def _line_request_fields(payload: dict) -> dict:
+    """Normalize the JSON fields shared by the synchronous and queued endpoints."""
+    return {
+        "ws_id": (payload.get("workspace_id") or "").strip(),
+        "rel": (payload.get("path") or "").strip(),
+        "line_id": (payload.get("line_id") or "").strip(),
+        "existing_text": (payload.get("existing_text") or "").strip(),
+        "language": (payload.get("language") or "German").strip(),
+        "force": _truthy(payload.get("force")),
+    }
+
+
+def _transcribe(ws_id: str, rel: str, line_id: str, existing_text: str = "",
+                language: str = "German", force: bool = False) -> dict:
+    """
+    Resolve a TextLine, crop its image and ask the LLM (or the result cache) for its text.
+    Request errors abort() with an HTTP status; Ollama failures raise RetryableJobError.
+    """
+    client = get_ollama_client()
+    line_image_base64 = _line_image_for(ws_id, rel, line_id)
+
+    mode = "correct" if existing_text else "transcribe"
+
+    # Identical crop + prompt + model -> reuse the previous answer
+    template, _ = build_line_prompt(existing_text or None, language)
+    key = cache_key(base64.b64decode(line_image_base64), client.model, template, language, existing_text)
+    if not force:
+        cached = get_cached(key)
+        if cached is not None:
+            return {"transcription": cached, "mode": mode, "cached": True}
+
+    if not client.is_available():
+        raise _OllamaUnavailable("LLM service (Ollama) is not available. Please start Ollama first.")
+
+    # Call Ollama to transcribe/correct
+    transcription = client.transcribe_line(
+        image_base64=line_image_base64,
+        existing_text=existing_text if existing_text else None,
+        language=language
+    )
+
+    if transcription is None:
+        raise RetryableJobError("LLM transcription failed. Check Ollama logs.")
+
+    if transcription:
+        put_cached(key, transcription, model=client.model, mode=mode)
+
+    return {"transcription": transcription, "mode": mode, "cached": False}
+
+
+register_handler("transcribe", lambda payload: _transcribe(**payload))
+
+
+def _suggest(ws_id: str, rel: str, line_id: str, language: str = "German") -> dict:
+    """Background job: transcribe one line and keep the result as a suggestion."""
+    if interactive_busy():
+        raise DeferJob(2.0)
+    try:
+        result = _transcribe(ws_id, rel, line_id, language=language)
+    except HTTPException:
+        # Line or page vanished since it was queued
+        delete_suggestions(ws_id, rel, line_id, pending_only=True)
+        raise
+    if result.get("transcription"):
+        save_suggestion(ws_id, rel, line_id, result["transcription"], model=get_ollama_client().model)
+    else:
+        delete_suggestions(ws_id, rel, line_id, pending_only=True)
+    return result
+
+
+register_handler("suggest", lambda payload: _suggest(**payload))
+
+
+def _page_order(ws_id: str) -> list[str]:
+    """PAGE-XML names of a workspace in METS structMap order (if a METS exists), else state order."""
+    if not (WORKSPACES_ROOT / ws_id).is_dir():
+        abort(404, f"Workspace not found: {ws_id}")
+    paths = _ws_paths(ws_id)
+    state = _load_state(paths)
+    pages = list(state.get("pages", []))
+    if state.get("mets"):
+        try:
+            info = _extract_from_mets_rich(paths["base"] / state["mets"])
+            mets_order = [Path(f["href"]).name for f in info["pagexml_files"] if f.get("href")]
+            known = set(pages)
+            ordered = [name for name in mets_order if name in known]
+            pages = ordered + [name for name in pages if name not in set(ordered)]
+        except Exception as e:
+            logger.warning(f"Could not read page order from METS: {e}")
+    return pages
+
+
+def _transcribe_batch(ws_id: str, rel: str, line_ids: list[str], language: str = "German",
+                      force: bool = False, layout: str = "images", batch_size: int = 8) -> dict:
+    """
+    Transcribe many lines of one page, batch_size lines per LLM request.
+
+    Cached lines (from single-line or batch calls) are skipped. Batch answers are
+    cached under the batch prompt, lines retried one by one under the single-line prompt.
+    Raises RetryableJobError if Ollama answered none of the uncached lines.
+    """
+    client = get_ollama_client()
+    images = _line_images_for(ws_id, rel, line_ids)
+
+    single_template, _ = build_line_prompt(None, language)
+    batch_template, _ = build_batch_prompt(batch_size, language, layout)
+    results: dict[str, dict] = {}
+    todo = []
+    for line_id in line_ids:
+        image_bytes = base64.b64decode(images[line_id])
+        keys = (cache_key(image_bytes, client.model, single_template, language),
+                cache_key(image_bytes, client.model, batch_template, language))
+        cached = None if force else (get_cached(keys[0]) or get_cached(keys[1]))
+        if cached is not None:
+            results[line_id] = {"line_id": line_id, "transcription": cached, "cached": True}
+        else:
+            todo.append((line_id, keys))
+
+    requests_made = fallbacks = 0
+    if todo and not client.is_available():
+        raise _OllamaUnavailable("LLM service (Ollama) is not available. Please start Ollama first.")
+
+    for start in range(0, len(todo), batch_size):
+        chunk = todo[start:start + batch_size]
+        texts, batched = client.transcribe_lines([images[line_id] for line_id, _ in chunk],
+                                                 language=language, layout=layout)
+        if batched:
+            requests_made += 1
+        else:
+            requests_made += 1 + len(chunk)
+            fallbacks += 1
+        for (line_id, keys), text in zip(chunk, texts):
+            if text:
+                mode = "batch" if batched and len(chunk) > 1 else "transcribe"
+                put_cached(keys[1] if mode == "batch" else keys[0], text, model=client.model, mode=mode)
+            results[line_id] = {"line_id": line_id, "transcription": text, "cached": False}
+
+    if todo and all(results[line_id]["transcription"] is None for line_id, _ in todo):
+        raise RetryableJobError("LLM transcription failed. Check Ollama logs.")
+
+    return {
+        "results": [results[line_id] for line_id in line_ids],
+        "requests": requests_made,
+        "fallbacks": fallbacks,
+    }
+
+
+register_handler("transcribe_batch", lambda payload: _transcribe_batch(**payload))
+
+
+def _line_image_for(ws_id: str, rel: str, line_id: str) -> str:
+    """Locate a TextLine in a workspace PAGE-XML and return its cropped image (base64)."""
     if not ws_id or not rel or not line_id:
         abort(400, "workspace_id, path, and line_id are required")
+    return _line_images_for(ws_id, rel, [line_id])[line_id]
+
+
+def _line_images_for(ws_id: str, rel: str, line_ids: list[str]) -> dict[str, str]:
+    """Crop several TextLines of one PAGE-XML, parsing the page and opening its image once."""
 
     # Resolve workspace and PAGE-XML
     base = (WORKSPACES_ROOT / ws_id).resolve()
     if not base.is_dir():
         abort(404, f"Workspace not found: {base}")
 
-    candidates = [
-        (base / "normalized" / rel).resolve(),
-        (base / "pages" / rel).resolve(),
-        (base / rel).resolve(),
-    ]
-    page_xml = next((p for p in candidates if p.is_file()), None)
+    page_xml = _resolve_page_xml(base, rel)
     if not page_xml:
         abort(404, f"PAGE-XML not found: {rel}")
 
@@ -120,50 +626,51 @@ def llm_transcribe():
     coords = page_coords(pcgts)
     lines = collect_lines(pcgts, coords, page_xml)
 
-    target_line = next((ln for ln in lines if ln.get("id") == line_id), None)
-    if not target_line:
-        abort(404, f"Line not found: {line_id}")
+    by_id = {ln.get("id"): ln for ln in lines}
+    missing = [line_id for line_id in line_ids if line_id not in by_id]
+    if missing:
+        abort(404, f"Line not found: {missing[0]}")
 
-    # Get image for the line
-    # We need to resolve the image path and crop the line region
+    # Get images for the lines
+    # We need to resolve the image path and crop the line regions
     try:
-        image_path, line_image_base64 = _extract_line_image(
-            base, page_xml, pcgts, target_line
+        image_path, encoded = _extract_line_images(
+            base, page_xml, pcgts, [by_id[line_id] for line_id in line_ids]
         )
     except Exception as e:
         logger.error(f"Failed to extract line image: {e}")
         abort(500, f"Failed to extract line image: {str(e)}")
+    return dict(zip(line_ids, encoded))
 
-    # Call Ollama to transcribe/correct
-    mode = "correct" if existing_text else "transcribe"
-    transcription = client.transcribe_line(
-        image_base64=line_image_base64,
-        existing_text=existing_text if existing_text else None,
-        language=language
-    )
 
-    if transcription is None:
-        abort(500, "LLM transcription failed. Check Ollama logs.")
+def _resolve_page_xml(base: Path, rel: str) -> Path | None:
+    candidates = [
+        (base / "normalized" / rel).resolve(),
+        (base / "pages" / rel).resolve(),
+        (base / rel).resolve(),
+    ]
+    return next((p for p in candidates if p.is_file()), None)
 
-    return jsonify({
-        "ok": True,
-        "transcription": transcription,
-        "mode": mode
-    })
+
+def _truthy(val) -> bool:
+    if isinstance(val, bool):
+        return val
+    return str(val or "").strip().lower() in ("1", "true", "yes", "on")
 
 
-def _extract_line_image(workspace_base: Path, page_xml_path: Path, pcgts, line_data: dict) -> tuple[str, str]:
+def _extract_line_images(workspace_base: Path, page_xml_path: Path, pcgts,
+                         lines: list[dict]) -> tuple[str, list[str]]:
     """
-    Extract and crop the line region from the page image.
+    Extract line regions from the page image and preprocess them for the model.
 
     Args:
         workspace_base: Workspace root directory
         page_xml_path: Path to PAGE-XML file
         pcgts: Parsed PAGE-XML object
-        line_data: Line dictionary with 'points' or 'baseline'
+        lines: Line dictionaries with 'points' or 'baseline'
 
     Returns:
-        Tuple of (image_path, base64_encoded_cropped_image)
+        Tuple of (image_path, [base64_encoded_cropped_image, ...])
     """
     from core.resolve import resolve_image_for_page
 
@@ -175,41 +682,17 @@ def _extract_line_image(workspace_base: Path, page_xml_path: Path, pcgts, line_d
         uploaded_images=ws_images
     )
 
-    # Open image
-    img = Image.open(img_path)
-
-    # Get line bounding box
-    points = line_data.get("points", [])
-    if not points:
-        # Fallback: use baseline if no polygon
-        points = line_data.get("baseline", [])
-
-    if not points or len(points) < 2:
-        raise ValueError("Line has no valid coordinates")
-
-    # Calculate bounding box
-    xs = [p[0] for p in points]
-    ys = [p[1] for p in points]
-    min_x, max_x = min(xs), max(xs)
-    min_y, max_y = min(ys), max(ys)
-
-    # Add padding (10% on each side)
-    padding_x = (max_x - min_x) * 0.1
-    padding_y = (max_y - min_y) * 0.2  # More vertical padding
-
-    crop_box = (
-        max(0, int(min_x - padding_x)),
-        max(0, int(min_y - padding_y)),
-        min(img.width, int(max_x + padding_x)),
-        min(img.height, int(max_y + padding_y))
-    )
-
-    # Crop the line
-    cropped = img.crop(crop_box)
-
-    # Convert to base64
-    buffer = io.BytesIO()
-    cropped.save(buffer, format="PNG")
-    img_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-
-    return str(img_path), img_base64
+    # Crop, deskew, shrink and encode each line (see core.line_image for the knobs)
+    encoded = []
+    with Image.open(img_path) as img:
+        img.load()
+        for line_data in lines:
+            raw = prepare_line_image(
+                img,
+                line_data.get("points", []),
+                line_data.get("baseline", []),
+                LINE_IMAGE_OPTIONS
+            )
+            encoded.append(base64.b64encode(raw).decode("utf-8"))
+
+    return str(img_path), encoded
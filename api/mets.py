@@ -2,7 +2,8 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Dict
 from flask import Blueprint, request, jsonify, abort
-from ocrd_models import OcrdMets
+from core.mets import load_mets_index
+from api.args import flag_arg, int_arg
 
 bp_mets = Blueprint("api_mets", __name__)
 
@@ -20,8 +21,10 @@ def _safe_ws_path(ws_id: str, rel: str) -> Path:
 @bp_mets.get("/mets")
 def get_mets():
     """
-    GET /api/mets?workspace_id=<id>&path=<rel/to/workspace>
-    Returns fileGrps and per-page image/pagexml mapping
+    GET /api/mets?workspace_id=<id>&path=<rel/to/workspace>[&offset=0&limit=N][&has_image=0|1][&has_page=0|1]
+    Returns fileGrps and per-page image/pagexml mapping.
+    Without limit all pages are returned; "total" counts the pages matching the filters
+    and "next_offset" is null on the last slice.
     """
     ws_id = (request.args.get("workspace_id") or "").strip()
     rel = (request.args.get("path") or "").strip()
@@ -33,11 +36,11 @@ def get_mets():
         abort(404, f"METS not found: {mets_path}")
 
     try:
-        mets = OcrdMets(filename=str(mets_path))
+        index = load_mets_index(mets_path)
     except Exception as e:
         abort(400, f"failed to parse METS: {e}")
 
-    file_grps = sorted({f.fileGrp for f in mets.find_files()})
+    file_grps = sorted(use for use, files in index.file_grps.items() if files)
 
     def _is_img_grp(g: str) -> bool:
         return g.startswith("OCR-D-IMG")
@@ -45,11 +48,10 @@ def get_mets():
     images_by_page: Dict[str, Dict] = {}
     pagexml_by_page: Dict[str, Dict] = {}
 
-    for f in mets.find_files():
-        href = f.url  # href relative to mets base
-        fileGrp = f.fileGrp
-        mimetype = f.mimetype or ""
-        page_id = f.pageId or ""
+    for fileGrp, f in index.iter_files():
+        href = f["href"]  # href relative to mets base
+        mimetype = f["mimetype"]
+        page_id = index.page_of_file.get(f["id"], "")
 
         if mimetype.startswith("image/") and page_id:
             rec = {"fileGrp": fileGrp, "href": href, "mimetype": mimetype}
@@ -60,15 +62,28 @@ def get_mets():
             pagexml_by_page[page_id] = {"fileGrp": fileGrp, "href": href, "mimetype": mimetype}
 
     page_ids = sorted(set(images_by_page) | set(pagexml_by_page))
+    for key, by_page in (("has_image", images_by_page), ("has_page", pagexml_by_page)):
+        want = flag_arg(key)
+        if want is not None:
+            page_ids = [pid for pid in page_ids if (pid in by_page) == want]
+
+    total = len(page_ids)
+    offset = int_arg("offset", 0)
+    limit = int_arg("limit", total)
+    page_ids = page_ids[offset:offset + limit]
     pages = [{
         "page_id": pid,
         "image": images_by_page.get(pid),
         "pagexml": pagexml_by_page.get(pid),
     } for pid in page_ids]
 
+    next_offset = offset + len(pages)
     return jsonify({
         "mets_path": str(mets_path),
         "base_dir": str(mets_path.parent),
         "file_grps": file_grps,
         "pages": pages,
+        "total": total,
+        "offset": offset,
+        "next_offset": next_offset if next_offset < total else None,
     })
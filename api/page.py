@@ -14,7 +14,8 @@ from core.page import (
     PAGE_NS_FALLBACK,
 )
 from ocrd_models.ocrd_page import TextEquivType, TextRegionType, TableRegionType, TextLineType, CoordsType, BaselineType, RolesType, TableCellRoleType
-from core.db import record_workspace
+from core.db import touch_workspace
+from core.search import remove_lines, update_line_texts, upsert_line
 
 
 WORKSPACES_ROOT = Path("data/workspaces").resolve()
@@ -486,7 +487,8 @@ def save_transcription():
     xml_out = _serialize_pcgts(pcgts)
     page_xml.write_text(xml_out, encoding="utf-8")
 
-    record_workspace(ws_id)
+    touch_workspace(ws_id)
+    update_line_texts(ws_id, page_xml.name, updates, page_xml)
 
     return jsonify({"ok": True, "updated": touched, "path": str(page_xml)})
 
@@ -534,6 +536,16 @@ def _iter_all_regions(page_obj):
         yield r
 
 
+def _existing_line_ids(page_obj) -> set:
+    ids = set()
+    for r in _iter_all_regions(page_obj):
+        for ln in getattr(r, "get_TextLine", lambda: [])() or getattr(r, "TextLine", []) or []:
+            lid = getattr(ln, "id", "") or ""
+            if lid:
+                ids.add(lid)
+    return ids
+
+
 def _existing_region_ids(page_obj) -> set:
     ids = set()
     for r in _iter_all_regions(page_obj):
@@ -656,7 +668,7 @@ def add_or_update_region():
 
     xml_out = _serialize_pcgts(pcgts)
     page_xml.write_text(xml_out, encoding="utf-8")
-    record_workspace(ws_id)
+    touch_workspace(ws_id)
 
     response_region = {"id": r_id, "type": r_type, "points": r_points}
     if r_row_index is not None:
@@ -752,7 +764,8 @@ def add_or_update_line():
 
     xml_out = _serialize_pcgts(pcgts)
     page_xml.write_text(xml_out, encoding="utf-8")
-    record_workspace(ws_id)
+    touch_workspace(ws_id)
+    upsert_line(ws_id, page_xml.name, l_id, region_id, l_text, l_points, page_xml)
 
     return jsonify({"ok": True, "line": {"id": l_id, "region_id": region_id, "points": l_points, "baseline": l_baseline, "text": l_text}})
 
@@ -784,6 +797,7 @@ def delete_region():
     reg = _find_region(page_obj, rid)
     if not reg:
         abort(404, f"Region not found: {rid}")
+    lines_before = _existing_line_ids(page_obj)
 
     removed = False
     try:
@@ -804,7 +818,8 @@ def delete_region():
 
     xml_out = _serialize_pcgts(pcgts)
     page_xml.write_text(xml_out, encoding="utf-8")
-    record_workspace(ws_id)
+    touch_workspace(ws_id)
+    remove_lines(ws_id, page_xml.name, lines_before - _existing_line_ids(page_obj), page_xml)
     return jsonify({"ok": True, "region_id": rid})
 
 
@@ -855,5 +870,6 @@ def delete_line():
 
     xml_out = _serialize_pcgts(pcgts)
     page_xml.write_text(xml_out, encoding="utf-8")
-    record_workspace(ws_id)
+    touch_workspace(ws_id)
+    remove_lines(ws_id, page_xml.name, [lid], page_xml)
     return jsonify({"ok": True, "line_id": lid})
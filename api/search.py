@@ -0,0 +1,55 @@
+"""
+Search API Blueprint
+
+Full-text search over the transcribed lines of all workspaces (see core/search.py).
+"""
+
+from __future__ import annotations
+
+from flask import Blueprint, request, jsonify, abort
+
+from core.search import search_lines
+from api.args import int_arg
+
+bp_search = Blueprint("search_api", __name__)
+
+SEARCH_LIMIT_DEFAULT = 50
+SEARCH_LIMIT_MAX = 200
+
+
+@bp_search.get("/search")
+def search():
+    """
+    Lines whose text matches q, best matches first.
+
+    GET /api/search?q=<words>[&workspace_id=...][&offset=0][&limit=50 (max 200)]
+      Every word must occur in the line (word prefixes match); "quoted words" match as a phrase.
+
+    Returns:
+        {
+            "query": str, "total": int, "offset": int, "limit": int,
+            "next_offset": int | null,   # null on the last page
+            "hits": [{
+                "workspace_id": str, "workspace_label": str, "page": str,   # page: PAGE-XML name
+                "line_id": str, "region_id": str | null, "text": str,
+                "points": [[x, y], ...], "bbox": [x0, y0, x1, y1] | null,
+                "score": float             # higher is better
+            }, ...]
+        }
+    """
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        abort(400, description="q is required")
+    offset = int_arg("offset", 0)
+    limit = int_arg("limit", SEARCH_LIMIT_DEFAULT, 1, SEARCH_LIMIT_MAX)
+    result = search_lines(q, workspace_id=(request.args.get("workspace_id") or "").strip() or None,
+                          limit=limit, offset=offset)
+    next_offset = offset + len(result["hits"])
+    return jsonify({
+        "query": q,
+        "total": result["total"],
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset if next_offset < result["total"] else None,
+        "hits": result["hits"],
+    })
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from flask import Blueprint, request, jsonify, abort
+from flask import Blueprint, request, jsonify, abort, make_response
 from pathlib import Path
 from lxml import etree
 from typing import Dict, List, Optional
@@ -7,11 +7,29 @@ import uuid
 import random
 import json
 import re
-
+import os
+import base64
+import hashlib
+import shutil
+import threading
+import zipfile
+
+from werkzeug.exceptions import ClientDisconnected
 from werkzeug.utils import secure_filename
-from ocrd_models.ocrd_page_generateds import parse as parse_pagexml
 from ocrd_models.ocrd_page import PcGtsType
-from core.db import record_workspace, get_workspace
+from core.db import record_workspace, get_workspace, pages_with_unknown_image
+from core.db import missing_images as db_missing_images, missing_pagexml as db_missing_pagexml
+from core.mets import load_mets_index
+from core.normalize import normalize_pages
+from core.page import page_image_filename
+from core.state import read_state, write_state, edit_state, state_lock
+from core.blobstore import get_blob, link_blob, store_file, store_stream
+from core.ingest import LINK_MODES, copy_file, link_file, resolve_ingest_dir, resolve_member
+from core.imports import extract_archive
+from core.jobs import Job, get_job, process_pool, submit
+from core.search import sync_workspace
+from core.uploads import create_upload, get_upload, advance_offset, delete_upload, stale_uploads
+from api.args import flag_arg
 
 bp_import = Blueprint("import", __name__)
 
@@ -29,7 +47,7 @@ OCRD_PREFIX = re.compile(r'^(OCR-D-[A-Z0-9-]+[_-])', re.IGNORECASE)
 
 
 def _ws_paths(ws_id: Optional[str] = None) -> Dict[str, Path]:
-    """Return a dict of standard paths for a workspace (creating dirs if needed)."""
+    """Return a dict of standard paths for a workspace. Nothing is created (see _ensure_dirs)."""
     if not ws_id:
         ws_id = str(uuid.uuid4())
     base = ROOT / ws_id
@@ -40,13 +58,18 @@ def _ws_paths(ws_id: Optional[str] = None) -> Dict[str, Path]:
         "pages": base / "pages",
         "images": base / "images",
         "norm": base / "normalized",
-        "state": base / "state.json",
+        "state": base / "state.json",  # legacy; migrated into the DB on first access
+        "uploads": base / "uploads",  # resumable upload parts, created on demand
     }
-    for k in ("orig", "pages", "images", "norm"):
-        paths[k].mkdir(parents=True, exist_ok=True)
     return paths
 
 
+def _ensure_dirs(p: Dict[str, Path], *keys: str) -> None:
+    """Create the workspace folders a writer is about to fill (e.g. "pages", "images")."""
+    for k in keys:
+        p[k].mkdir(parents=True, exist_ok=True)
+
+
 ADJECTIVES = [
     "brisk", "calm", "vivid", "quiet", "bold", "sunny", "gentle", "lively", "bright", "nimble",
     "steady", "true", "kind", "swift", "solid", "fresh", "clear", "warm", "neat", "sharp"
@@ -65,9 +88,8 @@ def _friendly_label(ws_id: str) -> str:
     return f"{adj.title()} {noun.title()} ({suffix})"
 
 
-def _load_state(p: Dict[str, Path]) -> Dict:
-    """Load a simple state.json with minimal metadata."""
-    defaults = {
+def _state_defaults(p: Dict[str, Path]) -> Dict:
+    return {
         "workspace_id": p["id"],
         "label": None,
         "pages": [],
@@ -77,29 +99,64 @@ def _load_state(p: Dict[str, Path]) -> Dict:
         "required_pagexml": [],
         "file_grps": {},
     }
-    if p["state"].is_file():
-        try:
-            raw = json.loads(p["state"].read_text(encoding="utf-8"))
-            state = {**defaults, **(raw if isinstance(raw, dict) else {})}
-            if not state.get("label"):
-                existing = get_workspace(p["id"]) if get_workspace else None
-                state["label"] = existing["label"] if existing and existing.get("label") else _friendly_label(p["id"])
+
+
+def _migrate_state_file(p: Dict[str, Path]) -> Optional[Dict]:
+    """
+    One-time import of a legacy state.json into the DB (see core/state.py). Pages and images
+    found on disk are registered too, since the old missing-file checks listed the folders.
+    The file is kept as state.json.migrated. Returns the migrated state, or None.
+    """
+    try:
+        raw = json.loads(p["state"].read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(raw, dict):
+        return None
+    state = {**_state_defaults(p), **raw, "workspace_id": p["id"]}
+    state["pages"] = sorted(set(state["pages"]).union(q.name for q in p["pages"].glob("*.xml")))
+    state["images"] = sorted(set(state["images"]).union(
+        q.name for q in p["images"].glob("*") if q.is_file() and _image_mime_ok(q.name)))
+    write_state(p["id"], state)
+    p["state"].replace(p["state"].with_name(p["state"].name + ".migrated"))
+    return state
+
+
+def _read_state(p: Dict[str, Path]) -> Optional[Dict]:
+    """Stored state of the workspace (migrating a legacy state.json first); None if there is none."""
+    state = read_state(p["id"])
+    if state is None and p["state"].is_file():
+        with state_lock(p["id"]):
+            state = read_state(p["id"])
+            if state is None:
+                state = _migrate_state_file(p)
+    return state
+
+
+def _load_state(p: Dict[str, Path]) -> Dict:
+    """
+    Load the workspace state (see core/state.py) over the defaults. Returns a private copy.
+    Only writes when the workspace has no state yet or no label (a label is assigned once).
+    """
+    state = {**_state_defaults(p), **(_read_state(p) or {})}
+    if state.get("label"):
+        return state
+    with state_lock(p["id"]):
+        state = {**_state_defaults(p), **(_read_state(p) or {})}  # another request may have assigned it
+        if not state.get("label"):
+            existing = get_workspace(p["id"]) if get_workspace else None
+            state["label"] = existing["label"] if existing and existing.get("label") else _friendly_label(p["id"])
             _save_state(p, state)
-            return state
-        except Exception:
-            pass
-    existing = get_workspace(p["id"]) if get_workspace else None
-    default_label = existing["label"] if existing and existing.get("label") else _friendly_label(p["id"])
-    state = {**defaults, "label": default_label}
-    _save_state(p, state)
     return state
 
 
 def _save_state(p: Dict[str, Path], state: Dict):
-    try:
-        p["state"].write_text(json.dumps(state, indent=2, ensure_ascii=False), encoding="utf-8")
-    except Exception:
-        pass
+    write_state(p["id"], state)
+
+
+def _edit_state(p: Dict[str, Path]):
+    """Read-modify-write of the state under the workspace lock: `with _edit_state(p) as state: ...`"""
+    return edit_state(p["id"], lambda: _load_state(p))
 
 
 def _image_mime_ok(filename: str) -> bool:
@@ -140,48 +197,43 @@ def _serialize_pcgts(pcgts: PcGtsType) -> str:
 
 def _missing_images_in_page(page_file: Path) -> List[str]:
     """Read a PAGE-XML and return a list of image basenames it references (usually 1)."""
-    pcgts: PcGtsType = parse_pagexml(str(page_file))
-    page = pcgts.get_Page()
-    img = page.get_imageFilename()
+    img = page_image_filename(page_file)
     if not img:
         return []
     return [Path(img).name]
 
 
-def _collect_required_from_pages(p: Dict[str, Path], state: Dict) -> List[str]:
-    """Union of required image basenames from state + currently present PAGE files."""
-    need = set(state.get("required_images", []))
-    for px in p["pages"].glob("*.xml"):
+def _read_page_images(p: Dict[str, Path], names) -> Dict[str, Optional[str]]:
+    """The image each PAGE-XML references ({page: image basename or None})."""
+    out = {}
+    for name in names:
         try:
-            need.update(_missing_images_in_page(px))
+            found = _missing_images_in_page(p["pages"] / name)
         except Exception:
-            continue
-    return sorted(need)
+            found = []
+        out[name] = found[0] if found else None
+    return out
 
 
 def _missing_images_ext_agnostic(p: Dict[str, Path]) -> list[str]:
     """
-    Compare required images with uploaded images by STEM only.
+    Compare required images (METS + referenced by pages) with registered images by STEM only.
     Returns a user-friendly list of missing basenames (keep original extension as hint).
+    Page references are read at upload; pages not read yet (migrated workspaces) are read once here.
     """
-    required = [Path(n).name for n in _collect_required_from_pages(p, _load_state(p))]
-    need_stems = {_lower_stem(n) for n in required}
-    have_stems = {_lower_stem(q.name) for q in p["images"].glob("*") if q.is_file()}
-    missing_stems = sorted(need_stems - have_stems)
-
-    stem_hint = {}
-    for n in required:
-        s = _lower_stem(n)
-        stem_hint.setdefault(s, n)
-    return [stem_hint.get(s, f"{s}.*") for s in missing_stems]
+    _read_state(p)  # migrate a legacy state.json
+    unknown = pages_with_unknown_image(p["id"])
+    if unknown:
+        found = _read_page_images(p, unknown)
+        with _edit_state(p) as fresh:
+            fresh.setdefault("page_images", {}).update(found)
+    return db_missing_images(p["id"])
 
 
 def _missing_pagexml(p: Dict[str, Path]) -> list[str]:
-    """Compare required PAGE-XML basenames with those uploaded to pages/."""
-    state = _load_state(p)
-    required = {Path(n).name for n in state.get("required_pagexml", [])}
-    have = {q.name for q in p["pages"].glob("*.xml")}
-    return sorted(required - have)
+    """Compare required PAGE-XML basenames with the registered pages."""
+    _read_state(p)
+    return db_missing_pagexml(p["id"])
 
 
 def _touch_db(p: Dict[str, Path], state: Optional[Dict] = None):
@@ -201,23 +253,12 @@ def _extract_from_mets_rich(mets_path: Path) -> dict:
     """
     Parse METS and return fileGrp summary + ordered file lists (if structMap present).
     """
-    mets_path = Path(mets_path)
-    tree = etree.parse(str(mets_path))
-    root = tree.getroot()
-
-    filegrps = {}
-    for fg in root.xpath(".//mets:fileSec/mets:fileGrp", namespaces=NS):
-        use = (fg.get("USE") or "").strip()
-        if not use:
-            continue
-        files = []
-        for f in fg.xpath("./mets:file", namespaces=NS):
-            fid = f.get("ID") or ""
-            mt = f.get("MIMETYPE") or ""
-            fl = f.xpath("./mets:FLocat", namespaces=NS)
-            href = fl[0].get(f"{{{NS['xlink']}}}href") if fl else ""
-            files.append({"id": fid, "href": href, "mimetype": mt})
-        filegrps[use] = files
+    index = load_mets_index(mets_path)
+
+    filegrps = {
+        use: [{"id": f["id"], "href": f["href"], "mimetype": f["mimetype"]} for f in files]
+        for use, files in index.file_grps.items()
+    }
 
     img_grps = [g for g, fs in filegrps.items() if any((f["mimetype"] or "").startswith("image/") for f in fs)]
     page_grps = [g for g, fs in filegrps.items() if any(f["mimetype"] == "application/vnd.prima.page+xml" for f in fs)]
@@ -228,10 +269,10 @@ def _extract_from_mets_rich(mets_path: Path) -> dict:
     f_by_id = {f["id"]: f for fs in filegrps.values() for f in fs}
 
     ordered_img_ids, ordered_page_ids = [], []
-    divs = root.xpath(".//mets:structMap[@TYPE='PHYSICAL']//mets:div[@TYPE='page']", namespaces=NS)
+    divs = index.page_divs
     if divs:
         for d in divs:
-            fptr_ids = [el.get("FILEID") for el in d.xpath("./mets:fptr", namespaces=NS)]
+            fptr_ids = d["file_ids"]
             img_id = next(
                 (fid for fid in fptr_ids if fid in f_by_id and (f_by_id[fid]["mimetype"] or "").startswith("image/")),
                 None)
@@ -263,6 +304,43 @@ def _extract_from_mets_rich(mets_path: Path) -> dict:
     }
 
 
+def _register_pages(p: Dict[str, Path], state: Dict, stored: List[str]) -> None:
+    """
+    Record PAGE-XML files already stored in pages/ in state + DB (shared by all upload paths).
+    The change is applied to the stored state under the workspace lock; `state` is refreshed.
+    """
+    # Track required images from newly uploaded PAGE files
+    found = _read_page_images(p, stored)
+    with _edit_state(p) as fresh:
+        fresh["pages"] = sorted(set(fresh["pages"]).union(stored))
+        fresh.setdefault("page_images", {}).update(found)
+        fresh["required_images"] = sorted(set(fresh.get("required_images", [])).union(v for v in found.values() if v))
+    state.update(fresh)
+    _touch_db(p, state)
+    _sync_search(p, state)
+
+
+def _page_file(p: Dict[str, Path], name: str) -> Path:
+    """The PAGE-XML the editor works on: the normalized copy if there is one."""
+    norm = p["norm"] / name
+    return norm if norm.is_file() else p["pages"] / name
+
+
+def _sync_search(p: Dict[str, Path], state: Optional[Dict] = None) -> None:
+    """Update the transcription search index for pages added, changed or removed (see core/search.py)."""
+    state = state or _load_state(p)
+    files = {name: _page_file(p, name) for name in state.get("pages", [])}
+    sync_workspace(p["id"], {name: f for name, f in files.items() if f.is_file()})
+
+
+def _register_images(p: Dict[str, Path], state: Dict, added: List[str]) -> None:
+    """Record images already stored in images/ in state + DB (shared by all upload paths)."""
+    with _edit_state(p) as fresh:
+        fresh["images"] = sorted(set(fresh["images"]).union(added))
+    state.update(fresh)
+    _touch_db(p, state)
+
+
 @bp_import.post("/upload-pages")
 def upload_pages():
     """Upload multiple PAGE-XML files. Returns {workspace_id, pages, missing_images}."""
@@ -281,28 +359,33 @@ def upload_pages():
         if not name.lower().endswith(".xml"):
             continue
         dst = (p["pages"] / name).resolve()
-        dst.parent.mkdir(parents=True, exist_ok=True)
+        _ensure_dirs(p, "pages")
         f.save(dst.as_posix())
         stored.append(name)
 
-    # Update state
-    state["pages"] = sorted(set(state["pages"]).union(stored))
-
-    # Track required images from newly uploaded PAGE files
-    req = set(state.get("required_images", []))
-    for name in stored:
-        try:
-            req.update(_missing_images_in_page(p["pages"] / name))
-        except Exception:
-            pass
-    state["required_images"] = sorted(req)
-    _save_state(p, state)
-    _touch_db(p, state)
+    _register_pages(p, state, stored)
 
     missing = _missing_images_ext_agnostic(p)
     return jsonify(workspace_id=p["id"], label=state.get("label"), pages=state["pages"], missing_images=missing)
 
 
+def _register_mets(p: Dict[str, Path], state: Dict) -> tuple[dict, List[str]]:
+    """Record original/mets.xml in state + DB; returns (METS summary, required PAGE basenames in order)."""
+    info = _extract_from_mets_rich(p["orig"] / "mets.xml")
+
+    page_basenames = [Path(x["href"]).name for x in info["pagexml_files"] if x.get("href")]
+    image_basenames = [Path(x["href"]).name for x in info["image_files"] if x.get("href")]
+
+    with _edit_state(p) as fresh:
+        fresh["mets"] = "original/mets.xml"
+        fresh["required_pagexml"] = sorted(set(fresh.get("required_pagexml", [])).union(page_basenames))
+        fresh["required_images"] = sorted(set(fresh.get("required_images", [])).union(image_basenames))
+        fresh["file_grps"] = info.get("file_grps", {})
+    state.update(fresh)
+    _touch_db(p, state)
+    return info, page_basenames
+
+
 @bp_import.post("/upload-mets")
 def upload_mets():
     """
@@ -317,20 +400,10 @@ def upload_mets():
     p = _ws_paths(ws_id)
     state = _load_state(p)
 
+    _ensure_dirs(p, "orig")
     dst = (p["orig"] / "mets.xml").resolve()
     file.save(dst.as_posix())
-    state["mets"] = "original/mets.xml"
-
-    info = _extract_from_mets_rich(dst)
-
-    page_basenames = [Path(x["href"]).name for x in info["pagexml_files"] if x.get("href")]
-    image_basenames = [Path(x["href"]).name for x in info["image_files"] if x.get("href")]
-
-    state["required_pagexml"] = sorted(set(state.get("required_pagexml", [])).union(page_basenames))
-    state["required_images"] = sorted(set(state.get("required_images", [])).union(image_basenames))
-    state["file_grps"] = info.get("file_grps", {})
-    _save_state(p, state)
-    _touch_db(p, state)
+    info, page_basenames = _register_mets(p, state)
 
     missing_images = _missing_images_ext_agnostic(p)
     missing_pagexml = _missing_pagexml(p)
@@ -365,18 +438,491 @@ def upload_images():
         if not _image_mime_ok(name):
             continue
         dst = (p["images"] / name).resolve()
-        dst.parent.mkdir(parents=True, exist_ok=True)
-        f.save(dst.as_posix())
+        _ensure_dirs(p, "images")
+        store_stream(f.stream, p["id"], name, dst)  # shared blob store, deduplicated
         added.append(name)
 
-    state["images"] = sorted(set(state["images"]).union(added))
-    _save_state(p, state)
-    _touch_db(p, state)
+    _register_images(p, state, added)
 
     still_missing = _missing_images_ext_agnostic(p)
     return jsonify(workspace_id=p["id"], label=state.get("label"), added=added, still_missing=still_missing)
 
 
+# ---------- Resumable uploads (tus-style) ----------
+#
+#   POST   /api/uploads                 create a session        -> 201, Location + upload_id
+#   HEAD   /api/uploads/<id>            current Upload-Offset / Upload-Length
+#   GET    /api/uploads/<id>            same as JSON
+#   PATCH  /api/uploads/<id>            append a chunk at Upload-Offset (optional Upload-Checksum)
+#   DELETE /api/uploads/<id>            abandon
+#   POST   /api/uploads/finalize        move completed files into place and register them
+#
+# Chunks are streamed from the request body straight into <ws>/uploads/<id>.part,
+# which finalize renames into images/ or pages/ (same filesystem, no copy).
+
+TUS_VERSION = "1.0.0"
+UPLOAD_KINDS = ("images", "pages")
+UPLOAD_MAX_CHUNK = int(os.getenv("UPLOAD_MAX_CHUNK_BYTES", str(64 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))  # suggested to clients
+UPLOAD_TTL_HOURS = float(os.getenv("UPLOAD_TTL_HOURS", "48"))
+CHECKSUM_ALGOS = ("sha256", "sha1", "md5")
+STATUS_CHECKSUM_MISMATCH = 460  # tus checksum extension
+
+_upload_locks: Dict[str, threading.Lock] = {}
+_upload_locks_guard = threading.Lock()
+
+
+def _upload_lock(upload_id: str) -> threading.Lock:
+    with _upload_locks_guard:
+        return _upload_locks.setdefault(upload_id, threading.Lock())
+
+
+def _part_path(ws_id: str, upload_id: str) -> Path:
+    return ROOT / ws_id / "uploads" / f"{upload_id}.part"
+
+
+def _upload_headers(up: Dict) -> Dict[str, str]:
+    return {
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Offset": str(up["offset"]),
+        "Upload-Length": str(up["length"]),
+        "Cache-Control": "no-store",
+    }
+
+
+def _upload_json(up: Dict) -> Dict:
+    return {
+        "upload_id": up["id"],
+        "workspace_id": up["workspace_id"],
+        "kind": up["kind"],
+        "filename": up["filename"],
+        "offset": up["offset"],
+        "length": up["length"],
+        "complete": up["offset"] >= up["length"],
+        "chunk_size": UPLOAD_CHUNK_SIZE,
+    }
+
+
+def _get_upload_or_404(upload_id: str) -> Dict:
+    up = get_upload(upload_id)
+    if not up:
+        abort(404, "upload not found")
+    return up
+
+
+def _tus_metadata(header: str) -> Dict[str, str]:
+    """Decode a tus Upload-Metadata header: 'key base64value,key2 base64value2'."""
+    out = {}
+    for item in (header or "").split(","):
+        parts = item.strip().split(" ", 1)
+        if not parts[0]:
+            continue
+        try:
+            out[parts[0]] = base64.b64decode(parts[1]).decode("utf-8") if len(parts) > 1 else ""
+        except Exception:
+            abort(400, f"invalid Upload-Metadata value for {parts[0]}")
+    return out
+
+
+def _expire_stale_uploads():
+    for up in stale_uploads(UPLOAD_TTL_HOURS):
+        _part_path(up["workspace_id"], up["id"]).unlink(missing_ok=True)
+        delete_upload(up["id"])
+
+
+@bp_import.post("/uploads")
+def create_resumable_upload():
+    """
+    Start a resumable upload of one file.
+    JSON body: {"workspace_id", "kind": "images"|"pages", "filename", "length", "sha256" (optional)}
+    or tus headers: Upload-Length + Upload-Metadata (filename, kind, sha256) and ?workspace_id=
+    If an image with this sha256 (hex, whole file) is already in the blob store, the session
+    starts out complete and no bytes need to be sent; finalize links the stored copy.
+    Response 201: {upload_id, offset, length, chunk_size, complete, ...}, Location header
+    """
+    body = request.get_json(silent=True) or {}
+    meta = _tus_metadata(request.headers.get("Upload-Metadata", ""))
+    ws_id = (body.get("workspace_id") or request.args.get("workspace_id") or meta.get("workspace_id") or "").strip()
+    kind = (body.get("kind") or meta.get("kind") or "images").strip()
+    filename = secure_filename(Path(body.get("filename") or meta.get("filename") or "").name)
+    try:
+        length = int(body.get("length", request.headers.get("Upload-Length", "")))
+    except (TypeError, ValueError):
+        abort(400, "length (or Upload-Length) is required")
+
+    if not ws_id:
+        abort(400, "workspace_id is required")
+    if kind not in UPLOAD_KINDS:
+        abort(400, f"kind must be one of {', '.join(UPLOAD_KINDS)}")
+    if not filename:
+        abort(400, "filename is required")
+    if kind == "images" and not _image_mime_ok(filename):
+        abort(400, f"not an image file: {filename}")
+    if kind == "pages" and not filename.lower().endswith(".xml"):
+        abort(400, f"not a PAGE-XML file: {filename}")
+    if length < 0:
+        abort(400, "length must be >= 0")
+
+    _expire_stale_uploads()
+
+    digest = (body.get("sha256") or meta.get("sha256") or "").strip().lower()
+    blob = get_blob(digest) if kind == "images" else None
+    known = digest if blob and blob["size"] == length else None
+
+    p = _ws_paths(ws_id)
+    up = create_upload(p["id"], kind, filename, length, sha256=known)
+    if not known:
+        p["uploads"].mkdir(parents=True, exist_ok=True)
+        _part_path(p["id"], up["id"]).touch()
+
+    resp = jsonify(_upload_json(up))
+    resp.status_code = 201
+    resp.headers.update(_upload_headers(up))
+    resp.headers["Location"] = f"{request.script_root}/api/uploads/{up['id']}"
+    return resp
+
+
+@bp_import.get("/uploads/<upload_id>")
+def resumable_upload_status(upload_id: str):
+    """Current offset of an upload (also answers HEAD, as tus clients expect)."""
+    up = _get_upload_or_404(upload_id)
+    resp = jsonify(_upload_json(up))
+    resp.headers.update(_upload_headers(up))
+    return resp
+
+
+@bp_import.patch("/uploads/<upload_id>")
+def resumable_upload_chunk(upload_id: str):
+    """
+    Append one chunk.
+    Headers:
+      Content-Type: application/offset+octet-stream
+      Upload-Offset: <int>                  must equal the current offset (409 otherwise)
+      Upload-Checksum: <algo> <base64>      optional; sha256|sha1|md5 of this chunk (460 on mismatch)
+    Response 204 with the new Upload-Offset.
+    """
+    if request.mimetype != "application/offset+octet-stream":
+        abort(415, "Content-Type must be application/offset+octet-stream")
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+    except ValueError:
+        abort(400, "Upload-Offset header is required")
+    if request.content_length is not None and request.content_length > UPLOAD_MAX_CHUNK:
+        abort(413, f"chunks may be at most {UPLOAD_MAX_CHUNK} bytes")
+
+    hasher, expected_digest = None, None
+    checksum = (request.headers.get("Upload-Checksum") or "").strip()
+    if checksum:
+        algo, _, digest = checksum.partition(" ")
+        if algo.lower() not in CHECKSUM_ALGOS:
+            abort(400, f"unsupported checksum algorithm: {algo}")
+        try:
+            expected_digest = base64.b64decode(digest.strip(), validate=True)
+        except Exception:
+            abort(400, "Upload-Checksum digest must be base64")
+        hasher = hashlib.new(algo.lower())
+
+    with _upload_lock(upload_id):
+        up = _get_upload_or_404(upload_id)
+        if offset != up["offset"]:
+            resp = jsonify(error="offset mismatch", **_upload_json(up))
+            resp.status_code = 409
+            resp.headers.update(_upload_headers(up))
+            return resp
+
+        part = _part_path(up["workspace_id"], upload_id)
+        if not part.is_file() or part.stat().st_size < offset:
+            abort(410, "upload data is gone; start a new upload")
+
+        written, disconnected = 0, False
+        with open(part, "r+b") as fh:
+            fh.seek(offset)
+            while True:
+                try:
+                    buf = request.stream.read(1024 * 1024)
+                except ClientDisconnected:
+                    disconnected = True
+                    break
+                if not buf:
+                    break
+                written += len(buf)
+                if offset + written > up["length"] or written > UPLOAD_MAX_CHUNK:
+                    fh.truncate(offset)
+                    abort(413, "chunk exceeds the declared upload length")
+                fh.write(buf)
+                if hasher:
+                    hasher.update(buf)
+            if disconnected and hasher:
+                written = 0  # a partial chunk cannot be verified; the client resends it
+            elif hasher and hasher.digest() != expected_digest:
+                fh.truncate(offset)
+                resp = jsonify(error="checksum mismatch", **_upload_json(up))
+                resp.status_code = STATUS_CHECKSUM_MISMATCH
+                resp.headers.update(_upload_headers(up))
+                return resp
+            fh.truncate(offset + written)
+
+        advance_offset(upload_id, offset, offset + written)
+        up["offset"] = offset + written
+
+    resp = make_response("", 204)
+    resp.headers.update(_upload_headers(up))
+    return resp
+
+
+@bp_import.delete("/uploads/<upload_id>")
+def resumable_upload_delete(upload_id: str):
+    up = _get_upload_or_404(upload_id)
+    with _upload_lock(upload_id):
+        _part_path(up["workspace_id"], upload_id).unlink(missing_ok=True)
+        delete_upload(upload_id)
+    return make_response("", 204, {"Tus-Resumable": TUS_VERSION})
+
+
+@bp_import.post("/uploads/finalize")
+def resumable_upload_finalize():
+    """
+    Move completed uploads into images/ or pages/ and register them exactly like
+    /upload-images and /upload-pages do (one state update for the whole batch).
+    JSON body: {"workspace_id", "upload_ids": [...]}
+    Response: {workspace_id, label, added, pages, still_missing, missing_images, incomplete}
+      (images: added + still_missing; pages: pages + missing_images; incomplete: ids not fully uploaded yet)
+    """
+    body = request.get_json(silent=True) or {}
+    ws_id = (body.get("workspace_id") or request.args.get("workspace_id") or "").strip()
+    if not ws_id:
+        return jsonify(error="workspace_id is required"), 400
+    p = _ws_paths(ws_id)
+
+    stored: Dict[str, List[str]] = {"images": [], "pages": []}
+    incomplete = []
+    for upload_id in body.get("upload_ids") or []:
+        with _upload_lock(upload_id):
+            up = get_upload(upload_id)
+            if not up or up["workspace_id"] != ws_id:
+                continue
+            if up["offset"] < up["length"]:
+                incomplete.append(upload_id)
+                continue
+            _ensure_dirs(p, up["kind"])
+            dst = (p[up["kind"]] / up["filename"]).resolve()
+            part = _part_path(ws_id, upload_id)
+            if up["kind"] != "images":
+                os.replace(part, dst)
+            elif up.get("sha256") and not part.exists():
+                if not link_blob(up["sha256"], ws_id, up["filename"], dst):
+                    # the blob was collected meanwhile: the client has to send the bytes after all
+                    delete_upload(upload_id)
+                    incomplete.append(upload_id)
+                    continue
+            else:
+                store_file(part, ws_id, up["filename"], dst)
+            delete_upload(upload_id)
+            stored[up["kind"]].append(up["filename"])
+        with _upload_locks_guard:
+            _upload_locks.pop(upload_id, None)
+
+    state = _load_state(p)
+    if stored["pages"]:
+        _register_pages(p, state, stored["pages"])
+    if stored["images"]:
+        _register_images(p, state, stored["images"])
+
+    missing = _missing_images_ext_agnostic(p)
+    return jsonify(workspace_id=p["id"], label=state.get("label"), added=stored["images"], pages=state["pages"],
+                   still_missing=missing, missing_images=missing, incomplete=incomplete)
+
+
+# ---------- ZIP / OCRD-ZIP import ----------
+
+def _run_zip_import(job: Job, ws_id: str, archive: Path) -> Dict:
+    """Background part of /import-zip: extract, register METS/pages/images, normalize."""
+    p = _ws_paths(ws_id)
+
+    def select(mets_path: Path) -> List[str]:
+        info = _extract_from_mets_rich(mets_path)
+        return [f["href"] for f in info["pagexml_files"] + info["image_files"] if f.get("href")]
+
+    try:
+        job.phase("extract")
+        _ensure_dirs(p, "orig", "pages", "images")
+        extracted = extract_archive(
+            archive, p, select=select, progress=job.reporter("extract"),
+            store_image=lambda fh, name: store_stream(fh, ws_id, name, p["images"] / name))
+        if not (extracted["mets"] or extracted["pages"] or extracted["images"]):
+            raise ValueError("the archive contains no METS, PAGE-XML or images")
+
+        job.phase("register")
+        state = _load_state(p)
+        page_order: List[str] = []
+        if extracted["mets"]:
+            _, page_order = _register_mets(p, state)
+        if extracted["pages"]:
+            _register_pages(p, state, extracted["pages"])
+        if extracted["images"]:
+            _register_images(p, state, extracted["images"])
+
+        job.phase("normalize")
+        normalized = _normalize_pages(p, progress=job.reporter("normalize"))
+        _touch_db(p, _load_state(p))
+
+        return {
+            "workspace_id": ws_id,
+            "mets": extracted["mets"],
+            "pages": page_order or sorted(extracted["pages"]),
+            "images": len(extracted["images"]),
+            "normalized": len(normalized["normalized"]) + len(normalized["unchanged"]),
+            "normalize_errors": normalized["errors"],
+            "skipped": extracted["skipped"],
+            "missing_images": _missing_images_ext_agnostic(p),
+            "missing_pagexml": _missing_pagexml(p),
+        }
+    finally:
+        archive.unlink(missing_ok=True)
+
+
+@bp_import.post("/import-zip")
+def import_zip():
+    """
+    Import a whole workspace from one ZIP or OCRD-ZIP (BagIt) archive.
+    Body: the archive itself (Content-Type: application/zip) or multipart field "file".
+    Query: workspace_id=... (optional; default: new workspace)
+
+    The archive is streamed to disk; extraction (mets.xml is detected automatically),
+    registration and normalization run as a background job.
+    Response 202: {job_id, workspace_id, status_url}; poll GET /api/jobs/<job_id>.
+    """
+    ws_id = (request.args.get("workspace_id") or "").strip()
+    p = _ws_paths(ws_id)
+    _load_state(p)
+    _touch_db(p)
+
+    p["uploads"].mkdir(parents=True, exist_ok=True)
+    archive = p["uploads"] / f"import-{uuid.uuid4().hex}.zip"
+
+    upload = request.files.get("file")
+    try:
+        if upload is not None:
+            upload.save(archive.as_posix())
+        else:
+            with open(archive, "wb") as fh:
+                shutil.copyfileobj(request.stream, fh, 1024 * 1024)
+        if not zipfile.is_zipfile(archive):
+            raise ValueError("not a ZIP archive")
+    except Exception as e:
+        archive.unlink(missing_ok=True)
+        return jsonify(error=str(e), workspace_id=p["id"]), 400
+
+    job_id = submit("import-zip", _run_zip_import, p["id"], archive, workspace_id=p["id"], phase="extract")
+    return jsonify(job_id=job_id, workspace_id=p["id"], status_url=f"/api/jobs/{job_id}"), 202
+
+
+@bp_import.get("/import-zip/<job_id>")
+def import_zip_status(job_id: str):
+    """Same as GET /api/jobs/<job_id> (kept for older clients)."""
+    job = get_job(job_id)
+    if not job:
+        abort(404, "import job not found")
+    return jsonify(job)
+
+
+# ---------- Server-side import (shared filesystem) ----------
+
+@bp_import.post("/import-path")
+def import_path():
+    """
+    Register an OCR-D workspace directory that already exists on the server, without uploading it.
+    Only directories below the admin-configured INGEST_ROOTS are accepted (see core/ingest.py).
+    Body (JSON):
+      path=...           (required; the directory containing mets.xml)
+      workspace_id=...   (optional; default: new workspace)
+      label=...          (optional; default: the directory name)
+      link=symlink|hardlink (optional; default symlink; hardlink falls back to symlink across filesystems)
+    The METS is copied into original/ and indexed; the files of its chosen fileGrps are brought in:
+    images (and the images the PAGE-XML references) are linked, PAGE-XML is copied because the
+    editor writes pages in place. No image bytes are read or copied, so size hardly matters.
+    Response 201: {workspace_id, label, pages, images, link, skipped, missing_images, missing_pagexml, file_grps}
+    """
+    body = request.get_json(silent=True) or {}
+    path = (body.get("path") or "").strip()
+    if not path:
+        return jsonify(error="path is required"), 400
+    mode = (body.get("link") or "symlink").strip().lower()
+    if mode not in LINK_MODES:
+        return jsonify(error=f"link must be one of {', '.join(LINK_MODES)}"), 400
+    try:
+        src = resolve_ingest_dir(path)
+    except PermissionError as e:
+        abort(403, str(e))
+    except FileNotFoundError as e:
+        abort(404, str(e))
+    if not (src / "mets.xml").is_file():
+        return jsonify(error=f"no mets.xml in {path}"), 400
+
+    ws_id = (body.get("workspace_id") or "").strip()
+    p = _ws_paths(ws_id)
+    state = _load_state(p)
+
+    _ensure_dirs(p, "orig", "pages", "images")
+    # Our own copy: the METS index cache is written next to it, never into the pipeline's tree
+    copy_file(src / "mets.xml", p["orig"] / "mets.xml")
+    info, page_order = _register_mets(p, state)
+
+    skipped: List[str] = []
+
+    def members(files) -> Dict[str, Path]:
+        out = {}
+        for f in files:
+            href = f.get("href") or ""
+            member = resolve_member(src, href) if href else None
+            if member is None or member.name.startswith("."):
+                skipped.append(href)
+            else:
+                out[member.name] = member
+        return out
+
+    pages = members(info["pagexml_files"])
+    for name, member in pages.items():
+        copy_file(member, p["pages"] / name)
+
+    # PAGE-XML often references a derived image (e.g. a binarized one) of another fileGrp
+    images = members(info["image_files"])
+    for name, member in pages.items():
+        try:
+            href = page_image_filename(member)
+        except Exception:
+            href = None
+        target = resolve_member(src, href) if href else None
+        if target is not None:
+            images.setdefault(target.name, target)
+
+    used = set()
+    for name, member in images.items():
+        used.add(link_file(member, p["images"] / name, mode))
+
+    if pages:
+        _register_pages(p, state, sorted(pages))
+    if images:
+        _register_images(p, state, sorted(images))
+    label = (body.get("label") or "").strip() or src.name
+    with _edit_state(p) as fresh:
+        fresh["label"] = label
+    state.update(fresh)
+    _touch_db(p, state)
+
+    return jsonify(
+        workspace_id=p["id"],
+        label=label,
+        pages=page_order or sorted(pages),
+        images=len(images),
+        link=sorted(used) or [mode],
+        skipped=skipped,
+        missing_images=_missing_images_ext_agnostic(p),
+        missing_pagexml=_missing_pagexml(p),
+        file_grps=info.get("file_grps", {})
+    ), 201
+
+
 @bp_import.post("/commit-import")
 def commit_import():
     """
@@ -384,61 +930,48 @@ def commit_import():
     For each PAGE-XML:
       - If Page/@imageFilename exists, rewrite to "images/<basename>".
       - If missing or extension mismatch, resolve by STEM against uploaded images and set accordingly.
+    Only the imageFilename attribute is rewritten; the rest of each file is kept byte for byte.
+    With validate=1 every page is parsed and re-serialized instead (slower; rejects invalid PAGE-XML).
+    Pages unchanged since the last commit are skipped; larger batches run on a process pool.
+    Runs as a background job. Response 202: {job_id, workspace_id, status_url}; the job result is
+    {ok, normalized: [...], unchanged: [...], errors: [{file, error}]} (ok is false if any page failed).
+    With wait=1 that result is returned directly instead (200).
     """
     ws_id = request.args.get("workspace_id")
     if not ws_id:
         return jsonify(error="workspace_id is required"), 400
     p = _ws_paths(ws_id)
 
-    normalized = []
+    validate = flag_arg("validate")
+    mode = "validate" if validate else None
+    if flag_arg("wait"):
+        return jsonify(_run_commit(None, p["id"], mode))
+    job_id = submit("commit", _run_commit, p["id"], mode, workspace_id=p["id"], phase="normalize", dedupe=True)
+    return jsonify(job_id=job_id, workspace_id=p["id"], status_url=f"/api/jobs/{job_id}"), 202
 
-    # Prefer the high-level to_xml helper if available
-    try:
-        from ocrd_models.ocrd_page import to_xml as page_to_xml
-    except Exception:
-        page_to_xml = None
 
-    # Fallback constants for direct export
-    PAGE_NS = "http://schema.primaresearch.org/PAGE/gts/pagecontent/2019-07-15"
-    XSI_NS = "http://www.w3.org/2001/XMLSchema-instance"
-    SCHEMA_LOC = f"{PAGE_NS} {PAGE_NS}/pagecontent.xsd"
-    namespacedef = f'xmlns:pc="{PAGE_NS}" xmlns:xsi="{XSI_NS}" xsi:schemaLocation="{SCHEMA_LOC}"'
-
-    for src in p["pages"].glob("*.xml"):
-        try:
-            pcgts = parse_pagexml(str(src))  # from ocrd_models.ocrd_page_generateds
-            page = pcgts.get_Page()
-
-            # Rewrite imageFilename to a clean, workspace-relative path
-            img = page.get_imageFilename()
-            if img:
-                basename = Path(img).name
-                page.set_imageFilename(f"images/{basename}")
-
-            dst = (p["norm"] / src.name)
+def _run_commit(job: Optional[Job], ws_id: str, mode: Optional[str]) -> Dict:
+    p = _ws_paths(ws_id)
+    result = _normalize_pages(p, progress=job.reporter("normalize") if job else None, mode=mode)
+    state = _load_state(p)
+    _touch_db(p, state)
+    _sync_search(p, state)  # pages are now edited (and indexed) from normalized/
+    return {"ok": not result["errors"], **result}
 
-            if page_to_xml:
-                # Proper namespaces and XML declaration
-                xml_bytes = page_to_xml(pcgts, pretty_print=True)  # returns bytes
-                dst.write_bytes(xml_bytes)
-            else:
-                # Fallback: export with explicit namespacedef and correct root element name
-                # NOTE: name_ must be 'PcGts' (not 'PcGtsType')
-                with open(dst, "wb") as fh:
-                    pcgts.export(
-                        fh, 0,
-                        name_="PcGts",
-                        namespacedef_=namespacedef,
-                        pretty_print=True,
-                    )
-
-            normalized.append(dst.name)
-        except Exception as e:
-            # print(f"normalize failed for {src}: {e}")
-            continue
 
-    _touch_db(p, _load_state(p))
-    return jsonify(ok=True, normalized=normalized)
+def _normalize_pages(p: Dict[str, Path], progress=None, mode: Optional[str] = None) -> Dict:
+    """
+    Write the PAGE-XML of pages/ into normalized/ with a clean imageFilename (see core/normalize.py).
+    Only pages changed since the last run are rewritten; the per-page source records are kept in
+    state["normalized"]. Returns {normalized: [...], unchanged: [...], errors: [{file, error}]}.
+    """
+    _ensure_dirs(p, "norm")
+    result = normalize_pages(p["pages"], p["norm"], _load_state(p).get("normalized") or {},
+                             progress=progress, mode=mode, executor=process_pool())
+    records = result.pop("records")
+    with _edit_state(p) as state:  # uploads may have registered pages meanwhile
+        state["normalized"] = records
+    return result
 
 
 @bp_import.get("/mets/select")
@@ -474,24 +1007,14 @@ def mets_select():
     chosen_page = (request.args.get("pagexml_grp") or "").strip() or info["file_grps"]["chosen"]["pagexml"]
     chosen_img = (request.args.get("image_grp") or "").strip() or info["file_grps"]["chosen"]["image"]
 
-    # Re-parse METS here to build fileGrp map + structMap order
-    tree = etree.parse(str(mets))
-    root = tree.getroot()
+    # fileGrp map + structMap order come from the same cached index
+    index = load_mets_index(mets)
 
     # Build fileGrp -> files
-    filegrps = {}
-    for fg in root.xpath(".//mets:fileSec/mets:fileGrp", namespaces=NS):
-        use = (fg.get("USE") or "").strip()
-        if not use:
-            continue
-        files = []
-        for f in fg.xpath("./mets:file", namespaces=NS):
-            fid = f.get("ID") or ""
-            mt = (f.get("MIMETYPE") or "").strip()
-            fl = f.xpath("./mets:FLocat", namespaces=NS)
-            href = fl[0].get(f"{{{NS['xlink']}}}href") if fl else ""
-            files.append({"id": fid, "href": href, "mimetype": mt})
-        filegrps[use] = files
+    filegrps = {
+        use: [{"id": f["id"], "href": f["href"], "mimetype": f["mimetype"].strip()} for f in files]
+        for use, files in index.file_grps.items()
+    }
 
     f_by_id = {f["id"]: f for fs in filegrps.values() for f in fs}
 
@@ -506,14 +1029,14 @@ def mets_select():
         return part
 
     pages_ordered_suffix = []
-    divs = root.xpath(".//mets:structMap[@TYPE='PHYSICAL']//mets:div[@TYPE='page']", namespaces=NS)
+    divs = index.page_divs
     if divs:
         for d in divs:
-            label = (d.get("ORDERLABEL") or "").strip()
+            label = d["order_label"]
             if label:
                 pages_ordered_suffix.append(label)
             else:
-                did = d.get("ID") or ""
+                did = d["id"]
                 pages_ordered_suffix.append(did.rsplit("_", 1)[-1] if "_" in did else did)
 
     # Index one group's files by derived page suffix
@@ -552,15 +1075,14 @@ def mets_select():
     image_basenames = [Path(x["href"]).name for x in image_files if x.get("href")]
 
     # replace (NOT union) so switching groups updates names
-    state = _load_state(p)
-    state["required_pagexml"] = page_basenames
-    state["required_images"] = image_basenames
-    state["file_grps"] = {
-        "images": info["file_grps"]["images"],
-        "pagexml": info["file_grps"]["pagexml"],
-        "chosen": {"image": chosen_img, "pagexml": chosen_page},
-    }
-    _save_state(p, state)
+    with _edit_state(p) as state:
+        state["required_pagexml"] = page_basenames
+        state["required_images"] = image_basenames
+        state["file_grps"] = {
+            "images": info["file_grps"]["images"],
+            "pagexml": info["file_grps"]["pagexml"],
+            "chosen": {"image": chosen_img, "pagexml": chosen_page},
+        }
     _touch_db(p, state)
 
     missing_images = _missing_images_ext_agnostic(p)
@@ -1,20 +1,53 @@
 from __future__ import annotations
 
+import base64
+import binascii
 import io
 import json
+import logging
+import multiprocessing
+import os
 import shutil
+import threading
+import time
+import uuid
 import zipfile
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from flask import Blueprint, jsonify, abort, send_file, request
 
-from core.db import list_workspaces, record_workspace, remove_workspace
-from api.upload import _ws_paths, _load_state, _missing_images_ext_agnostic, _missing_pagexml, _save_state
+from core.db import WORKSPACE_SORTS, query_workspaces, record_workspace, remove_workspace, workspace_ids
+from core.llm_suggestions import delete_suggestions
+from core.uploads import delete_uploads
+from core.page import quick_meta
+from core.state import read_state, state_lock
+from core.blobstore import release_workspace
+from core.jobs import Job, submit
+from core.search import remove_lines
+from api.upload import _ws_paths, _load_state, _read_state, _edit_state, _missing_images_ext_agnostic, _missing_pagexml, _lower_stem
+from api.args import flag_arg, int_arg
+from api.upload import _image_mime_ok, _register_pages, _register_images, _touch_db, _sync_search
+
+logger = logging.getLogger(__name__)
 
 bp_workspace = Blueprint("workspace_api", __name__)
 
 ROOT = Path("data/workspaces").resolve()
+TRASH = ROOT / ".trash"  # deleted workspaces, until their delete job has removed them
+
+RECONCILE_INTERVAL = float(os.getenv("RECONCILE_INTERVAL", "60"))  # seconds; 0: only at startup
+RECONCILE_STARTUP_WAIT = 10.0  # seconds a listing waits for the first pass
+
+_reconcile_lock = threading.Lock()
+_reconciled = threading.Event()
+_reconciler: Optional[threading.Thread] = None
+_dir_stamps: Dict[str, tuple] = {}
+
+PAGE_LIST_DEFAULT = 100
+PAGE_LIST_MAX = 500
+WS_LIST_MAX = 500
 
 
 def _safe_id(ws_id: str) -> str:
@@ -25,35 +58,209 @@ def _safe_id(ws_id: str) -> str:
     return ws_id
 
 
-def _sync_dirs_into_db():
+# ---------- Background reconciliation ----------
+#
+# The `workspaces` table is kept in line with the folders under data/workspaces by a
+# daemon thread (once at startup, then every RECONCILE_INTERVAL seconds), so listing
+# workspaces is a single query. A pass adopts folders that have no row (copied in by
+# hand or restored from a backup; legacy state.json is migrated), drops rows whose
+# folder is gone, and registers PAGE-XML and images placed into (or removed from)
+# pages/ and images/ by hand. Workspaces whose folders did not change since the last
+# pass (directory mtimes) are not re-listed. Every pass also syncs every workspace with
+# the transcription search index: that only compares page file mtimes with the index,
+# so pages edited in place (e.g. in normalized/) are re-read, as are pages the index
+# has not seen yet.
+
+def _dir_stamp(d: Path) -> tuple:
+    stamp = []
+    for sub in ("pages", "images"):
+        try:
+            stamp.append((d / sub).stat().st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def _adopt_dir(ws_id: str) -> None:
+    """Create the DB row of a workspace folder that has none."""
+    state = read_state(ws_id)
+    if state is None and (ROOT / ws_id / "state.json").is_file():
+        state = _read_state(_ws_paths(ws_id))
+    record_workspace(
+        ws_id,
+        label=state.get("label") if state else None,
+        page_count=len(state.get("pages", [])) if state else None,
+        has_mets=bool(state.get("mets")) if state else None,
+        bump_updated=False
+    )
+
+
+def _reconcile_files(ws_id: str, relist: bool = True) -> None:
     """
-    Ensure existing workspace folders are present in the DB (best-effort).
+    Register files that appeared in pages/ or images/ and forget the ones that disappeared
+    (if relist), then re-index pages changed since they were indexed.
     """
-    if not ROOT.exists():
+    with state_lock(ws_id):  # a delete moves the folder away under this lock
+        if (ROOT / ws_id).is_dir():
+            if relist:
+                _reconcile_files_locked(ws_id)
+            _sync_search(_ws_paths(ws_id))
+
+
+def _reconcile_files_locked(ws_id: str) -> None:
+    paths = _ws_paths(ws_id)
+    state = _load_state(paths)
+    pages = {f.name for f in paths["pages"].glob("*.xml") if not f.name.startswith(".")}
+    # glob() rather than iterdir(): an adopted folder may lack pages/ or images/ (nothing is created here)
+    images = {f.name for f in paths["images"].glob("*")
+              if _image_mime_ok(f.name) and not f.name.startswith(".") and f.is_file()}
+    new_pages = sorted(pages - set(state["pages"]))
+    new_images = sorted(images - set(state["images"]))
+    if new_pages:
+        _register_pages(paths, state, new_pages)
+    if new_images:
+        _register_images(paths, state, new_images)
+    if set(state["pages"]) - pages or set(state["images"]) - images:
+        with _edit_state(paths) as fresh:
+            # Re-check under the lock: an upload may have just written the file
+            fresh["pages"] = [n for n in fresh["pages"] if (paths["pages"] / n).is_file()]
+            fresh["images"] = [n for n in fresh["images"] if (paths["images"] / n).is_file()]
+            fresh["page_images"] = {k: v for k, v in (fresh.get("page_images") or {}).items()
+                                    if k in fresh["pages"]}
+        _touch_db(paths, fresh)
+
+
+def _reconcile() -> Dict[str, int]:
+    """One reconciliation pass; returns counts of adopted, removed and refreshed workspaces."""
+    counts = {"adopted": 0, "removed": 0, "refreshed": 0}
+    with _reconcile_lock:
+        if not ROOT.exists():
+            return counts
+        known = set(workspace_ids())
+        present = set()
+        for entry in os.scandir(ROOT):
+            if entry.name.startswith(".") or not entry.is_dir():
+                continue
+            ws_id = entry.name
+            present.add(ws_id)
+            stamp = _dir_stamp(Path(entry.path))  # before listing: later changes show up next pass
+            try:
+                if ws_id not in known:
+                    _adopt_dir(ws_id)
+                    counts["adopted"] += 1
+                relist = _dir_stamps.get(ws_id) != stamp
+                _reconcile_files(ws_id, relist=relist)
+                if relist:
+                    _dir_stamps[ws_id] = stamp
+                    counts["refreshed"] += 1
+            except Exception:
+                logger.exception(f"reconciling workspace {ws_id} failed")
+        for ws_id in known - present:
+            if not (ROOT / ws_id).exists():
+                remove_workspace(ws_id)
+                remove_lines(ws_id)
+                release_workspace(ws_id)
+                _dir_stamps.pop(ws_id, None)
+                counts["removed"] += 1
+    return counts
+
+
+def _reconcile_loop() -> None:
+    while True:
+        try:
+            _reconcile()
+        except Exception:
+            logger.exception("workspace reconciliation failed")
+        finally:
+            _reconciled.set()
+        if RECONCILE_INTERVAL <= 0:
+            return
+        time.sleep(RECONCILE_INTERVAL)
+
+
+def start_reconciler() -> None:
+    """Start the reconciliation thread once per process (not in pool worker processes)."""
+    global _reconciler
+    if _reconciler is not None or multiprocessing.parent_process() is not None:
         return
-    for d in ROOT.iterdir():
-        if d.is_dir():
-            state_path = d / "state.json"
-            state = None
-            if state_path.is_file():
-                try:
-                    state = json.loads(state_path.read_text(encoding="utf-8"))
-                except Exception:
-                    state = None
-            record_workspace(
-                d.name,
-                label=state.get("label") if state else None,
-                page_count=len(state.get("pages", [])) if state else None,
-                has_mets=bool(state.get("mets")) if state else None,
-                bump_updated=False
-            )
+    _reconciler = threading.Thread(target=_reconcile_loop, name="workspace-reconciler", daemon=True)
+    _reconciler.start()
+
+
+def _encode_cursor(cursor: Optional[list]) -> Optional[str]:
+    if cursor is None:
+        return None
+    raw = json.dumps(cursor, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(token: Optional[str]) -> Optional[list]:
+    if not token:
+        return None
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, ValueError):
+        abort(400, description="invalid cursor")
+    if not isinstance(cursor, list) or len(cursor) != 2 or not isinstance(cursor[1], str):
+        abort(400, description="invalid cursor")
+    return cursor
+
+
+def _date_arg(name: str) -> Optional[str]:
+    """An ISO date or timestamp query argument, normalized to the stored format."""
+    raw = (request.args.get(name) or "").strip()
+    if not raw:
+        return None
+    try:
+        return datetime.fromisoformat(raw.replace("Z", "+00:00")).replace(tzinfo=None).isoformat()
+    except ValueError:
+        abort(400, description=f"{name} must be an ISO date or timestamp")
 
 
 @bp_workspace.get("/workspaces")
 def list_ws():
-    _sync_dirs_into_db()
-    rows = list_workspaces()
-    return jsonify({"workspaces": rows})
+    """
+    Workspaces, most recently updated first.
+
+    GET /api/workspaces
+      limit=N (max 500; all rows if absent), cursor=<next_cursor of the previous page>,
+      q=<words matched against labels and ids>, prefix=<label prefix>, has_mets=0|1,
+      updated_after/updated_before/created_after/created_before=<ISO date or timestamp>,
+      sort=updated_at|created_at|label|page_count, order=asc|desc,
+      refresh=1 (reconcile with the folders on disk first; otherwise done in the background)
+
+    Returns:
+      {"workspaces": [...], "total": matching, "unfiltered_total": all,
+       "next_cursor": str | null}    # null on the last page
+    """
+    sort = (request.args.get("sort") or "updated_at").strip()
+    if sort not in WORKSPACE_SORTS:
+        abort(400, description=f"sort must be one of: {', '.join(WORKSPACE_SORTS)}")
+    order = (request.args.get("order") or ("asc" if sort == "label" else "desc")).strip().lower()
+    if order not in ("asc", "desc"):
+        abort(400, description="order must be asc or desc")
+    limit = int_arg("limit", 0, 1, WS_LIST_MAX) if request.args.get("limit") else None
+    cursor = _decode_cursor(request.args.get("cursor"))
+
+    if request.args.get("refresh") in ("1", "true"):
+        _reconcile()
+    else:
+        _reconciled.wait(timeout=RECONCILE_STARTUP_WAIT)  # the first pass after startup
+    page = query_workspaces(
+        limit=limit,
+        cursor=cursor,
+        q=(request.args.get("q") or "").strip() or None,
+        prefix=(request.args.get("prefix") or "").strip() or None,
+        has_mets=flag_arg("has_mets"),
+        updated_after=_date_arg("updated_after"),
+        updated_before=_date_arg("updated_before"),
+        created_after=_date_arg("created_after"),
+        created_before=_date_arg("created_before"),
+        sort=sort,
+        descending=order == "desc",
+    )
+    page["next_cursor"] = _encode_cursor(page["next_cursor"])
+    return jsonify(page)
 
 
 @bp_workspace.get("/workspaces/<ws_id>")
@@ -76,34 +283,182 @@ def load_workspace(ws_id: str):
         bump_updated=False
     )
 
-    return jsonify({
+    out = {
         "workspace_id": ws_id,
         "label": state.get("label"),
-        "state": state,
+        # per-page bookkeeping (image references, normalization records) stays server-side
+        "state": {k: v for k, v in state.items() if k not in ("page_images", "normalized")},
         "pages": state.get("pages", []),
+        "page_count": len(_page_names(state)),
         "missing_images": missing_images,
         "missing_pagexml": missing_pagexml,
         "file_grps": state.get("file_grps", {}),
+    }
+    # ?pages=0: the client lists pages through /workspaces/<id>/pages instead
+    if request.args.get("pages") in ("0", "false"):
+        out.pop("pages")
+        out["state"] = {k: v for k, v in out["state"].items() if k not in ("pages", "images")}
+    return jsonify(out)
+
+
+def _page_names(state: Dict) -> List[str]:
+    """
+    PAGE basenames of a workspace: the ones the METS requires (required_pagexml)
+    first, then uploaded pages the METS does not list.
+    """
+    names = [Path(n).name for n in state.get("required_pagexml", [])]
+    seen = set(names)
+    for n in state.get("pages", []):
+        if n not in seen:
+            seen.add(n)
+            names.append(n)
+    return names
+
+
+def _page_meta_index(paths: Dict[str, Path], files: Dict[str, Path]) -> Dict[str, Dict]:
+    """
+    quick_meta() for the given {name: PAGE file}, cached in <ws>/page_index.json
+    and only recomputed for files whose mtime/size changed.
+    """
+    index_path = paths["base"] / "page_index.json"
+    try:
+        index = json.loads(index_path.read_text(encoding="utf-8"))
+    except Exception:
+        index = {}
+
+    out, changed = {}, False
+    for name, f in files.items():
+        st = f.stat()
+        stamp = [str(f.relative_to(paths["base"])), st.st_mtime_ns, st.st_size]
+        entry = index.get(name)
+        if not entry or entry.get("stamp") != stamp:
+            try:
+                meta = quick_meta(str(f))
+            except Exception:
+                meta = {"image": None, "lines": 0, "transcribed_lines": 0}
+            entry = index[name] = {"stamp": stamp, **meta}
+            changed = True
+        out[name] = entry
+
+    if changed:
+        try:
+            tmp = index_path.with_name(index_path.name + ".tmp")
+            tmp.write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, index_path)
+        except Exception:
+            pass
+    return out
+
+
+@bp_workspace.get("/workspaces/<ws_id>/pages")
+def list_pages(ws_id: str):
+    """
+    One slice of a workspace's pages, for lazily built page lists.
+    Query:
+      offset=0, limit=100 (max 500)
+      has_image=0|1, has_page=0|1, transcribed=0|1   (optional filters)
+    Response:
+      {
+        workspace_id, total, unfiltered_total, offset, limit, next_offset,   # next_offset: null at the end
+        pages: [{name, has_page, image, has_image, lines, transcribed_lines, transcribed}]
+      }
+    Only the returned slice is scanned unless has_image/transcribed filters are given;
+    per-page results are cached by file mtime.
+    """
+    ws_id = _safe_id(ws_id)
+    base = (ROOT / ws_id).resolve()
+    if not base.is_dir():
+        abort(404, description="workspace not found")
+    offset = int_arg("offset", 0)
+    limit = int_arg("limit", PAGE_LIST_DEFAULT, 1, PAGE_LIST_MAX)
+    filters = {k: flag_arg(k) for k in ("has_image", "has_page", "transcribed")}
+
+    paths = _ws_paths(ws_id)
+    state = _load_state(paths)
+    names = _page_names(state)
+
+    # One directory listing each instead of a stat per page
+    files: Dict[str, Path] = {q.name: q for q in paths["pages"].glob("*.xml")}
+    files.update({q.name: q for q in paths["norm"].glob("*.xml")})
+    have_stems = {_lower_stem(q.name) for q in paths["images"].glob("*") if q.is_file()}
+
+    def record(name: str, meta: Optional[Dict]) -> Dict:
+        image = Path(meta["image"]).name if meta and meta.get("image") else None
+        done = meta["transcribed_lines"] if meta else 0
+        return {
+            "name": name,
+            "has_page": name in files,
+            "image": image,
+            "has_image": bool(image) and _lower_stem(image) in have_stems,
+            "lines": meta["lines"] if meta else 0,
+            "transcribed_lines": done,
+            "transcribed": done > 0,
+        }
+
+    if filters["has_page"] is not None:
+        names = [n for n in names if (n in files) == filters["has_page"]]
+
+    if filters["has_image"] is None and filters["transcribed"] is None:
+        total = len(names)
+        window = names[offset:offset + limit]
+        metas = _page_meta_index(paths, {n: files[n] for n in window if n in files})
+        records = [record(n, metas.get(n)) for n in window]
+    else:
+        metas = _page_meta_index(paths, {n: files[n] for n in names if n in files})
+        records = [record(n, metas.get(n)) for n in names]
+        records = [r for r in records
+                   if all(filters[k] is None or r[k] == filters[k] for k in ("has_image", "transcribed"))]
+        total = len(records)
+        records = records[offset:offset + limit]
+
+    next_offset = offset + len(records)
+    return jsonify({
+        "workspace_id": ws_id,
+        "total": total,
+        "unfiltered_total": len(_page_names(state)),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset if next_offset < total else None,
+        "pages": records,
     })
 
 
+def _run_delete(job: Job, ws_id: str, trash: Optional[Path]) -> Dict:
+    """Background part of a delete: remove the files and release the workspace's blobs."""
+    if trash is not None:
+        shutil.rmtree(trash, ignore_errors=True)
+    return {"workspace_id": ws_id, "blob_bytes_freed": release_workspace(ws_id)}
+
+
 @bp_workspace.delete("/workspaces/<ws_id>")
 def delete_workspace(ws_id: str):
+    """
+    Delete a workspace. It disappears at once (its folder is moved to data/workspaces/.trash);
+    the files are removed by a background job. Response 202: {deleted, job_id}.
+    """
     ws_id = _safe_id(ws_id)
     base = (ROOT / ws_id).resolve()
     if ROOT not in base.parents and base != ROOT:
         abort(403, description="invalid workspace base")
 
-    if base.exists():
-        shutil.rmtree(base, ignore_errors=True)
+    trash = None
+    with state_lock(ws_id):
+        if base.exists():
+            TRASH.mkdir(exist_ok=True)
+            trash = TRASH / f"{ws_id}-{uuid.uuid4().hex[:8]}"
+            base.rename(trash)
     remove_workspace(ws_id)
-    return jsonify({"deleted": ws_id})
+    remove_lines(ws_id)
+    delete_suggestions(ws_id)
+    delete_uploads(ws_id)
+    job_id = submit("delete", _run_delete, ws_id, trash, workspace_id=ws_id)
+    return jsonify({"deleted": ws_id, "job_id": job_id}), 202
 
 
 @bp_workspace.post("/workspaces/<ws_id>/label")
 def rename_workspace(ws_id: str):
     """
-    Rename a workspace (update state.json and DB).
+    Rename a workspace (update its state and DB row).
     JSON body: {"label": "..."}
     """
     ws_id = _safe_id(ws_id)
@@ -121,32 +476,38 @@ def rename_workspace(ws_id: str):
         return jsonify(error="label too long"), 400
 
     paths = _ws_paths(ws_id)
-    state = _load_state(paths)
-    state["label"] = label
-    _save_state(paths, state)
+    with _edit_state(paths) as state:
+        state["label"] = label
     record_workspace(ws_id, label=label)
     return jsonify({"workspace_id": ws_id, "label": label})
 
 
-@bp_workspace.get("/workspaces/<ws_id>/download")
-def download_workspace(ws_id: str):
-    ws_id = _safe_id(ws_id)
-    base = (ROOT / ws_id).resolve()
-    if not base.is_dir():
-        abort(404, description="workspace not found")
+def _export_files(ws_id: str):
+    """(PAGE-XML files to export, download name) of a workspace."""
     paths = _ws_paths(ws_id)
 
     # Prefer normalized PAGE-XML if present, else raw pages
     pages_dir = paths["norm"] if paths["norm"].exists() and any(paths["norm"].glob("*.xml")) else paths["pages"]
     files: List[Path] = sorted(pages_dir.glob("*.xml"))
-    if not files:
-        abort(404, description="no PAGE-XML files to download")
 
     # Derive a nicer download name if label exists
     state = _load_state(paths)
     label = state.get("label") or ws_id
     safe_label = "".join(c for c in label if c.isalnum() or c in (" ", "_", "-")).strip().replace(" ", "_")
-    dl_name = f"{safe_label or ws_id}_pagexml.zip"
+    return files, f"{safe_label or ws_id}_pagexml.zip"
+
+
+@bp_workspace.get("/workspaces/<ws_id>/download")
+def download_workspace(ws_id: str):
+    """The PAGE-XML as a ZIP, built in the request (see /export for large workspaces)."""
+    ws_id = _safe_id(ws_id)
+    base = (ROOT / ws_id).resolve()
+    if not base.is_dir():
+        abort(404, description="workspace not found")
+
+    files, dl_name = _export_files(ws_id)
+    if not files:
+        abort(404, description="no PAGE-XML files to download")
 
     buf = io.BytesIO()
     with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
@@ -160,3 +521,40 @@ def download_workspace(ws_id: str):
         as_attachment=True,
         download_name=dl_name
     )
+
+
+def _run_export(job: Job, ws_id: str) -> Dict:
+    files, dl_name = _export_files(ws_id)
+    if not files:
+        raise ValueError("no PAGE-XML files to download")
+    out = job.output_path(".zip")
+    tmp = out.with_name(f".{out.name}.part")
+    try:
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for n, f in enumerate(files, 1):
+                zf.write(f, arcname=f.name)
+                job.progress(n, len(files))
+        os.replace(tmp, out)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return {"filename": dl_name, "files": len(files), "size": out.stat().st_size,
+            "download_url": f"/api/jobs/{job.id}/file"}
+
+
+@bp_workspace.post("/workspaces/<ws_id>/export")
+def export_workspace(ws_id: str):
+    """
+    Build the PAGE-XML ZIP of /download as a background job.
+    Response 202: {job_id, workspace_id, status_url}; when done, the job result holds
+    {filename, files, size, download_url} (GET /api/jobs/<job_id>/file).
+    """
+    ws_id = _safe_id(ws_id)
+    base = (ROOT / ws_id).resolve()
+    if not base.is_dir():
+        abort(404, description="workspace not found")
+    job_id = submit("export", _run_export, ws_id, workspace_id=ws_id, phase="zip")
+    return jsonify({"job_id": job_id, "workspace_id": ws_id, "status_url": f"/api/jobs/{job_id}"}), 202
+
+
+# Reconcile with the folders on disk now and then periodically
+start_reconciler()
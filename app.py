@@ -6,6 +6,8 @@ from api.upload import bp_import
 from api.file import bp_file
 from api.workspace import bp_workspace
 from api.llm import bp_llm
+from api.jobs import bp_jobs
+from api.search import bp_search
 
 
 def create_app():
@@ -23,6 +25,8 @@ def create_app():
     app.register_blueprint(bp_file, url_prefix="/api")
     app.register_blueprint(bp_workspace, url_prefix="/api")
     app.register_blueprint(bp_llm, url_prefix="/api")
+    app.register_blueprint(bp_jobs, url_prefix="/api")
+    app.register_blueprint(bp_search, url_prefix="/api")
 
     @app.get("/")
     def index():
@@ -0,0 +1,236 @@
+"""
+Blob Store
+
+Content-addressed storage for workspace images, shared by all workspaces:
+data/blobs/<aa>/<sha256>. A workspace's images/<name> is a hardlink to its
+blob (a reflink or plain copy where hardlinks are not possible, e.g. across
+filesystems), so importing the same scans into several workspaces stores
+them once, and uploading a known image does not write it again.
+
+References are counted in the `blob_refs` table of data/workspaces.db, one
+row per workspace image. A blob is deleted with its last reference: when its
+workspace is deleted (release_workspace) or the image is replaced under the
+same name.
+
+Never write to a workspace image in place: with hardlinks that would change
+every workspace sharing the blob. All writers go through store_stream() /
+store_file(), which swap directory entries atomically.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+
+from core.db import get_connection
+
+BLOB_ROOT = Path(os.environ.get("BLOB_ROOT", "data/blobs")).resolve()
+COPY_BUFFER = 1024 * 1024
+FICLONE = 0x40049409  # Linux ioctl: share extents (reflink) on btrfs/xfs
+
+# Store and garbage collection must not interleave (single server process)
+_lock = threading.RLock()
+
+
+def init_blobstore():
+    (BLOB_ROOT / "tmp").mkdir(parents=True, exist_ok=True)
+    with get_connection() as con:
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+              sha256 TEXT PRIMARY KEY,
+              size INTEGER NOT NULL,
+              created_at TEXT
+            )
+            """
+        )
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS blob_refs (
+              workspace_id TEXT NOT NULL,
+              name TEXT NOT NULL,
+              sha256 TEXT NOT NULL,
+              PRIMARY KEY (workspace_id, name)
+            )
+            """
+        )
+        con.execute("CREATE INDEX IF NOT EXISTS idx_blob_refs_sha ON blob_refs(sha256)")
+
+
+def blob_path(digest: str) -> Path:
+    return BLOB_ROOT / digest[:2] / digest
+
+
+def get_blob(digest: str) -> Optional[Dict]:
+    """{sha256, size, created_at} if the blob is stored (and its file exists), else None."""
+    if not digest or len(digest) != 64:
+        return None
+    with get_connection() as con:
+        row = con.execute("SELECT * FROM blobs WHERE sha256=?", (digest.lower(),)).fetchone()
+    if not row or not blob_path(row["sha256"]).is_file():
+        return None
+    return dict(row)
+
+
+def _hash_file(path: Path) -> Tuple[str, int]:
+    h = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(COPY_BUFFER), b""):
+            h.update(chunk)
+            size += len(chunk)
+    return h.hexdigest(), size
+
+
+def _clone(src: Path, dst: Path) -> None:
+    """dst becomes src's content: hardlink, else reflink, else copy. dst must not exist."""
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        try:
+            import fcntl
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+            return
+        except (ImportError, OSError):
+            shutil.copyfileobj(fin, fout, COPY_BUFFER)
+
+
+def _same_file(a: Path, b: Path) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def linked_blob(ws_id: str, name: str, path: Path) -> Optional[str]:
+    """The digest of the blob that images/<name> of ws_id is a link to, or None if it is not one."""
+    with get_connection() as con:
+        row = con.execute("SELECT sha256 FROM blob_refs WHERE workspace_id=? AND name=?", (ws_id, name)).fetchone()
+    return row["sha256"] if row and _same_file(blob_path(row["sha256"]), path) else None
+
+
+def _link_into(blob: Path, dst: Path) -> None:
+    """Atomically point dst at the blob."""
+    if _same_file(blob, dst):
+        return
+    tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex[:8]}.link")
+    try:
+        _clone(blob, tmp)
+        os.replace(tmp, dst)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _set_ref(ws_id: str, name: str, digest: str) -> Optional[str]:
+    """Point (ws_id, name) at digest; returns the digest it referenced before (if different)."""
+    with get_connection() as con:
+        row = con.execute("SELECT sha256 FROM blob_refs WHERE workspace_id=? AND name=?", (ws_id, name)).fetchone()
+        con.execute(
+            """
+            INSERT INTO blob_refs (workspace_id, name, sha256) VALUES (?, ?, ?)
+            ON CONFLICT(workspace_id, name) DO UPDATE SET sha256=excluded.sha256
+            """,
+            (ws_id, name, digest)
+        )
+    return row["sha256"] if row and row["sha256"] != digest else None
+
+
+def _collect(digests: Iterable[str]) -> int:
+    """Delete blobs without references; returns the bytes freed."""
+    freed = 0
+    with _lock, get_connection() as con:
+        for digest in set(d for d in digests if d):
+            if con.execute("SELECT 1 FROM blob_refs WHERE sha256=? LIMIT 1", (digest,)).fetchone():
+                continue
+            row = con.execute("SELECT size FROM blobs WHERE sha256=?", (digest,)).fetchone()
+            con.execute("DELETE FROM blobs WHERE sha256=?", (digest,))
+            blob_path(digest).unlink(missing_ok=True)
+            freed += row["size"] if row else 0
+    return freed
+
+
+def store_file(src: Path, ws_id: str, name: str, dst: Path, digest: Optional[str] = None) -> Dict:
+    """
+    Put the file at src into the store and make dst (images/<name> of ws_id) point at it.
+    src is consumed (moved into the store or dropped as a duplicate) unless it is dst itself,
+    which is how files already in a workspace are adopted.
+    Returns {"sha256", "size", "deduplicated"} (deduplicated: a separate copy was dropped).
+    """
+    if digest is None:
+        digest, size = _hash_file(src)
+    else:
+        size = src.stat().st_size
+    blob = blob_path(digest)
+    same = src.resolve() == dst.resolve()
+    with _lock:
+        known = get_blob(digest) is not None
+        deduplicated = known and not _same_file(src, blob)
+        if known:
+            if not same:
+                src.unlink(missing_ok=True)
+        else:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp = BLOB_ROOT / "tmp" / uuid.uuid4().hex
+            try:
+                if same:
+                    _clone(src, tmp)
+                else:
+                    shutil.move(str(src), str(tmp))  # a rename on the same filesystem
+                os.replace(tmp, blob)
+            finally:
+                tmp.unlink(missing_ok=True)
+            with get_connection() as con:
+                con.execute("INSERT OR REPLACE INTO blobs (sha256, size, created_at) VALUES (?, ?, ?)",
+                            (digest, size, datetime.utcnow().isoformat()))
+        _link_into(blob, dst)
+        previous = _set_ref(ws_id, name, digest)
+    _collect([previous])
+    return {"sha256": digest, "size": size, "deduplicated": deduplicated}
+
+
+def store_stream(stream: BinaryIO, ws_id: str, name: str, dst: Path) -> Dict:
+    """Like store_file(), for an upload stream: hashed while it is spooled to the store's tmp/."""
+    tmp = BLOB_ROOT / "tmp" / uuid.uuid4().hex
+    h = hashlib.sha256()
+    try:
+        with open(tmp, "wb") as out:
+            for chunk in iter(lambda: stream.read(COPY_BUFFER), b""):
+                h.update(chunk)
+                out.write(chunk)
+        return store_file(tmp, ws_id, name, dst, digest=h.hexdigest())
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def link_blob(digest: str, ws_id: str, name: str, dst: Path) -> bool:
+    """Point dst at an already stored blob without any upload; False if the blob is unknown."""
+    with _lock:
+        if get_blob(digest) is None:
+            return False
+        _link_into(blob_path(digest.lower()), dst)
+        previous = _set_ref(ws_id, name, digest.lower())
+    _collect([previous])
+    return True
+
+
+def release_workspace(ws_id: str) -> int:
+    """Drop all references of a workspace; deletes blobs nobody else uses. Returns the bytes freed."""
+    with _lock:
+        with get_connection() as con:
+            digests = [r["sha256"] for r in con.execute(
+                "SELECT DISTINCT sha256 FROM blob_refs WHERE workspace_id=?", (ws_id,))]
+            con.execute("DELETE FROM blob_refs WHERE workspace_id=?", (ws_id,))
+        return _collect(digests)
+
+
+# Ensure the tables exist on import
+init_blobstore()
@@ -1,14 +1,27 @@
 from __future__ import annotations
 
+import atexit
+import json
+import os
+import re
 import sqlite3
+import threading
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 
 DB_PATH = Path("data/workspaces.db").resolve()
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
+# Edits bump updated_at through touch_workspace(); the bumps of one interval go out in one write
+TOUCH_INTERVAL = float(os.getenv("DB_TOUCH_INTERVAL", "2.0"))
+
+_local = threading.local()
+_touches: Dict[str, str] = {}
+_touch_lock = threading.Lock()
+_touch_timer: Optional[threading.Timer] = None
+
 
 @dataclass
 class WorkspaceRow:
@@ -23,14 +36,99 @@ class WorkspaceRow:
         return asdict(self)
 
 
-def _connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+def get_connection() -> sqlite3.Connection:
+    """
+    This thread's connection to data/workspaces.db, opened on first use and then reused.
+    Use it as `with get_connection() as con:` (commits, or rolls back on error); never close it.
+    All modules storing tables in workspaces.db share it.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")  # safe with WAL; no fsync per commit
+        _local.conn = conn
     return conn
 
 
+# Workspace state (formerly state.json), one table per collection:
+#   ws_pages      registered PAGE-XML, in order, with the image each one references
+#   ws_images     registered images
+#   ws_required   files the METS asks for (kind 'image' | 'pagexml'), in order
+#   ws_file_grps  METS fileGrps offered per role ('images' | 'pagexml') and the chosen one
+#   ws_normalized source records of the last normalization (see core/normalize.py)
+# Stems are lowercased basenames without extension; missing-file checks compare them.
+STATE_TABLES = ("ws_pages", "ws_images", "ws_required", "ws_file_grps", "ws_normalized")
+
+_STATE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS ws_pages (
+      workspace_id TEXT NOT NULL,
+      name TEXT NOT NULL,
+      position INTEGER NOT NULL,
+      image TEXT,
+      image_stem TEXT,
+      image_known INTEGER NOT NULL DEFAULT 0,
+      PRIMARY KEY (workspace_id, name)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_ws_pages_order ON ws_pages(workspace_id, position)",
+    "CREATE INDEX IF NOT EXISTS idx_ws_pages_image ON ws_pages(workspace_id, image_stem)",
+    """
+    CREATE TABLE IF NOT EXISTS ws_images (
+      workspace_id TEXT NOT NULL,
+      name TEXT NOT NULL,
+      position INTEGER NOT NULL,
+      stem TEXT NOT NULL,
+      PRIMARY KEY (workspace_id, name)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_ws_images_stem ON ws_images(workspace_id, stem)",
+    """
+    CREATE TABLE IF NOT EXISTS ws_required (
+      workspace_id TEXT NOT NULL,
+      kind TEXT NOT NULL,
+      name TEXT NOT NULL,
+      position INTEGER NOT NULL,
+      stem TEXT NOT NULL,
+      PRIMARY KEY (workspace_id, kind, name)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_ws_required_stem ON ws_required(workspace_id, kind, stem)",
+    """
+    CREATE TABLE IF NOT EXISTS ws_file_grps (
+      workspace_id TEXT NOT NULL,
+      role TEXT NOT NULL,
+      use TEXT NOT NULL,
+      position INTEGER,
+      chosen INTEGER NOT NULL DEFAULT 0,
+      PRIMARY KEY (workspace_id, role, use)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ws_normalized (
+      workspace_id TEXT NOT NULL,
+      name TEXT NOT NULL,
+      sha256 TEXT,
+      mtime_ns INTEGER,
+      size INTEGER,
+      mode TEXT,
+      PRIMARY KEY (workspace_id, name)
+    )
+    """,
+)
+
+# Columns added to `workspaces` after the first release
+_WORKSPACE_COLUMNS = {
+    "mets": "TEXT",
+    "state_extra": "TEXT",  # JSON of state keys without a table of their own
+    "has_state": "INTEGER DEFAULT 0",
+}
+
+
 def init_db():
-    with _connect() as con:
+    with get_connection() as con:
+        con.execute("PRAGMA journal_mode=WAL")
         con.execute(
             """
             CREATE TABLE IF NOT EXISTS workspaces (
@@ -43,68 +141,227 @@ def init_db():
             )
             """
         )
-        con.commit()
+        have = {r["name"] for r in con.execute("PRAGMA table_info(workspaces)")}
+        for col, decl in _WORKSPACE_COLUMNS.items():
+            if col not in have:
+                con.execute(f"ALTER TABLE workspaces ADD COLUMN {col} {decl}")
+        for stmt in _STATE_SCHEMA:
+            con.execute(stmt)
+        # Listing: one index per sort key (id breaks ties, see query_workspaces). Timestamps are
+        # ISO strings compared as text; rows from before that used "YYYY-MM-DD HH:MM:SS".
+        for col in ("created_at", "updated_at"):
+            con.execute(f"UPDATE workspaces SET {col}=replace({col}, ' ', 'T') WHERE {col} LIKE '____-__-__ %'")
+        con.execute("UPDATE workspaces SET label='Workspace ' || substr(id, 1, 8) WHERE label IS NULL")
+        for name, cols in _LIST_INDEXES.items():
+            con.execute(f"CREATE INDEX IF NOT EXISTS {name} ON workspaces({cols})")
+        _init_label_search(con)
+
+
+_LIST_INDEXES = {
+    "idx_workspaces_updated": "updated_at, id",
+    "idx_workspaces_created": "created_at, id",
+    "idx_workspaces_label": "label COLLATE NOCASE, id",
+    "idx_workspaces_pages": "page_count, id",
+}
+
+
+def _init_label_search(con: sqlite3.Connection) -> None:
+    """FTS5 index over workspace labels (and ids), kept current by triggers."""
+    exists = con.execute("SELECT 1 FROM sqlite_master WHERE name='workspaces_fts'").fetchone()
+    con.execute("CREATE VIRTUAL TABLE IF NOT EXISTS workspaces_fts USING fts5(label, id)")
+    if not exists:
+        con.execute("INSERT INTO workspaces_fts (rowid, label, id) SELECT rowid, label, id FROM workspaces")
+    con.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS workspaces_fts_insert AFTER INSERT ON workspaces BEGIN
+          INSERT INTO workspaces_fts (rowid, label, id) VALUES (new.rowid, new.label, new.id);
+        END
+        """
+    )
+    con.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS workspaces_fts_update AFTER UPDATE OF label ON workspaces BEGIN
+          UPDATE workspaces_fts SET label=new.label WHERE rowid=old.rowid;
+        END
+        """
+    )
+    con.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS workspaces_fts_delete AFTER DELETE ON workspaces BEGIN
+          DELETE FROM workspaces_fts WHERE rowid=old.rowid;
+        END
+        """
+    )
+
+
+_UPSERT_WORKSPACE = """
+    INSERT INTO workspaces (id, label, created_at, updated_at, page_count, has_mets)
+    VALUES (:id, COALESCE(:label, :default_label), :now, :now, COALESCE(:page_count, 0), COALESCE(:has_mets, 0))
+    ON CONFLICT(id) DO UPDATE SET
+      label      = COALESCE(:label, workspaces.label, :default_label),
+      updated_at = CASE WHEN :bump THEN :now ELSE workspaces.updated_at END,
+      page_count = COALESCE(:page_count, workspaces.page_count),
+      has_mets   = COALESCE(:has_mets, workspaces.has_mets)
+"""
+
+
+def _upsert_params(ws_id: str, now: str, label: Optional[str] = None, page_count: Optional[int] = None,
+                   has_mets: Optional[bool] = None, bump: bool = True) -> Dict:
+    return {
+        "id": ws_id,
+        "label": label or None,
+        # Friendly default if the row does not exist yet (or never got a label)
+        "default_label": f"Workspace {ws_id[:8]}",
+        "now": now,
+        "page_count": page_count,
+        "has_mets": None if has_mets is None else int(bool(has_mets)),
+        "bump": int(bump),
+    }
 
 
 def record_workspace(ws_id: str, *, label: Optional[str] = None, page_count: Optional[int] = None,
                      has_mets: Optional[bool] = None, bump_updated: bool = True) -> None:
     """
-    Insert or update a workspace row. Only provided fields are updated.
+    Insert or update a workspace row (one statement). Only provided fields are updated.
     """
     if not ws_id:
         return
-    init_db()
-    now = datetime.utcnow().isoformat()
-    existing = get_workspace(ws_id)
-    page_count_val = page_count if page_count is not None else (existing["page_count"] if existing else 0)
-    if has_mets is True:
-        has_mets_val = 1
-    elif has_mets is False:
-        has_mets_val = 0
-    else:
-        has_mets_val = existing["has_mets"] if existing else 0
-    # Use a friendly default label if none provided and row does not exist yet.
-    default_label = label or (existing["label"] if existing else f"Workspace {ws_id[:8]}")
-    updated_at_val = now if bump_updated or not existing else existing["updated_at"]
-    with _connect() as con:
-        con.execute(
-            """
-            INSERT INTO workspaces (id, label, created_at, updated_at, page_count, has_mets)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ON CONFLICT(id) DO UPDATE SET
-              label       = COALESCE(excluded.label, workspaces.label),
-              updated_at  = COALESCE(excluded.updated_at, workspaces.updated_at),
-              page_count  = COALESCE(excluded.page_count, workspaces.page_count),
-              has_mets    = COALESCE(excluded.has_mets, workspaces.has_mets)
-            """,
-            (
-                ws_id,
-                default_label,
-                now,
-                updated_at_val,
-                page_count_val,
-                has_mets_val,
-            )
-        )
-        con.commit()
+    if bump_updated:
+        with _touch_lock:
+            _touches.pop(ws_id, None)  # superseded by this bump
+    with get_connection() as con:
+        con.execute(_UPSERT_WORKSPACE, _upsert_params(ws_id, datetime.utcnow().isoformat(), label=label,
+                                                      page_count=page_count, has_mets=has_mets,
+                                                      bump=bump_updated))
+
+
+def touch_workspace(ws_id: str) -> None:
+    """
+    Mark a workspace as just edited. The updated_at bump is deferred and coalesced: all
+    touches of TOUCH_INTERVAL seconds are written in one transaction (see flush_touches).
+    """
+    global _touch_timer
+    if not ws_id:
+        return
+    with _touch_lock:
+        _touches[ws_id] = datetime.utcnow().isoformat()
+        if _touch_timer is None:
+            _touch_timer = threading.Timer(TOUCH_INTERVAL, flush_touches)
+            _touch_timer.daemon = True
+            _touch_timer.start()
+
+
+def flush_touches() -> None:
+    """Write pending updated_at bumps now."""
+    global _touch_timer
+    with _touch_lock:
+        pending = list(_touches.items())
+        _touches.clear()
+        if _touch_timer is not None and _touch_timer is not threading.current_thread():
+            _touch_timer.cancel()
+        _touch_timer = None
+    if not pending:
+        return
+    with get_connection() as con:
+        con.executemany(_UPSERT_WORKSPACE, [_upsert_params(ws_id, now) for ws_id, now in pending])
 
 
 def list_workspaces() -> List[Dict]:
-    init_db()
-    with _connect() as con:
-        rows = con.execute(
-            """
-            SELECT id, label, created_at, updated_at, page_count, has_mets
-            FROM workspaces
-            ORDER BY datetime(updated_at) DESC
-            """
-        ).fetchall()
-    return [WorkspaceRow(**dict(r)).to_dict() for r in rows]
+    """All workspaces, most recently updated first."""
+    return query_workspaces()["workspaces"]
+
+
+# Sort keys of query_workspaces -> ORDER BY expression (labels sort case-insensitively)
+WORKSPACE_SORTS = {
+    "updated_at": "updated_at",
+    "created_at": "created_at",
+    "label": "label COLLATE NOCASE",
+    "page_count": "page_count",
+}
+
+
+def _fts_query(text: str) -> Optional[str]:
+    """Prefix match on every word: 'old pri' -> '"old"* "pri"*' (None if there are no words)."""
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{w}"*' for w in words) if words else None
+
+
+def query_workspaces(*, limit: Optional[int] = None, cursor: Optional[list] = None,
+                     q: Optional[str] = None, prefix: Optional[str] = None, has_mets: Optional[bool] = None,
+                     updated_after: Optional[str] = None, updated_before: Optional[str] = None,
+                     created_after: Optional[str] = None, created_before: Optional[str] = None,
+                     sort: str = "updated_at", descending: bool = True) -> Dict:
+    """
+    One page of the workspace list (keyset pagination; every filter and sort key is indexed).
+
+    q: full-text search in labels and ids (word prefixes); prefix: label prefix (case-insensitive).
+    updated_*/created_*: ISO timestamps (or dates), after is inclusive, before exclusive.
+    cursor: the next_cursor of the previous page ([sort value, id]).
+    Returns {"workspaces": [...], "total": matching rows, "unfiltered_total": all rows,
+             "next_cursor": [...] or None on the last page}.
+    """
+    flush_touches()  # so recently edited workspaces sort first
+    if sort not in WORKSPACE_SORTS:
+        raise ValueError(f"unknown sort key: {sort}")
+    col = WORKSPACE_SORTS[sort]
+
+    where, args = [], []
+    match = _fts_query(q or "")
+    if q and match is None:
+        where.append("0")
+    elif match:
+        where.append("rowid IN (SELECT rowid FROM workspaces_fts WHERE workspaces_fts MATCH ?)")
+        args.append(match)
+    if prefix:
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        where.append("label LIKE ? ESCAPE '\\'")
+        args.append(escaped + "%")
+    if has_mets is not None:
+        where.append("has_mets=?")
+        args.append(int(has_mets))
+    for column, op, value in (("updated_at", ">=", updated_after), ("updated_at", "<", updated_before),
+                              ("created_at", ">=", created_after), ("created_at", "<", created_before)):
+        if value:
+            where.append(f"{column} {op} ?")
+            args.append(value)
+
+    filtered = " AND ".join(where) or "1"
+    with get_connection() as con:
+        total = con.execute(f"SELECT COUNT(*) FROM workspaces WHERE {filtered}", args).fetchone()[0]
+        unfiltered = total if not where else con.execute("SELECT COUNT(*) FROM workspaces").fetchone()[0]
+
+        page_where, page_args = filtered, list(args)
+        if cursor:
+            op = "<" if descending else ">"
+            # The leading inclusive bound lets SQLite seek in the sort index instead of scanning
+            page_where += f" AND {col} {op}= ? AND ({col} {op} ? OR id {op} ?)"
+            page_args += [cursor[0], cursor[0], cursor[1]]
+        direction = "DESC" if descending else "ASC"
+        sql = (f"SELECT id, label, created_at, updated_at, page_count, has_mets FROM workspaces "
+               f"WHERE {page_where} ORDER BY {col} {direction}, id {direction}")
+        if limit is not None:
+            sql += " LIMIT ?"
+            page_args.append(int(limit) + 1)  # one more tells whether there is a next page
+        rows = con.execute(sql, page_args).fetchall()
+
+    more = limit is not None and len(rows) > limit
+    rows = rows[:limit] if limit is not None else rows
+    next_cursor = [rows[-1][sort], rows[-1]["id"]] if more and rows else None
+    return {
+        "workspaces": [WorkspaceRow(**dict(r)).to_dict() for r in rows],
+        "total": total,
+        "unfiltered_total": unfiltered,
+        "next_cursor": next_cursor,
+    }
+
+
+def workspace_ids() -> List[str]:
+    with get_connection() as con:
+        return [r["id"] for r in con.execute("SELECT id FROM workspaces")]
 
 
 def get_workspace(ws_id: str) -> Optional[Dict]:
-    init_db()
-    with _connect() as con:
+    with get_connection() as con:
         row = con.execute(
             "SELECT id, label, created_at, updated_at, page_count, has_mets FROM workspaces WHERE id=?",
             (ws_id,)
@@ -113,11 +370,202 @@ def get_workspace(ws_id: str) -> Optional[Dict]:
 
 
 def remove_workspace(ws_id: str) -> None:
-    init_db()
-    with _connect() as con:
+    with _touch_lock:
+        _touches.pop(ws_id, None)  # a late bump must not bring the row back
+    with get_connection() as con:
         con.execute("DELETE FROM workspaces WHERE id=?", (ws_id,))
+        for table in STATE_TABLES:
+            con.execute(f"DELETE FROM {table} WHERE workspace_id=?", (ws_id,))
+
+
+# ---------- workspace state ----------
+
+_STATE_KEYS = ("workspace_id", "label", "mets", "pages", "images", "page_images", "required_images",
+               "required_pagexml", "file_grps", "normalized")
+_FILE_GRP_ROLES = (("images", "image"), ("pagexml", "pagexml"))  # (list key, "chosen" key)
+
+
+def _stem(name: Optional[str]) -> Optional[str]:
+    return Path(name).stem.lower() if name else None
+
+
+def load_workspace_state(ws_id: str) -> Optional[Dict]:
+    """
+    The workspace state as a dict (same shape as the former state.json):
+      {workspace_id, label, mets, pages, images, page_images, required_images,
+       required_pagexml, file_grps, normalized, ...extra}
+    None if no state was ever saved for ws_id.
+    """
+    with get_connection() as con:
+        ws = con.execute("SELECT label, mets, state_extra, has_state FROM workspaces WHERE id=?", (ws_id,)).fetchone()
+        if not ws or not ws["has_state"]:
+            return None
+        pages = con.execute(
+            "SELECT name, image, image_known FROM ws_pages WHERE workspace_id=? ORDER BY position", (ws_id,)
+        ).fetchall()
+        images = con.execute(
+            "SELECT name FROM ws_images WHERE workspace_id=? ORDER BY position", (ws_id,)
+        ).fetchall()
+        required = con.execute(
+            "SELECT kind, name FROM ws_required WHERE workspace_id=? ORDER BY kind, position", (ws_id,)
+        ).fetchall()
+        grps = con.execute(
+            "SELECT role, use, position, chosen FROM ws_file_grps WHERE workspace_id=? ORDER BY role, position",
+            (ws_id,)
+        ).fetchall()
+        normalized = con.execute(
+            "SELECT name, sha256, mtime_ns, size, mode FROM ws_normalized WHERE workspace_id=?", (ws_id,)
+        ).fetchall()
+
+    file_grps: Dict = {}
+    if grps or ws["mets"]:
+        file_grps = {role: [] for role, _ in _FILE_GRP_ROLES}
+        file_grps["chosen"] = {key: None for _, key in _FILE_GRP_ROLES}
+        chosen_key = dict(_FILE_GRP_ROLES)
+        for r in grps:
+            if r["position"] is not None:
+                file_grps.setdefault(r["role"], []).append(r["use"])
+            if r["chosen"]:
+                file_grps["chosen"][chosen_key.get(r["role"], r["role"])] = r["use"]
+
+    state = {
+        **json.loads(ws["state_extra"] or "{}"),
+        "workspace_id": ws_id,
+        "label": ws["label"],
+        "mets": ws["mets"],
+        "pages": [r["name"] for r in pages],
+        "images": [r["name"] for r in images],
+        "page_images": {r["name"]: r["image"] for r in pages if r["image_known"]},
+        "required_images": [r["name"] for r in required if r["kind"] == "image"],
+        "required_pagexml": [r["name"] for r in required if r["kind"] == "pagexml"],
+        "file_grps": file_grps,
+        "normalized": {r["name"]: {k: r[k] for k in ("sha256", "mtime_ns", "size", "mode") if r[k] is not None}
+                       for r in normalized},
+    }
+    return state
+
+
+def _replace_rows(con: sqlite3.Connection, table: str, ws_id: str, where: str, cols: Iterable[str],
+                  rows: List[tuple]) -> None:
+    con.execute(f"DELETE FROM {table} WHERE workspace_id=?{where}", (ws_id,))
+    cols = list(cols)
+    con.executemany(
+        f"INSERT OR IGNORE INTO {table} (workspace_id, {', '.join(cols)}) VALUES (?{', ?' * len(cols)})",
+        [(ws_id, *row) for row in rows]
+    )
+
+
+def save_workspace_state(ws_id: str, state: Dict, previous: Optional[Dict] = None) -> bool:
+    """
+    Persist `state` (see load_workspace_state) in one transaction, rewriting only the
+    collections that differ from `previous` (the currently stored state, if known).
+    Returns False (and writes nothing) if nothing changed.
+    """
+    def changed(*keys) -> bool:
+        return previous is None or any(state.get(k) != previous.get(k) for k in keys)
+
+    extra = {k: v for k, v in state.items() if k not in _STATE_KEYS}
+    if previous is not None and not changed(*_STATE_KEYS) and extra == {
+            k: v for k, v in previous.items() if k not in _STATE_KEYS}:
+        return False
+
+    now = datetime.utcnow().isoformat()
+    con = get_connection()
+    try:
+        con.execute("BEGIN IMMEDIATE")
+        con.execute(
+            """
+            INSERT INTO workspaces (id, label, created_at, updated_at, mets, state_extra, has_state)
+            VALUES (?, COALESCE(?, 'Workspace ' || substr(?, 1, 8)), ?, ?, ?, ?, 1)
+            ON CONFLICT(id) DO UPDATE SET
+              label = COALESCE(excluded.label, workspaces.label),
+              mets = excluded.mets,
+              state_extra = excluded.state_extra,
+              has_state = 1
+            """,
+            (ws_id, state.get("label"), ws_id, now, now, state.get("mets"), json.dumps(extra, ensure_ascii=False))
+        )
+        if changed("pages", "page_images"):
+            known = state.get("page_images") or {}
+            _replace_rows(con, "ws_pages", ws_id, "", ("name", "position", "image", "image_stem", "image_known"), [
+                (name, i, known.get(name), _stem(known.get(name)), int(name in known))
+                for i, name in enumerate(state.get("pages") or [])
+            ])
+        if changed("images"):
+            _replace_rows(con, "ws_images", ws_id, "", ("name", "position", "stem"),
+                          [(name, i, _stem(name)) for i, name in enumerate(state.get("images") or [])])
+        for kind, key in (("image", "required_images"), ("pagexml", "required_pagexml")):
+            if changed(key):
+                _replace_rows(con, "ws_required", ws_id, f" AND kind='{kind}'", ("kind", "name", "position", "stem"),
+                              [(kind, name, i, _stem(name)) for i, name in enumerate(state.get(key) or [])])
+        if changed("file_grps"):
+            grps = state.get("file_grps") or {}
+            chosen = grps.get("chosen") or {}
+            rows = []
+            for role, key in _FILE_GRP_ROLES:
+                uses = list(grps.get(role) or [])
+                rows += [(role, use, i, int(use == chosen.get(key))) for i, use in enumerate(uses)]
+                if chosen.get(key) and chosen[key] not in uses:
+                    rows.append((role, chosen[key], None, 1))
+            _replace_rows(con, "ws_file_grps", ws_id, "", ("role", "use", "position", "chosen"), rows)
+        if changed("normalized"):
+            _replace_rows(con, "ws_normalized", ws_id, "", ("name", "sha256", "mtime_ns", "size", "mode"), [
+                (name, r.get("sha256"), r.get("mtime_ns"), r.get("size"), r.get("mode"))
+                for name, r in (state.get("normalized") or {}).items()
+            ])
         con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+    return True
+
+
+def pages_with_unknown_image(ws_id: str) -> List[str]:
+    """Registered pages whose referenced image has not been read yet."""
+    with get_connection() as con:
+        rows = con.execute(
+            "SELECT name FROM ws_pages WHERE workspace_id=? AND image_known=0 ORDER BY position", (ws_id,)
+        ).fetchall()
+    return [r["name"] for r in rows]
+
+
+def missing_images(ws_id: str) -> List[str]:
+    """
+    Images required by the METS or referenced by a registered page that have no registered
+    image with the same stem (extension-agnostic). One name per stem, ordered by stem.
+    """
+    with get_connection() as con:
+        rows = con.execute(
+            """
+            WITH need(name, stem) AS (
+              SELECT name, stem FROM ws_required WHERE workspace_id=:ws AND kind='image'
+              UNION ALL
+              SELECT image, image_stem FROM ws_pages WHERE workspace_id=:ws AND image IS NOT NULL
+            )
+            SELECT MIN(name) AS name FROM need
+            WHERE NOT EXISTS (SELECT 1 FROM ws_images i WHERE i.workspace_id=:ws AND i.stem=need.stem)
+            GROUP BY stem ORDER BY stem
+            """,
+            {"ws": ws_id}
+        ).fetchall()
+    return [r["name"] for r in rows]
+
+
+def missing_pagexml(ws_id: str) -> List[str]:
+    """PAGE-XML required by the METS that is not registered."""
+    with get_connection() as con:
+        rows = con.execute(
+            """
+            SELECT r.name FROM ws_required r
+            WHERE r.workspace_id=? AND r.kind='pagexml'
+              AND NOT EXISTS (SELECT 1 FROM ws_pages p WHERE p.workspace_id=r.workspace_id AND p.name=r.name)
+            ORDER BY r.name
+            """,
+            (ws_id,)
+        ).fetchall()
+    return [r["name"] for r in rows]
 
 
-# Ensure the table exists on import
+# Schema setup, once per process
 init_db()
+atexit.register(flush_touches)
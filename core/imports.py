@@ -0,0 +1,126 @@
+"""
+Archive Imports
+
+Extraction of ZIP / OCRD-ZIP (BagIt) archives into a workspace (see
+/api/import-zip, which runs it as a background job, core/jobs.py).
+"""
+
+from __future__ import annotations
+
+import posixpath
+import shutil
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterable, Optional, Set
+
+IMAGE_EXTS = (".tif", ".tiff", ".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif", ".jp2")
+COPY_BUFFER = 1024 * 1024
+
+
+def _safe_member(name: str) -> bool:
+    parts = name.replace("\\", "/").split("/")
+    if name.startswith("/") or ".." in parts:
+        return False
+    return not any(part.startswith(".") or part == "__MACOSX" for part in parts)
+
+
+def _payload_root(names: Iterable[str]) -> str:
+    """
+    Archive prefix that holds the workspace:
+      "<bag>/data/" or "data/" for BagIt (OCRD-ZIP), "<top>/" if everything sits in one folder, else "".
+    """
+    names = list(names)
+    for name in names:
+        if posixpath.basename(name) == "bagit.txt":
+            return posixpath.dirname(name) + "/data/" if "/" in name else "data/"
+    tops = {n.split("/", 1)[0] for n in names}
+    if len(tops) == 1 and all("/" in n for n in names):
+        return tops.pop() + "/"
+    return ""
+
+
+def _is_page_xml(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> bool:
+    with zf.open(info) as fh:
+        head = fh.read(4096)
+    return b"PcGts" in head
+
+
+def _copy_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo, dst: Path) -> None:
+    tmp = dst.with_name(dst.name + ".part")
+    with zf.open(info) as src, open(tmp, "wb") as out:
+        shutil.copyfileobj(src, out, COPY_BUFFER)
+    tmp.replace(dst)
+
+
+def extract_archive(zip_path: Path, dirs: Dict[str, Path],
+                    select: Optional[Callable[[Path], Iterable[str]]] = None,
+                    progress: Optional[Callable[[int, int], None]] = None,
+                    store_image: Optional[Callable[[BinaryIO, str], object]] = None) -> Dict:
+    """
+    Stream a ZIP / OCRD-ZIP into a workspace, one entry at a time.
+
+    dirs: {"orig", "pages", "images"} target folders. The first mets.xml (closest
+    to the payload root) goes to orig/mets.xml; PAGE-XML and images are stored
+    flat by basename, as with the upload endpoints.
+
+    select: called with the extracted METS path; returns the hrefs (relative to
+    the METS) to import. Without a METS, or without select, every PAGE-XML and
+    image in the archive is imported.
+
+    store_image: called with (member stream, basename) instead of copying an image
+    into dirs["images"] (e.g. to put it into the blob store).
+
+    Returns {"mets": bool, "pages": [...], "images": [...], "skipped": [...]}.
+    """
+    out: Dict = {"mets": False, "pages": [], "images": [], "skipped": []}
+    with zipfile.ZipFile(zip_path) as zf:
+        infos = [i for i in zf.infolist() if not i.is_dir() and _safe_member(i.filename)]
+        root = _payload_root(i.filename for i in infos)
+        infos = [i for i in infos if i.filename.startswith(root)]
+        total = len(infos)
+
+        mets_info = min((i for i in infos if posixpath.basename(i.filename).lower() == "mets.xml"),
+                        key=lambda i: i.filename.count("/"), default=None)
+        wanted_paths: Optional[Set[str]] = None
+        wanted_names: Set[str] = set()
+        if mets_info is not None:
+            _copy_member(zf, mets_info, dirs["orig"] / "mets.xml")
+            out["mets"] = True
+            if select is not None:
+                base = posixpath.dirname(mets_info.filename)
+                hrefs = [h for h in select(dirs["orig"] / "mets.xml") if h]
+                wanted_paths = {posixpath.normpath(posixpath.join(base, h.replace("file://", "", 1))) for h in hrefs}
+                present = {i.filename for i in infos}
+                # hrefs that do not match the archive layout fall back to basename matching
+                wanted_names = {posixpath.basename(p) for p in wanted_paths if p not in present}
+
+        seen: Dict[str, str] = {}
+        for n, info in enumerate(infos, 1):
+            name = info.filename
+            base_name = posixpath.basename(name)
+            lower = base_name.lower()
+            if info is mets_info or (wanted_paths is not None and name not in wanted_paths
+                                     and base_name not in wanted_names):
+                kind = None
+            elif lower.endswith(IMAGE_EXTS):
+                kind = "images"
+            elif lower.endswith(".xml") and _is_page_xml(zf, info):
+                kind = "pages"
+            else:
+                kind = None
+
+            if kind:
+                if base_name in seen:
+                    out["skipped"].append(f"{name} (same name as {seen[base_name]})")
+                else:
+                    seen[base_name] = name
+                    if kind == "images" and store_image is not None:
+                        with zf.open(info) as fh:
+                            store_image(fh, base_name)
+                    else:
+                        _copy_member(zf, info, dirs[kind] / base_name)
+                    out[kind].append(base_name)
+            if progress:
+                progress(n, total)
+    return out
+
@@ -0,0 +1,99 @@
+"""
+Server-side Ingest
+
+Registering OCR-D workspaces that already sit on a filesystem the server can
+read (see /api/import-path). Only directories below one of the roots in
+INGEST_ROOTS (os.pathsep-separated absolute paths, set by the admin) are
+accepted; without it, server-side import is disabled.
+
+Images are linked into the workspace instead of copied: symlinks by
+default, or hardlinks (same filesystem only; falls back to a symlink).
+PAGE-XML is copied, since the editor writes pages in place and must not
+change the pipeline's files.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+INGEST_ROOTS_ENV = "INGEST_ROOTS"
+LINK_MODES = ("symlink", "hardlink")
+
+
+def ingest_roots() -> List[Path]:
+    """Configured ingest roots (resolved); empty if server-side import is disabled."""
+    raw = os.environ.get(INGEST_ROOTS_ENV, "")
+    return [Path(r).expanduser().resolve() for r in raw.split(os.pathsep) if r.strip()]
+
+
+def _under(path: Path, root: Path) -> bool:
+    return path == root or root in path.parents
+
+
+def in_ingest_roots(path: Path) -> bool:
+    """True if the resolved path lies below an ingest root."""
+    path = path.resolve()
+    return any(_under(path, root) for root in ingest_roots())
+
+
+def resolve_ingest_dir(path: str) -> Path:
+    """
+    The resolved directory for a client-supplied path.
+    Raises PermissionError if it is outside every ingest root (or ingest is disabled),
+    FileNotFoundError if it is not a directory.
+    """
+    roots = ingest_roots()
+    if not roots:
+        raise PermissionError(f"server-side import is disabled (set {INGEST_ROOTS_ENV})")
+    resolved = Path(path).expanduser().resolve()
+    if not any(_under(resolved, root) for root in roots):
+        raise PermissionError("path is outside the allowed ingest roots")
+    if not resolved.is_dir():
+        raise FileNotFoundError(f"not a directory: {path}")
+    return resolved
+
+
+def resolve_member(base: Path, href: str) -> Optional[Path]:
+    """A METS href (relative, or file://) as a file below base; None for URLs, escapes and missing files."""
+    if "://" in href and not href.startswith("file://"):
+        return None
+    href = href[len("file://"):] if href.startswith("file://") else href
+    candidate = (base / href).resolve()
+    if not _under(candidate, base) or not candidate.is_file():
+        return None
+    return candidate
+
+
+def link_file(src: Path, dst: Path, mode: str = "symlink") -> str:
+    """
+    Atomically make dst refer to src without copying the data.
+    Returns the mode actually used ("hardlink" falls back to "symlink" across filesystems).
+    """
+    tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex[:8]}.link")
+    used = mode
+    try:
+        if mode == "hardlink":
+            try:
+                os.link(src, tmp)
+            except OSError:
+                used = "symlink"
+        if used == "symlink":
+            os.symlink(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        if tmp.is_symlink() or tmp.exists():
+            tmp.unlink()
+    return used
+
+
+def copy_file(src: Path, dst: Path) -> None:
+    tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex[:8]}.part")
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        tmp.unlink(missing_ok=True)
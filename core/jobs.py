@@ -0,0 +1,295 @@
+"""
+Background Jobs
+
+In-process runner for work that is too slow for a request handler: archive
+imports, normalization, ZIP exports and workspace deletes. The endpoint
+submits a function and answers 202 with the job id right away; clients poll
+/api/jobs/<id> (see api/jobs.py).
+
+Jobs are persisted in the `jobs` table of data/workspaces.db (status, phase,
+progress, result), so any request can report on them. The functions are not:
+jobs that were queued or running when the server stopped are marked failed on
+startup, which assumes a single gunicorn worker process (like the LLM queue).
+
+Functions run on a thread pool (JOB_WORKERS) and receive a Job handle as
+their first argument for progress reports. CPU-bound steps can use the shared
+process pool from process_pool() (JOB_PROCESSES, default: all cores).
+Cancellation is cooperative: a queued job is dropped, a running one stops at
+its next progress() or check_cancelled() call. A job may leave one file
+behind for download (Job.output_path(), served by /api/jobs/<id>/file).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from core.db import get_connection
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_PROCESSES = int(os.getenv("JOB_PROCESSES", "0") or 0) or (os.cpu_count() or 1)
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+JOB_FILES = Path(os.getenv("JOB_FILES", "data/jobs")).resolve()
+PROGRESS_INTERVAL = 0.5  # seconds between persisted progress updates
+
+FINAL_STATES = ("done", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function once cancellation was requested."""
+
+
+_threads: Optional[ThreadPoolExecutor] = None
+_processes: Optional[ProcessPoolExecutor] = None
+_pools_lock = threading.Lock()
+_futures: Dict[str, Future] = {}
+_cancelled: set = set()
+_state_lock = threading.Lock()
+
+
+def init_jobs():
+    JOB_FILES.mkdir(parents=True, exist_ok=True)
+    with get_connection() as con:
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+              id TEXT PRIMARY KEY,
+              kind TEXT NOT NULL,
+              workspace_id TEXT,
+              status TEXT NOT NULL DEFAULT 'queued',
+              phase TEXT,
+              done INTEGER DEFAULT 0,
+              total INTEGER DEFAULT 0,
+              message TEXT,
+              result TEXT,
+              cancel_requested INTEGER DEFAULT 0,
+              created_at TEXT,
+              updated_at TEXT,
+              started_at TEXT,
+              finished_at TEXT
+            )
+            """
+        )
+        con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_workspace ON jobs(workspace_id, created_at)")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at)")
+        # Not in child processes: pool workers re-import the app while jobs are running
+        if multiprocessing.parent_process() is None:
+            now = datetime.utcnow()
+            # A job cannot survive a restart: its thread is gone
+            con.execute(
+                """
+                UPDATE jobs SET status='failed', message='interrupted by a server restart',
+                  updated_at=?, finished_at=?
+                WHERE status IN ('queued', 'running')
+                """,
+                (now.isoformat(), now.isoformat())
+            )
+            cutoff = (now - timedelta(days=JOB_RETENTION_DAYS)).isoformat()
+            for row in con.execute("SELECT id FROM jobs WHERE created_at < ?", (cutoff,)).fetchall():
+                _remove_output(row["id"])
+            con.execute("DELETE FROM jobs WHERE created_at < ?", (cutoff,))
+
+
+def _row_to_dict(row: sqlite3.Row) -> Dict:
+    d = dict(row)
+    if d.get("result"):
+        try:
+            d["result"] = json.loads(d["result"])
+        except Exception:
+            pass
+    d["cancel_requested"] = bool(d.get("cancel_requested"))
+    return d
+
+
+def _update(job_id: str, **fields) -> None:
+    if "result" in fields:
+        fields["result"] = json.dumps(fields["result"], ensure_ascii=False)
+    fields["updated_at"] = datetime.utcnow().isoformat()
+    cols = ", ".join(f"{k}=?" for k in fields)
+    with get_connection() as con:
+        con.execute(f"UPDATE jobs SET {cols} WHERE id=?", (*fields.values(), job_id))
+
+
+def _output_files(job_id: str) -> List[Path]:
+    return list(JOB_FILES.glob(f"{job_id}.*"))
+
+
+def _remove_output(job_id: str) -> None:
+    for f in _output_files(job_id):
+        f.unlink(missing_ok=True)
+
+
+class Job:
+    """Handle passed to a job function: progress reporting and cancellation checks."""
+
+    def __init__(self, job_id: str, workspace_id: Optional[str] = None):
+        self.id = job_id
+        self.workspace_id = workspace_id
+        self._last = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self.id in _cancelled
+
+    def check_cancelled(self) -> None:
+        if self.cancelled:
+            raise JobCancelled()
+
+    def phase(self, name: str, total: int = 0) -> None:
+        """Start a new phase (resets the progress counters)."""
+        self.check_cancelled()
+        self._last = time.monotonic()
+        _update(self.id, phase=name, done=0, total=total)
+
+    def progress(self, done: int, total: int, phase: Optional[str] = None) -> None:
+        """Report progress; persisted at most every PROGRESS_INTERVAL, and always the last step."""
+        self.check_cancelled()
+        now = time.monotonic()
+        if done == total or now - self._last >= PROGRESS_INTERVAL:
+            self._last = now
+            fields = {"done": done, "total": total}
+            if phase:
+                fields["phase"] = phase
+            _update(self.id, **fields)
+
+    def reporter(self, phase: str) -> Callable[[int, int], None]:
+        """A progress(done, total) callback for the given phase."""
+        return lambda done, total: self.progress(done, total, phase)
+
+    def output_path(self, suffix: str) -> Path:
+        """Where the job writes the file it offers for download (e.g. ".zip")."""
+        return JOB_FILES / f"{self.id}{suffix}"
+
+
+def _thread_pool() -> ThreadPoolExecutor:
+    global _threads
+    with _pools_lock:
+        if _threads is None:
+            _threads = ThreadPoolExecutor(max_workers=max(1, JOB_WORKERS), thread_name_prefix="job")
+        return _threads
+
+
+def process_pool() -> ProcessPoolExecutor:
+    """The shared process pool for CPU-bound work; recreated if a worker died."""
+    global _processes
+    with _pools_lock:
+        if _processes is None or getattr(_processes, "_broken", False):
+            # spawn: forking a threaded server process is not safe
+            _processes = ProcessPoolExecutor(max_workers=JOB_PROCESSES,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return _processes
+
+
+def _run(job: Job, fn: Callable, args: tuple, kwargs: Dict) -> None:
+    try:
+        if job.cancelled:
+            raise JobCancelled()
+        now = datetime.utcnow().isoformat()
+        _update(job.id, status="running", started_at=now)
+        result = fn(job, *args, **kwargs)
+        _update(job.id, status="done", phase="done", result=result or {},
+                finished_at=datetime.utcnow().isoformat())
+    except JobCancelled:
+        _remove_output(job.id)
+        _update(job.id, status="cancelled", finished_at=datetime.utcnow().isoformat())
+    except Exception as e:
+        logger.exception(f"job {job.id} failed")
+        _remove_output(job.id)
+        # HTTPException from abort() carries a readable description
+        message = getattr(e, "description", None) or str(e) or type(e).__name__
+        _update(job.id, status="failed", message=message, finished_at=datetime.utcnow().isoformat())
+    finally:
+        with _state_lock:
+            _futures.pop(job.id, None)
+            _cancelled.discard(job.id)
+
+
+def submit(kind: str, fn: Callable, *args, workspace_id: Optional[str] = None,
+           phase: Optional[str] = None, dedupe: bool = False, **kwargs) -> str:
+    """
+    Run fn(job, *args, **kwargs) in the background; its return value (a dict) becomes the result.
+    dedupe: reuse a still queued job of the same kind for the same workspace. Returns the job id.
+    """
+    with _state_lock:
+        if dedupe and workspace_id:
+            with get_connection() as con:
+                row = con.execute(
+                    "SELECT id FROM jobs WHERE kind=? AND workspace_id=? AND status='queued' LIMIT 1",
+                    (kind, workspace_id)
+                ).fetchone()
+            if row and row["id"] in _futures:
+                return row["id"]
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow().isoformat()
+        with get_connection() as con:
+            con.execute(
+                """
+                INSERT INTO jobs (id, kind, workspace_id, status, phase, created_at, updated_at)
+                VALUES (?, ?, ?, 'queued', ?, ?, ?)
+                """,
+                (job_id, kind, workspace_id, phase, now, now)
+            )
+        _futures[job_id] = _thread_pool().submit(_run, Job(job_id, workspace_id), fn, args, kwargs)
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    with get_connection() as con:
+        row = con.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+    return _row_to_dict(row) if row else None
+
+
+def list_jobs(workspace_id: Optional[str] = None, status: Optional[str] = None,
+              kind: Optional[str] = None, limit: int = 50) -> List[Dict]:
+    """Most recent jobs first, optionally filtered."""
+    where, args = [], []
+    for col, val in (("workspace_id", workspace_id), ("status", status), ("kind", kind)):
+        if val:
+            where.append(f"{col}=?")
+            args.append(val)
+    sql = "SELECT * FROM jobs" + (" WHERE " + " AND ".join(where) if where else "")
+    sql += " ORDER BY created_at DESC LIMIT ?"
+    with get_connection() as con:
+        rows = con.execute(sql, (*args, int(limit))).fetchall()
+    return [_row_to_dict(r) for r in rows]
+
+
+def cancel_job(job_id: str) -> Optional[Dict]:
+    """
+    Cancel a job. Queued jobs are cancelled immediately; running jobs are flagged
+    and stop at their next progress report.
+    """
+    job = get_job(job_id)
+    if not job or job["status"] in FINAL_STATES:
+        return job
+    with _state_lock:
+        future = _futures.get(job_id)
+        if future is not None and future.cancel():
+            _futures.pop(job_id, None)
+            _update(job_id, status="cancelled", cancel_requested=1, finished_at=datetime.utcnow().isoformat())
+        else:
+            _cancelled.add(job_id)
+            _update(job_id, cancel_requested=1)
+    return get_job(job_id)
+
+
+def job_output(job_id: str) -> Optional[Path]:
+    """The file a finished job left for download, if any."""
+    files = _output_files(job_id)
+    return files[0] if files else None
+
+
+# Ensure the table exists on import
+init_jobs()
@@ -0,0 +1,184 @@
+"""
+Line Image Preprocessing
+
+Turns a TextLine region of a page scan into a compact image for vision LLMs:
+crop (with padding), optional polygon masking, deskew along the Baseline,
+grayscale conversion, height normalization and lossy encoding. Smaller
+images mean smaller request payloads and fewer image tokens per call.
+"""
+
+from __future__ import annotations
+
+import io
+import math
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+Point = Tuple[float, float]
+
+FORMATS = {"jpeg": "JPEG", "jpg": "JPEG", "webp": "WEBP", "png": "PNG"}
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    val = os.getenv(name)
+    if val is None:
+        return default
+    return val.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class LineImageOptions:
+    """Knobs for line preprocessing; see from_env() for the matching environment variables."""
+    target_height: int = 96  # 0 keeps the scan resolution
+    mask: bool = False
+    deskew: bool = True
+    grayscale: bool = True
+    format: str = "JPEG"
+    quality: int = 85
+    pad_x: float = 0.1  # fraction of the line width
+    pad_y: float = 0.2  # fraction of the line height
+
+    @classmethod
+    def from_env(cls) -> "LineImageOptions":
+        return cls(
+            target_height=int(os.getenv("LLM_LINE_HEIGHT", "96")),
+            mask=_env_flag("LLM_LINE_MASK", False),
+            deskew=_env_flag("LLM_LINE_DESKEW", True),
+            grayscale=_env_flag("LLM_LINE_GRAYSCALE", True),
+            format=FORMATS.get(os.getenv("LLM_LINE_FORMAT", "jpeg").strip().lower(), "JPEG"),
+            quality=int(os.getenv("LLM_LINE_QUALITY", "85")),
+        )
+
+    @classmethod
+    def lossless(cls) -> "LineImageOptions":
+        """The historical behavior: padded bounding box, full resolution, PNG."""
+        return cls(target_height=0, mask=False, deskew=False, grayscale=False, format="PNG")
+
+
+def baseline_angle(baseline: Sequence[Point]) -> float:
+    """Least-squares slope of a baseline polyline, in degrees (positive = descending to the right)."""
+    if not baseline or len(baseline) < 2:
+        return 0.0
+    n = len(baseline)
+    mx = sum(p[0] for p in baseline) / n
+    my = sum(p[1] for p in baseline) / n
+    sxx = sum((p[0] - mx) ** 2 for p in baseline)
+    sxy = sum((p[0] - mx) * (p[1] - my) for p in baseline)
+    if sxx == 0:
+        return 0.0
+    return math.degrees(math.atan(sxy / sxx))
+
+
+def _to_8bit(img: Image.Image) -> Image.Image:
+    if img.mode in ("L", "RGB"):
+        return img
+    if img.mode in ("I;16", "I;16B", "I;16L", "I"):
+        return img.point(lambda v: v / 256).convert("L")
+    if img.mode == "1":
+        return img.convert("L")
+    return img.convert("RGB")
+
+
+def crop_line(img: Image.Image, points: Sequence[Point], baseline: Sequence[Point],
+              opts: LineImageOptions) -> Image.Image:
+    """Crop, mask, deskew, convert and resize one line; returns the processed image."""
+    polygon: List[Point] = [tuple(p) for p in (points or baseline or [])]
+    if len(polygon) < 2:
+        raise ValueError("Line has no valid coordinates")
+
+    xs = [p[0] for p in polygon]
+    ys = [p[1] for p in polygon]
+    min_x, max_x = min(xs), max(xs)
+    min_y, max_y = min(ys), max(ys)
+
+    padding_x = (max_x - min_x) * opts.pad_x
+    padding_y = (max_y - min_y) * opts.pad_y
+
+    crop_box = (
+        max(0, int(min_x - padding_x)),
+        max(0, int(min_y - padding_y)),
+        min(img.width, int(max_x + padding_x)),
+        min(img.height, int(max_y + padding_y))
+    )
+    line = _to_8bit(img.crop(crop_box))
+    if opts.grayscale:
+        line = line.convert("L")
+
+    fill = 255 if line.mode == "L" else (255, 255, 255)
+
+    if opts.mask and points and len(points) >= 3:
+        mask = Image.new("L", line.size, 0)
+        ImageDraw.Draw(mask).polygon([(x - crop_box[0], y - crop_box[1]) for x, y in points], fill=255)
+        line = Image.composite(line, Image.new(line.mode, line.size, fill), mask)
+
+    if opts.deskew and baseline:
+        angle = baseline_angle(baseline)
+        if 0.3 <= abs(angle) <= 45:
+            line = line.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+
+    if opts.target_height and line.height > 0 and line.height != opts.target_height:
+        width = max(1, round(line.width * opts.target_height / line.height))
+        line = line.resize((width, opts.target_height), Image.LANCZOS)
+
+    return line
+
+
+def encode_image(img: Image.Image, opts: LineImageOptions) -> bytes:
+    buf = io.BytesIO()
+    fmt = opts.format.upper()
+    if fmt == "JPEG":
+        img.save(buf, format="JPEG", quality=opts.quality, optimize=True)
+    elif fmt == "WEBP":
+        img.save(buf, format="WEBP", quality=opts.quality, method=4)
+    else:
+        img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def prepare_line_image(img: Image.Image, points: Sequence[Point], baseline: Sequence[Point],
+                       opts: Optional[LineImageOptions] = None) -> bytes:
+    """Full preprocessing pipeline; returns the encoded bytes."""
+    opts = opts or LineImageOptions.from_env()
+    return encode_image(crop_line(img, points, baseline, opts), opts)
+
+
+def stack_line_images(encoded: Sequence[bytes], opts: Optional[LineImageOptions] = None,
+                      gap: int = 12) -> bytes:
+    """
+    Stack several encoded line images vertically into one image, numbering each
+    line in a left margin ("1", "2", ...) so the model can refer to them.
+    """
+    opts = opts or LineImageOptions.from_env()
+    lines = []
+    for raw in encoded:
+        with Image.open(io.BytesIO(raw)) as im:
+            lines.append(_to_8bit(im).convert("L" if opts.grayscale else "RGB"))
+    if not lines:
+        raise ValueError("No line images to stack")
+
+    mode = lines[0].mode
+    fill = 255 if mode == "L" else (255, 255, 255)
+    ink = 0 if mode == "L" else (0, 0, 0)
+    label_size = max(12, min(ln.height for ln in lines) // 2)
+    try:
+        font = ImageFont.load_default(size=label_size)
+    except TypeError:  # Pillow < 10.1 only has the fixed bitmap font
+        font = ImageFont.load_default()
+    margin = label_size * (len(str(len(lines))) + 1)
+
+    width = margin + max(ln.width for ln in lines)
+    height = sum(ln.height for ln in lines) + gap * (len(lines) - 1)
+    sheet = Image.new(mode, (width, height), fill)
+    draw = ImageDraw.Draw(sheet)
+    y = 0
+    for i, ln in enumerate(lines, start=1):
+        draw.text((label_size // 3, y + (ln.height - label_size) // 2), str(i), fill=ink, font=font)
+        sheet.paste(ln.convert(mode), (margin, y))
+        y += ln.height
+        if i < len(lines):
+            draw.line([(0, y + gap // 2), (width, y + gap // 2)], fill=ink, width=1)
+            y += gap
+    return encode_image(sheet, opts)
@@ -0,0 +1,130 @@
+"""
+LLM Result Cache
+
+Content-addressed, persistent cache for LLM transcription results. Entries are
+keyed by a hash of everything that influences the model output (cropped line
+image, model, prompt template, language and existing text) and stored in a
+small SQLite database next to data/workspaces.db.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", "data/llm_cache.db")).resolve()
+CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+# Upper bound for the summed size of cached results (bytes); oldest entries are evicted first.
+MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+_local = threading.local()
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    This thread's connection to the cache database, opened on first use and then reused
+    (like core.db.get_connection). Use it as `with get_connection() as con:`; never close it.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(CACHE_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")  # safe with WAL; no fsync per commit
+        _local.conn = conn
+    return conn
+
+
+def init_cache():
+    with get_connection() as con:
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+              key TEXT PRIMARY KEY,
+              model TEXT,
+              mode TEXT,
+              result TEXT NOT NULL,
+              size INTEGER NOT NULL,
+              created_at TEXT,
+              last_used_at TEXT,
+              hits INTEGER DEFAULT 0
+            )
+            """
+        )
+        con.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used_at)")
+
+
+def cache_key(image_bytes: bytes, model: str, prompt_template: str, language: str,
+              existing_text: Optional[str] = None) -> str:
+    """
+    Build the content address for one LLM call.
+    Each part is length-prefixed so that different splits never collide.
+    """
+    h = hashlib.sha256()
+    parts: tuple[Union[bytes, str], ...] = (image_bytes, model, prompt_template, language, existing_text or "")
+    for part in parts:
+        raw = part if isinstance(part, bytes) else str(part).encode("utf-8")
+        h.update(len(raw).to_bytes(8, "big"))
+        h.update(raw)
+    return h.hexdigest()
+
+
+def get_cached(key: str) -> Optional[str]:
+    """Return the cached result for key (and mark it as recently used), or None."""
+    now = datetime.utcnow().isoformat()
+    with get_connection() as con:
+        row = con.execute("SELECT result FROM llm_cache WHERE key=?", (key,)).fetchone()
+        if not row:
+            return None
+        con.execute("UPDATE llm_cache SET last_used_at=?, hits=hits+1 WHERE key=?", (now, key))
+    return row["result"]
+
+
+def put_cached(key: str, result: str, *, model: Optional[str] = None, mode: Optional[str] = None) -> None:
+    """Store a result and evict least recently used entries above MAX_BYTES."""
+    now = datetime.utcnow().isoformat()
+    size = len(key) + len(result.encode("utf-8"))
+    with get_connection() as con:
+        con.execute(
+            """
+            INSERT INTO llm_cache (key, model, mode, result, size, created_at, last_used_at, hits)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+            ON CONFLICT(key) DO UPDATE SET
+              result       = excluded.result,
+              size         = excluded.size,
+              last_used_at = excluded.last_used_at
+            """,
+            (key, model, mode, result, size, now, now)
+        )
+        _evict(con)
+
+
+def _evict(con: sqlite3.Connection) -> None:
+    total = con.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+    if total <= MAX_BYTES:
+        return
+    excess = total - MAX_BYTES
+    freed = 0
+    victims = []
+    for row in con.execute("SELECT key, size FROM llm_cache ORDER BY last_used_at ASC"):
+        victims.append((row["key"],))
+        freed += row["size"]
+        if freed >= excess:
+            break
+    con.executemany("DELETE FROM llm_cache WHERE key=?", victims)
+
+
+def cache_stats() -> Dict:
+    with get_connection() as con:
+        row = con.execute("SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes FROM llm_cache").fetchone()
+    return {"entries": row["entries"], "bytes": row["bytes"], "max_bytes": MAX_BYTES}
+
+
+# Ensure the table exists on import
+init_cache()
@@ -0,0 +1,324 @@
+"""
+LLM Job Queue
+
+Persistent, priority-ordered queue for long-running LLM calls. Jobs live in
+the `llm_jobs` table of data/workspaces.db and are executed by a dedicated
+pool of worker threads, sized independently of the web server threads
+(LLM_WORKERS). Handlers are registered per job kind; transient failures
+(Ollama errors, timeouts) are retried with exponential backoff.
+
+Jobs left in 'running' state by a previous process are re-queued when the
+worker pool starts, so the queue assumes a single gunicorn worker process.
+
+Background jobs (priority <= PRIORITY_BACKGROUND, e.g. speculative
+pre-transcription) never occupy more than LLM_BACKGROUND_WORKERS threads,
+which leaves a worker free for interactive requests, and their handlers
+step aside via DeferJob while interactive work is in flight.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from core.db import get_connection
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 10
+PRIORITY_BATCH = 5
+PRIORITY_BACKGROUND = 0
+
+WORKERS = int(os.getenv("LLM_WORKERS", "0"))  # 0 = use the default set via configure_workers()
+MAX_ATTEMPTS = int(os.getenv("LLM_JOB_MAX_ATTEMPTS", "3"))
+BACKOFF_BASE = float(os.getenv("LLM_JOB_BACKOFF", "2.0"))  # seconds, doubled per attempt
+BACKOFF_MAX = 60.0
+BACKGROUND_WORKERS = int(os.getenv("LLM_BACKGROUND_WORKERS", "0"))  # 0 = all workers but one
+
+FINAL_STATES = ("done", "failed", "cancelled")
+
+
+class RetryableJobError(Exception):
+    """Raised by handlers for transient failures that are worth another attempt."""
+
+
+class DeferJob(Exception):
+    """Raised by handlers to put the job back into the queue without using up an attempt."""
+
+    def __init__(self, delay: float = 1.0):
+        super().__init__(f"deferred for {delay:.1f}s")
+        self.delay = delay
+
+
+_handlers: Dict[str, Callable[[Dict], Dict]] = {}
+_default_workers = 2
+_workers: List[threading.Thread] = []
+_workers_lock = threading.Lock()
+_wakeup = threading.Condition()
+_interactive_lock = threading.Lock()
+_interactive_calls = 0
+
+
+def init_jobs():
+    with get_connection() as con:
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_jobs (
+              id TEXT PRIMARY KEY,
+              kind TEXT NOT NULL,
+              status TEXT NOT NULL DEFAULT 'queued',
+              priority INTEGER DEFAULT 0,
+              payload TEXT,
+              result TEXT,
+              error TEXT,
+              attempts INTEGER DEFAULT 0,
+              max_attempts INTEGER DEFAULT 3,
+              cancel_requested INTEGER DEFAULT 0,
+              not_before REAL DEFAULT 0,
+              created_at TEXT,
+              updated_at TEXT,
+              started_at TEXT,
+              finished_at TEXT
+            )
+            """
+        )
+        con.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_jobs_queue ON llm_jobs(status, priority DESC, created_at)"
+        )
+
+
+def register_handler(kind: str, fn: Callable[[Dict], Dict]) -> None:
+    """Register the function that executes jobs of the given kind (payload -> result dict)."""
+    _handlers[kind] = fn
+
+
+def configure_workers(default: int) -> None:
+    """Set the pool size used when LLM_WORKERS is not given (e.g. from the number of backends)."""
+    global _default_workers
+    _default_workers = max(1, int(default))
+
+
+def _pool_size() -> int:
+    return max(1, WORKERS or _default_workers)
+
+
+def _background_slots() -> int:
+    return max(1, BACKGROUND_WORKERS or _pool_size() - 1)
+
+
+class interactive_call:
+    """
+    Context manager marking an LLM call made directly by a request handler
+    (outside the queue), so background jobs yield to it:
+
+        with interactive_call():
+            client.transcribe_line(...)
+    """
+
+    def __enter__(self):
+        global _interactive_calls
+        with _interactive_lock:
+            _interactive_calls += 1
+        return self
+
+    def __exit__(self, *exc):
+        global _interactive_calls
+        with _interactive_lock:
+            _interactive_calls -= 1
+        return False
+
+
+def interactive_busy() -> bool:
+    """True while non-background LLM work is queued, running or in flight."""
+    if _interactive_calls > 0:
+        return True
+    with get_connection() as con:
+        row = con.execute(
+            "SELECT 1 FROM llm_jobs WHERE status IN ('queued', 'running') AND priority > ? LIMIT 1",
+            (PRIORITY_BACKGROUND,)
+        ).fetchone()
+    return row is not None
+
+
+def enqueue(kind: str, payload: Dict, *, priority: int = PRIORITY_INTERACTIVE,
+            max_attempts: Optional[int] = None) -> str:
+    """Persist a new job and wake up a worker. Returns the job id."""
+    job_id = uuid.uuid4().hex
+    now = datetime.utcnow().isoformat()
+    with get_connection() as con:
+        con.execute(
+            """
+            INSERT INTO llm_jobs (id, kind, status, priority, payload, max_attempts, created_at, updated_at)
+            VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)
+            """,
+            (job_id, kind, int(priority), json.dumps(payload, ensure_ascii=False),
+             int(max_attempts or MAX_ATTEMPTS), now, now)
+        )
+    ensure_workers()
+    with _wakeup:
+        _wakeup.notify()
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    with get_connection() as con:
+        row = con.execute("SELECT * FROM llm_jobs WHERE id=?", (job_id,)).fetchone()
+    return _row_to_dict(row) if row else None
+
+
+def cancel_job(job_id: str) -> Optional[Dict]:
+    """
+    Cancel a job. Queued jobs are cancelled immediately; running jobs are flagged
+    and their result is discarded once the in-flight LLM call returns.
+    """
+    now = datetime.utcnow().isoformat()
+    with get_connection() as con:
+        con.execute(
+            "UPDATE llm_jobs SET status='cancelled', finished_at=?, updated_at=? WHERE id=? AND status='queued'",
+            (now, now, job_id)
+        )
+        con.execute(
+            "UPDATE llm_jobs SET cancel_requested=1, updated_at=? WHERE id=? AND status='running'",
+            (now, job_id)
+        )
+    return get_job(job_id)
+
+
+def _row_to_dict(row: sqlite3.Row) -> Dict:
+    d = dict(row)
+    for k in ("payload", "result"):
+        if d.get(k):
+            try:
+                d[k] = json.loads(d[k])
+            except Exception:
+                pass
+    d["cancel_requested"] = bool(d.get("cancel_requested"))
+    return d
+
+
+def _claim_next() -> Optional[Dict]:
+    """
+    Atomically move the highest-priority runnable job from 'queued' to 'running'.
+    Background jobs are only claimed while fewer than _background_slots() of them run.
+    """
+    now = datetime.utcnow().isoformat()
+    with get_connection() as con:
+        while True:
+            row = con.execute(
+                """
+                SELECT * FROM llm_jobs
+                WHERE status='queued' AND not_before <= ?
+                  AND (priority > ? OR (
+                    SELECT COUNT(*) FROM llm_jobs WHERE status='running' AND priority <= ?) < ?)
+                ORDER BY priority DESC, created_at ASC
+                LIMIT 1
+                """,
+                (time.time(), PRIORITY_BACKGROUND, PRIORITY_BACKGROUND, _background_slots())
+            ).fetchone()
+            if not row:
+                return None
+            cur = con.execute(
+                """
+                UPDATE llm_jobs SET status='running', attempts=attempts+1, started_at=?, updated_at=?
+                WHERE id=? AND status='queued'
+                """,
+                (now, now, row["id"])
+            )
+            if cur.rowcount == 1:
+                job = _row_to_dict(row)
+                job["attempts"] += 1
+                return job
+            # Another worker won the race; try the next one
+
+
+def _finish(job: Dict, *, status: str, result: Optional[Dict] = None, error: Optional[str] = None,
+            not_before: float = 0.0, refund_attempt: bool = False) -> None:
+    now = datetime.utcnow().isoformat()
+    with get_connection() as con:
+        cancelled = con.execute(
+            "SELECT cancel_requested FROM llm_jobs WHERE id=?", (job["id"],)
+        ).fetchone()
+        if cancelled and cancelled["cancel_requested"]:
+            status, result, error = "cancelled", None, None
+        con.execute(
+            """
+            UPDATE llm_jobs SET status=?, result=?, error=?, not_before=?, updated_at=?,
+              attempts=attempts-?,
+              finished_at=CASE WHEN ? IN ('done', 'failed', 'cancelled') THEN ? ELSE finished_at END
+            WHERE id=?
+            """,
+            (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error,
+             not_before, now, 1 if refund_attempt else 0, status, now, job["id"])
+        )
+
+
+def _run_one(job: Dict) -> None:
+    handler = _handlers.get(job["kind"])
+    if handler is None:
+        _finish(job, status="failed", error=f"No handler for job kind '{job['kind']}'")
+        return
+    try:
+        result = handler(job.get("payload") or {})
+    except DeferJob as e:
+        _finish(job, status="queued", not_before=time.time() + e.delay, refund_attempt=True)
+        return
+    except RetryableJobError as e:
+        if job["attempts"] < job["max_attempts"]:
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (job["attempts"] - 1)))
+            delay *= 1 + random.random() * 0.25  # jitter
+            logger.warning(f"LLM job {job['id']} attempt {job['attempts']} failed ({e}); retrying in {delay:.1f}s")
+            _finish(job, status="queued", error=str(e), not_before=time.time() + delay)
+        else:
+            _finish(job, status="failed", error=str(e))
+        return
+    except Exception as e:
+        # HTTPException from abort() carries a readable description
+        _finish(job, status="failed", error=getattr(e, "description", None) or str(e))
+        return
+    _finish(job, status="done", result=result or {})
+
+
+def _worker_loop() -> None:
+    while True:
+        try:
+            job = _claim_next()
+        except Exception as e:
+            logger.error(f"LLM job queue unavailable: {e}")
+            job = None
+        if job is None:
+            with _wakeup:
+                _wakeup.wait(timeout=1.0)
+            continue
+        _run_one(job)
+
+
+def _requeue_orphans() -> None:
+    now = datetime.utcnow().isoformat()
+    with get_connection() as con:
+        con.execute("UPDATE llm_jobs SET status='queued', updated_at=? WHERE status='running'", (now,))
+
+
+def ensure_workers() -> None:
+    """Start the worker pool once per process."""
+    if _workers:
+        return
+    with _workers_lock:
+        if _workers:
+            return
+        _requeue_orphans()
+        for i in range(_pool_size()):
+            t = threading.Thread(target=_worker_loop, name=f"llm-worker-{i}", daemon=True)
+            t.start()
+            _workers.append(t)
+
+
+# Ensure the table exists on import
+init_jobs()
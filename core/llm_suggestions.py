@@ -0,0 +1,133 @@
+"""
+LLM Suggestions
+
+Transcriptions produced speculatively in the background (see /api/llm/prefetch).
+They are kept per workspace, PAGE-XML and line in the `llm_suggestions` table
+of data/workspaces.db and never written into the PAGE-XML itself; the viewer
+offers them when the user opens the line.
+
+A row is created as 'pending' when the line is queued, so repeated prefetch
+calls do not queue it twice, and becomes 'done' once the LLM answered. Pending
+rows whose job failed, was cancelled or is gone are dropped when the page's
+suggestions are read, so the line can be queued again.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from core.db import get_connection
+from core.llm_jobs import FINAL_STATES
+
+
+def init_suggestions():
+    with get_connection() as con:
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_suggestions (
+              workspace_id TEXT NOT NULL,
+              path TEXT NOT NULL,
+              line_id TEXT NOT NULL,
+              status TEXT NOT NULL DEFAULT 'pending',
+              text TEXT,
+              model TEXT,
+              job_id TEXT,
+              created_at TEXT,
+              updated_at TEXT,
+              PRIMARY KEY (workspace_id, path, line_id)
+            )
+            """
+        )
+
+
+def claim_line(ws_id: str, path: str, line_id: str) -> bool:
+    """Create a pending row for the line; False if it is already pending or done."""
+    now = datetime.utcnow().isoformat()
+    with get_connection() as con:
+        cur = con.execute(
+            """
+            INSERT OR IGNORE INTO llm_suggestions (workspace_id, path, line_id, status, created_at, updated_at)
+            VALUES (?, ?, ?, 'pending', ?, ?)
+            """,
+            (ws_id, path, line_id, now, now)
+        )
+        return cur.rowcount == 1
+
+
+def set_job(ws_id: str, path: str, line_id: str, job_id: str) -> None:
+    with get_connection() as con:
+        con.execute(
+            "UPDATE llm_suggestions SET job_id=? WHERE workspace_id=? AND path=? AND line_id=?",
+            (job_id, ws_id, path, line_id)
+        )
+
+
+def save_suggestion(ws_id: str, path: str, line_id: str, text: str, model: Optional[str] = None) -> None:
+    now = datetime.utcnow().isoformat()
+    with get_connection() as con:
+        con.execute(
+            """
+            INSERT INTO llm_suggestions (workspace_id, path, line_id, status, text, model, created_at, updated_at)
+            VALUES (?, ?, ?, 'done', ?, ?, ?, ?)
+            ON CONFLICT(workspace_id, path, line_id) DO UPDATE SET
+              status     = 'done',
+              text       = excluded.text,
+              model      = excluded.model,
+              job_id     = NULL,
+              updated_at = excluded.updated_at
+            """,
+            (ws_id, path, line_id, text, model, now, now)
+        )
+
+
+def get_suggestions(ws_id: str, path: str) -> Dict[str, Dict]:
+    """Return {line_id: {"status", "text", "job_id"}} for one PAGE-XML, without pending rows of finished jobs."""
+    with get_connection() as con:
+        con.execute(
+            f"""
+            DELETE FROM llm_suggestions
+            WHERE workspace_id=? AND path=? AND status='pending' AND job_id IS NOT NULL
+              AND NOT EXISTS (
+                SELECT 1 FROM llm_jobs j
+                WHERE j.id = llm_suggestions.job_id AND j.status NOT IN ({", ".join("?" * len(FINAL_STATES))})
+              )
+            """,
+            (ws_id, path, *FINAL_STATES)
+        )
+        rows = con.execute(
+            "SELECT line_id, status, text, job_id FROM llm_suggestions WHERE workspace_id=? AND path=?",
+            (ws_id, path)
+        ).fetchall()
+    return {r["line_id"]: {"status": r["status"], "text": r["text"], "job_id": r["job_id"]} for r in rows}
+
+
+def pending_outside(ws_id: str, keep_paths: Iterable[str]) -> List[Dict]:
+    """Pending rows of a workspace whose page is not in keep_paths (e.g. the user jumped ahead)."""
+    keep = set(keep_paths)
+    with get_connection() as con:
+        rows = con.execute(
+            "SELECT path, line_id, job_id FROM llm_suggestions WHERE workspace_id=? AND status='pending'",
+            (ws_id,)
+        ).fetchall()
+    return [dict(r) for r in rows if r["path"] not in keep]
+
+
+def delete_suggestions(ws_id: str, path: Optional[str] = None, line_id: Optional[str] = None,
+                       pending_only: bool = False) -> None:
+    sql = "DELETE FROM llm_suggestions WHERE workspace_id=?"
+    args: list = [ws_id]
+    if path is not None:
+        sql += " AND path=?"
+        args.append(path)
+    if line_id is not None:
+        sql += " AND line_id=?"
+        args.append(line_id)
+    if pending_only:
+        sql += " AND status='pending'"
+    with get_connection() as con:
+        con.execute(sql, args)
+
+
+# Ensure the table exists on import
+init_suggestions()
@@ -1,8 +1,12 @@
 from __future__ import annotations
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
 from lxml import etree
+import json
+import os
 import re
+import threading
 
 NS = {
     "mets": "http://www.loc.gov/METS/",
@@ -11,6 +15,225 @@ NS = {
 
 _numtail = re.compile(r".*?(\d+)$", re.ASCII)
 
+# Precompiled once; evaluated a single time per METS by build_mets_index()
+_X_FILEGRPS = etree.XPath(".//mets:fileSec/mets:fileGrp", namespaces=NS)
+_X_FILES = etree.XPath("./mets:file", namespaces=NS)
+_X_FLOCAT_HREF = etree.XPath("./mets:FLocat[1]/@xlink:href", namespaces=NS)
+_X_PAGE_DIVS = etree.XPath(".//mets:structMap[@TYPE='PHYSICAL']//mets:div[@TYPE='page']", namespaces=NS)
+_X_FPTR_IDS = etree.XPath("./mets:fptr/@FILEID", namespaces=NS)
+
+
+class MetsIndex:
+    """
+    Everything the viewer needs from a METS, collected in one parse:
+
+    - file_grps:    fileGrp USE -> [{"id", "href", "mimetype"}] in document order
+                    (mimetype as written in the METS; callers normalize as they need)
+    - page_divs:    PHYSICAL structMap page divs in order: [{"id", "order_label", "file_ids"}]
+    - files_by_id:  file ID -> file dict
+    - page_of_file: file ID -> ID of the first page div pointing at it (pageId)
+
+    Instances are shared through load_mets_index(); treat them as read-only.
+    """
+
+    VERSION = 1
+
+    def __init__(self, file_grps: Dict[str, List[Dict]], page_divs: List[Dict]):
+        self.file_grps = file_grps
+        self.page_divs = page_divs
+        self.files_by_id = {f["id"]: f for fs in file_grps.values() for f in fs}
+        self.page_of_file: Dict[str, str] = {}
+        for div in page_divs:
+            for fid in div["file_ids"]:
+                self.page_of_file.setdefault(fid, div["id"])
+
+    def iter_files(self) -> Iterator[Tuple[str, Dict]]:
+        """Yield (fileGrp, file) for all files in document order."""
+        for use, files in self.file_grps.items():
+            for f in files:
+                yield use, f
+
+    def to_dict(self) -> Dict:
+        return {"file_grps": self.file_grps, "page_divs": self.page_divs}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MetsIndex":
+        return cls(data["file_grps"], data["page_divs"])
+
+
+# METS files at least this large are read with iterparse (bounded memory)
+STREAMING_THRESHOLD = int(os.getenv("METS_STREAMING_THRESHOLD", str(8 * 1024 * 1024)))
+
+
+def build_mets_index(mets_path: str | Path, streaming: Optional[bool] = None) -> MetsIndex:
+    """
+    Parse a METS once and build its MetsIndex.
+
+    Files of STREAMING_THRESHOLD bytes or more are read incrementally
+    (see _build_index_iterparse); pass streaming=True/False to force either way.
+    Both readers produce the same index.
+    """
+    if streaming is None:
+        streaming = Path(mets_path).stat().st_size >= STREAMING_THRESHOLD
+    if streaming:
+        return _build_index_iterparse(mets_path)
+    return _build_index_tree(mets_path)
+
+
+def _build_index_tree(mets_path: str | Path) -> MetsIndex:
+    root = etree.parse(str(mets_path)).getroot()
+
+    file_grps: Dict[str, List[Dict]] = {}
+    for fg in _X_FILEGRPS(root):
+        use = (fg.get("USE") or "").strip()
+        if not use:
+            continue
+        files = file_grps.setdefault(use, [])
+        for f in _X_FILES(fg):
+            hrefs = _X_FLOCAT_HREF(f)
+            files.append({"id": f.get("ID") or "", "href": str(hrefs[0]) if hrefs else "",
+                          "mimetype": f.get("MIMETYPE") or ""})
+
+    page_divs = [{
+        "id": d.get("ID") or "",
+        "order_label": (d.get("ORDERLABEL") or "").strip(),
+        "file_ids": [str(fid) for fid in _X_FPTR_IDS(d)],
+    } for d in _X_PAGE_DIVS(root)]
+
+    return MetsIndex(file_grps, page_divs)
+
+
+_T_FILESEC = f"{{{NS['mets']}}}fileSec"
+_T_FILEGRP = f"{{{NS['mets']}}}fileGrp"
+_T_FILE = f"{{{NS['mets']}}}file"
+_T_FLOCAT = f"{{{NS['mets']}}}FLocat"
+_T_STRUCTMAP = f"{{{NS['mets']}}}structMap"
+_T_DIV = f"{{{NS['mets']}}}div"
+_T_FPTR = f"{{{NS['mets']}}}fptr"
+_A_HREF = f"{{{NS['xlink']}}}href"
+
+# Elements dropped from the partial tree once their end tag was handled
+_T_DISPOSABLE = {_T_FILE, _T_FPTR, _T_DIV, _T_FILEGRP} | {
+    f"{{{NS['mets']}}}{t}" for t in ("metsHdr", "dmdSec", "amdSec", "structLink", "behaviorSec")
+}
+
+
+def _build_index_iterparse(mets_path: str | Path) -> MetsIndex:
+    """
+    Build the MetsIndex from start/end events, discarding every file, div and
+    section once it has been read, so memory stays bounded by the index itself.
+    Matches _build_index_tree(): fileGrps directly below fileSec, files directly
+    below them, page divs anywhere in PHYSICAL structMaps in document order.
+    """
+    file_grps: Dict[str, List[Dict]] = {}
+    page_divs: List[Dict] = []
+
+    current_files: Optional[List[Dict]] = None  # files list of the open top-level fileGrp
+    current_grp = None
+    physical_depth = 0                           # open PHYSICAL structMaps
+    open_pages: List[Tuple[object, Dict]] = []   # (div element, entry) of open page divs
+
+    for event, elem in etree.iterparse(str(mets_path), events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == _T_FILEGRP:
+                parent = elem.getparent()
+                use = (elem.get("USE") or "").strip()
+                if use and parent is not None and parent.tag == _T_FILESEC:
+                    current_grp, current_files = elem, file_grps.setdefault(use, [])
+            elif tag == _T_STRUCTMAP:
+                if elem.get("TYPE") == "PHYSICAL":
+                    physical_depth += 1
+            elif tag == _T_DIV and physical_depth and elem.get("TYPE") == "page":
+                # Appended on start so nested page divs keep document order
+                entry = {"id": elem.get("ID") or "", "order_label": (elem.get("ORDERLABEL") or "").strip(),
+                         "file_ids": []}
+                page_divs.append(entry)
+                open_pages.append((elem, entry))
+            continue
+
+        if tag == _T_FILE:
+            if current_files is not None and elem.getparent() is current_grp:
+                flocat = next((c for c in elem if c.tag == _T_FLOCAT), None)
+                href = flocat.get(_A_HREF) if flocat is not None else None
+                current_files.append({"id": elem.get("ID") or "", "href": href or "",
+                                      "mimetype": elem.get("MIMETYPE") or ""})
+        elif tag == _T_FPTR:
+            fid = elem.get("FILEID")
+            if fid is not None and open_pages and elem.getparent() is open_pages[-1][0]:
+                open_pages[-1][1]["file_ids"].append(fid)
+        elif tag == _T_DIV:
+            if open_pages and open_pages[-1][0] is elem:
+                open_pages.pop()
+        elif tag == _T_FILEGRP:
+            if elem is current_grp:
+                current_grp, current_files = None, None
+        elif tag == _T_STRUCTMAP:
+            if elem.get("TYPE") == "PHYSICAL":
+                physical_depth -= 1
+
+        if tag in _T_DISPOSABLE and not open_pages:
+            elem.clear(keep_tail=True)
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+    return MetsIndex(file_grps, page_divs)
+
+
+_INDEX_CACHE_SIZE = 16
+_index_cache: "OrderedDict[str, Tuple[Tuple[int, int], MetsIndex]]" = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def _index_cache_file(mets_path: Path) -> Path:
+    return mets_path.with_name(mets_path.name + ".index.json")
+
+
+def load_mets_index(mets_path: str | Path, cache_file: Optional[Path] = None) -> MetsIndex:
+    """
+    Return the MetsIndex for a METS file, rebuilding it only when the file changed.
+
+    Indexes are kept in memory and persisted next to the METS (<name>.index.json),
+    both keyed by the METS mtime and size, so every request after an upload reuses
+    the same parse.
+    """
+    path = Path(mets_path).resolve()
+    st = path.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = str(path)
+
+    with _index_lock:
+        hit = _index_cache.get(key)
+        if hit and hit[0] == stamp:
+            _index_cache.move_to_end(key)
+            return hit[1]
+
+    cache_file = cache_file or _index_cache_file(path)
+    index = None
+    try:
+        data = json.loads(cache_file.read_text(encoding="utf-8"))
+        if data.get("version") == MetsIndex.VERSION and (data.get("mtime_ns"), data.get("size")) == stamp:
+            index = MetsIndex.from_dict(data["index"])
+    except Exception:
+        index = None
+
+    if index is None:
+        index = build_mets_index(path)
+        try:
+            tmp = cache_file.with_name(cache_file.name + ".tmp")
+            tmp.write_text(json.dumps({"version": MetsIndex.VERSION, "mtime_ns": stamp[0], "size": stamp[1],
+                                       "index": index.to_dict()}, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, cache_file)
+        except Exception:
+            pass  # read-only location: the in-memory copy still helps
+
+    with _index_lock:
+        _index_cache[key] = (stamp, index)
+        _index_cache.move_to_end(key)
+        while len(_index_cache) > _INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
 
 def _mtype(s: str | None) -> str:
     return (s or "").strip().lower()
@@ -53,24 +276,13 @@ def _natural_sort(vals: List[str]) -> List[str]:
 
 def parse_mets_summary(mets_path: str) -> Dict:
     """Return fileGrp lists and per-page candidates from METS (robust to common edge cases)."""
-    p = Path(mets_path)
-    tree = etree.parse(str(p))
-    root = tree.getroot()
+    index = load_mets_index(mets_path)
 
     # Collect fileGrps: files (ID, href, mimetype)
-    filegrps: Dict[str, List[Dict]] = {}
-    for fg in root.xpath(".//mets:fileSec/mets:fileGrp", namespaces=NS):
-        use = (fg.get("USE") or "").strip()
-        if not use:
-            continue
-        files: List[Dict] = []
-        for f in fg.xpath("./mets:file", namespaces=NS):
-            fid = f.get("ID") or ""
-            mimetype = _mtype(f.get("MIMETYPE"))
-            fl = f.xpath("./mets:FLocat", namespaces=NS)
-            href = fl[0].get(f"{{{NS['xlink']}}}href") if fl else ""
-            files.append({"id": fid, "mimetype": mimetype, "href": href})
-        filegrps[use] = files
+    filegrps: Dict[str, List[Dict]] = {
+        use: [{"id": f["id"], "mimetype": _mtype(f["mimetype"]), "href": f["href"]} for f in files]
+        for use, files in index.file_grps.items()
+    }
 
     # Group lists by type
     img_grps = [g for g, fs in filegrps.items() if any(
@@ -82,14 +294,14 @@ def parse_mets_summary(mets_path: str) -> Dict:
 
     # Page order from structMap
     pages_ordered: List[str] = []
-    divs = root.xpath(".//mets:structMap[@TYPE='PHYSICAL']//mets:div[@TYPE='page']", namespaces=NS)
+    divs = index.page_divs
     if divs:
         for d in divs:
-            label = (d.get("ORDERLABEL") or "").strip()
+            label = d["order_label"]
             if label:
                 pages_ordered.append(label)
             else:
-                did = d.get("ID") or ""
+                did = d["id"]
                 m = _numtail.match(did)
                 pages_ordered.append(m.group(1) if m else (did.rsplit("_", 1)[-1] if "_" in did else did))
     else:
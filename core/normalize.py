@@ -0,0 +1,279 @@
+"""
+PAGE-XML Normalization
+
+Writes the PAGE-XML of a workspace's pages/ folder into normalized/ with a
+clean, workspace-relative Page/@imageFilename ("images/<basename>"); used by
+/api/commit-import and the ZIP import.
+
+Normalization is incremental: every written page gets a record
+{sha256, mtime_ns, size} of its *source*, kept by the caller in the workspace
+state ("normalized"). A page whose source still matches its record (same
+mtime and size, or the same content hash after a touch) and whose output
+exists is skipped, so a re-commit only rewrites re-uploaded pages and leaves
+edits made in normalized/ alone.
+
+Two modes (NORMALIZE_MODE, or per call):
+  - "fast" (default): stream the file and rewrite only the Page/@imageFilename
+    attribute; every other byte is copied as is. Optionally injects a missing
+    PAGE namespace declaration on the root (see core.page._inject_page_namespace).
+  - "validate": full generateDS parse and re-serialization; rejects documents
+    that do not parse, but reformats the whole file.
+An output written in validate mode also counts as current for fast mode, not
+the other way round.
+
+Larger batches run on a process pool (the caller's, e.g. the shared pool of
+core/jobs.py, or a temporary one of NORMALIZE_WORKERS, default: all cores);
+the work is CPU-bound and does not scale with threads.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import multiprocessing
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+NORMALIZE_WORKERS = int(os.environ.get("NORMALIZE_WORKERS", "0") or 0) or (os.cpu_count() or 1)
+NORMALIZE_MODE = os.environ.get("NORMALIZE_MODE", "fast")
+MODES = ("fast", "validate")
+POOL_MIN_PAGES = 16  # below this, starting the workers costs more than it saves
+HASH_BUFFER = 1024 * 1024
+HEADER_LIMIT = 16 * 1024 * 1024  # the Page start tag must appear within this many bytes
+
+# The first Page start tag, skipping comments, CDATA and processing instructions
+# (group 1). Attribute values may contain ">", so quoted strings are matched as a whole.
+_RE_HEADER_TOKEN = re.compile(
+    rb"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>"
+    rb"|(<(?:[A-Za-z_][\w.-]*:)?Page(?=[\s/>])(?:[^>\"']|\"[^\"]*\"|'[^']*')*>)",
+    re.DOTALL,
+)
+_RE_IMAGE_FILENAME = re.compile(rb"(\simageFilename\s*=\s*)([\"'])(.*?)\2", re.DOTALL)
+_RE_ENCODING = re.compile(rb"^<\?xml[^>]*\sencoding\s*=\s*[\"']([A-Za-z0-9._-]+)[\"']")
+
+PAGE_NS = "http://schema.primaresearch.org/PAGE/gts/pagecontent/2019-07-15"
+XSI_NS = "http://www.w3.org/2001/XMLSchema-instance"
+SCHEMA_LOC = f"{PAGE_NS} {PAGE_NS}/pagecontent.xsd"
+NAMESPACEDEF = f'xmlns:pc="{PAGE_NS}" xmlns:xsi="{XSI_NS}" xsi:schemaLocation="{SCHEMA_LOC}"'
+
+
+def fingerprint(path: Path) -> Dict:
+    """{sha256, mtime_ns, size} of a source file."""
+    st = path.stat()
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(HASH_BUFFER), b""):
+            h.update(chunk)
+    return {"sha256": h.hexdigest(), "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def _write_atomic(dst: Path, data: bytes) -> None:
+    tmp = dst.with_name(dst.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, dst)
+
+
+def _image_href(value: bytes) -> bytes:
+    """Clean, workspace-relative imageFilename (same rule as the validate mode)."""
+    return b"images/" + value.replace(b"\\", b"/").rstrip(b"/").rsplit(b"/", 1)[-1]
+
+
+def _read_header(fh, h) -> bytes:
+    """Read (and hash) until the Page start tag is complete, EOF, or HEADER_LIMIT."""
+    buf = b""
+    while True:
+        chunk = fh.read(HASH_BUFFER)
+        h.update(chunk)
+        buf += chunk
+        if not chunk or len(buf) >= HEADER_LIMIT:
+            return buf
+        for m in _RE_HEADER_TOKEN.finditer(buf):
+            if m.group(1) and m.end() < len(buf):
+                return buf
+
+
+def _normalize_fast(src: str, dst: str, inject_namespace: bool = True) -> Dict:
+    """Rewrite Page/@imageFilename in place of a streamed copy; returns the source record."""
+    path = Path(src)
+    st = path.stat()
+    h = hashlib.sha256()
+    tmp = Path(dst).with_name(Path(dst).name + ".tmp")
+    with open(path, "rb") as fh:
+        head = _read_header(fh, h)
+        page = next((m for m in _RE_HEADER_TOKEN.finditer(head) if m.group(1)), None)
+        if page is None:
+            raise ValueError("no Page element")
+        tag = page.group(1)
+        tag = _RE_IMAGE_FILENAME.sub(
+            lambda m: m.group(1) + m.group(2) + _image_href(m.group(3)) + m.group(2) if m.group(3) else m.group(0),
+            tag, count=1)
+        prefix = head[:page.start()]
+        if inject_namespace:
+            from core.page import _inject_page_namespace
+
+            enc = _RE_ENCODING.match(prefix)
+            encoding = enc.group(1).decode("ascii") if enc else "utf-8"
+            try:
+                prefix = _inject_page_namespace(prefix.decode(encoding)).encode(encoding)
+            except (LookupError, UnicodeError):
+                pass  # leave an undecodable header as it is
+        try:
+            with open(tmp, "wb") as out:
+                out.write(prefix)
+                out.write(tag)
+                out.write(head[page.end():])
+                for chunk in iter(lambda: fh.read(HASH_BUFFER), b""):
+                    h.update(chunk)
+                    out.write(chunk)
+            os.replace(tmp, dst)
+        finally:
+            tmp.unlink(missing_ok=True)
+    return {"sha256": h.hexdigest(), "mtime_ns": st.st_mtime_ns, "size": st.st_size, "mode": "fast"}
+
+
+def _normalize_validate(src: str, dst: str) -> Dict:
+    """Full generateDS round trip; returns the source record."""
+    from ocrd_models.ocrd_page_generateds import parse as parse_pagexml
+
+    record = {**fingerprint(Path(src)), "mode": "validate"}
+    pcgts = parse_pagexml(src, silence=True)
+    page = pcgts.get_Page()
+    if page is None:
+        raise ValueError("no Page element")
+
+    # Rewrite imageFilename to a clean, workspace-relative path
+    img = page.get_imageFilename()
+    if img:
+        page.set_imageFilename(_image_href(img.encode("utf-8")).decode("utf-8"))
+
+    try:
+        from ocrd_models.ocrd_page import to_xml as page_to_xml
+    except ImportError:
+        page_to_xml = None
+
+    if page_to_xml:
+        # Proper namespaces and XML declaration; returns str
+        xml = page_to_xml(pcgts)
+        _write_atomic(Path(dst), xml.encode("utf-8") if isinstance(xml, str) else xml)
+    else:
+        # Fallback: export with explicit namespacedef and correct root element name
+        # NOTE: name_ must be 'PcGts' (not 'PcGtsType')
+        import io
+        buf = io.StringIO()
+        pcgts.export(buf, 0, name_="PcGts", namespacedef_=NAMESPACEDEF, pretty_print=True)
+        _write_atomic(Path(dst), ('<?xml version="1.0" encoding="UTF-8"?>\n' + buf.getvalue()).encode("utf-8"))
+    return record
+
+
+def normalize_page(src: str, dst: str, mode: str = "fast") -> Tuple[str, Optional[Dict], Optional[str]]:
+    """
+    Normalize one PAGE-XML file (runs in a pool worker, hence plain str paths).
+    Returns (name, source record, None) on success, (name, None, error) on failure.
+    """
+    name = Path(src).name
+    try:
+        record = _normalize_validate(src, dst) if mode == "validate" else _normalize_fast(src, dst)
+        return name, record, None
+    except Exception as e:
+        return name, None, str(e) or type(e).__name__
+
+
+def _is_current(src: Path, dst: Path, record: Optional[Dict], mode: str) -> Optional[Dict]:
+    """The (possibly refreshed) record if src is unchanged since dst was written, else None."""
+    if not record or not dst.is_file():
+        return None
+    if mode == "validate" and record.get("mode", "validate") != "validate":
+        return None
+    st = src.stat()
+    if st.st_size != record.get("size"):
+        return None
+    if st.st_mtime_ns == record.get("mtime_ns"):
+        return record
+    # Touched (or re-uploaded with the same bytes): compare content
+    current = fingerprint(src)
+    return {**record, **current} if current["sha256"] == record.get("sha256") else None
+
+
+def _run_pool(pool: Executor, jobs: List[Tuple[str, str, str]], workers: int, finished: set, collect) -> None:
+    """Run normalize_page over (src, dst, mode) jobs on a process pool, in order."""
+    chunksize = max(1, len(jobs) // (max(1, workers) * 4))
+    for result in pool.map(normalize_page, *zip(*jobs), chunksize=chunksize):
+        finished.add(result[0])
+        collect(result)
+
+
+def normalize_pages(pages_dir: Path, norm_dir: Path, records: Optional[Dict[str, Dict]] = None,
+                    progress: Optional[Callable[[int, int], None]] = None,
+                    workers: Optional[int] = None, mode: Optional[str] = None,
+                    executor: Optional[Executor] = None) -> Dict:
+    """
+    Normalize every pages_dir/*.xml into norm_dir, skipping unchanged pages.
+
+    records: {filename: {sha256, mtime_ns, size, mode}} from the previous run.
+    mode: "fast" or "validate" (default: NORMALIZE_MODE).
+    executor: process pool to use for larger batches (default: a temporary one of `workers`).
+    Returns {
+      "normalized": [names written], "unchanged": [names skipped],
+      "errors": [{"file", "error"}], "records": {...}  # to store for the next run
+    }
+    Records of pages that failed or no longer exist are dropped.
+    """
+    records = records or {}
+    mode = mode or NORMALIZE_MODE
+    if mode not in MODES:
+        raise ValueError(f"unknown normalization mode: {mode}")
+    sources = sorted(pages_dir.glob("*.xml"))
+    total = len(sources)
+    out: Dict = {"normalized": [], "unchanged": [], "errors": [], "records": {}}
+
+    pending: List[Path] = []
+    for src in sources:
+        try:
+            current = _is_current(src, norm_dir / src.name, records.get(src.name), mode)
+        except OSError:
+            current = None
+        if current:
+            out["unchanged"].append(src.name)
+            out["records"][src.name] = current
+        else:
+            pending.append(src)
+
+    done = len(out["unchanged"])
+    if progress and done:
+        progress(done, total)
+
+    def collect(result):
+        nonlocal done
+        name, record, error = result
+        if error:
+            out["errors"].append({"file": name, "error": error})
+        else:
+            out["normalized"].append(name)
+            out["records"][name] = record
+        done += 1
+        if progress:
+            progress(done, total)
+
+    jobs = [(str(src), str(norm_dir / src.name), mode) for src in pending]
+    workers = min(workers or NORMALIZE_WORKERS, len(jobs))
+    finished = set()
+    if len(jobs) >= POOL_MIN_PAGES and (executor is not None or workers > 1):
+        try:
+            if executor is not None:
+                _run_pool(executor, jobs, workers, finished, collect)
+            else:
+                # spawn: forking a threaded server process is not safe
+                with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    _run_pool(pool, jobs, workers, finished, collect)
+        except (BrokenProcessPool, OSError):
+            pass  # finish in-process below
+    for src, dst, _ in jobs:
+        if Path(src).name not in finished:
+            collect(normalize_page(src, dst, mode))
+
+    out["normalized"].sort()
+    out["errors"].sort(key=lambda e: e["file"])
+    return out
@@ -5,12 +5,148 @@ Handles communication with a local Ollama instance for OCR transcription
 and correction tasks.
 """
 
+import base64
+import json
+import re
 import requests
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List
 import logging
 
 logger = logging.getLogger(__name__)
 
+CORRECTION_PROMPT = """You are an expert historical document transcription corrector.
+
+The current transcription is:
+"{existing_text}"
+
+Please review the image and correct any transcription errors.
+Output ONLY the corrected text, nothing else. Keep the original text if it's already correct.
+The text is in {language}."""
+
+TRANSCRIPTION_PROMPT = """You are an expert historical document transcription specialist.
+
+Please transcribe the text shown in this image exactly as it appears.
+Output ONLY the transcribed text, nothing else. No explanations or commentary.
+The text is in {language}."""
+
+BATCH_TRANSCRIPTION_PROMPT = """You are an expert historical document transcription specialist.
+
+{layout_hint}
+Transcribe every line exactly as it appears. The text is in {language}.
+Respond with JSON only, in this form:
+{{"lines": [{{"n": 1, "text": "..."}}, {{"n": 2, "text": "..."}}]}}
+Give exactly {count} entries, numbered in order. No explanations or commentary."""
+
+BATCH_LAYOUT_HINTS = {
+    "images": "You are given {count} images, each showing one line of text, in reading order.",
+    "stacked": "The image shows {count} lines of text stacked vertically, each numbered on the left.",
+}
+
+
+def build_line_prompt(existing_text: Optional[str], language: str) -> tuple[str, str]:
+    """
+    Pick the prompt template for a single text line and render it.
+
+    Args:
+        existing_text: Optional existing transcription (switches to correction mode)
+        language: Language of the text
+
+    Returns:
+        Tuple of (template, rendered_prompt)
+    """
+    if existing_text:
+        template = CORRECTION_PROMPT
+    else:
+        template = TRANSCRIPTION_PROMPT
+    return template, template.format(existing_text=existing_text or "", language=language)
+
+
+def build_batch_prompt(count: int, language: str, layout: str = "images") -> tuple[str, str]:
+    """
+    Render the structured-output prompt for several lines in one request.
+
+    Args:
+        count: Number of lines in the request
+        language: Language of the text
+        layout: "images" (one image per line) or "stacked" (one numbered composite image)
+
+    Returns:
+        Tuple of (template, rendered_prompt); the template includes the layout
+    """
+    hint = BATCH_LAYOUT_HINTS.get(layout, BATCH_LAYOUT_HINTS["images"])
+    template = BATCH_TRANSCRIPTION_PROMPT.replace("{layout_hint}", hint)
+    return template, template.format(count=count, language=language)
+
+
+def parse_batch_response(text: Optional[str], count: int) -> Optional[List[str]]:
+    """
+    Parse the JSON answer to a batch prompt into one string per line.
+
+    Accepts {"lines": [...]} or a bare list; entries may be strings or
+    {"n": int, "text": str} objects. Returns None unless exactly `count`
+    lines can be recovered.
+    """
+    if not text:
+        return None
+    # Models like to wrap JSON in Markdown fences or add a sentence around it
+    match = re.search(r"[\[{].*[\]}]", text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return None
+    entries = data.get("lines") if isinstance(data, dict) else data
+    if not isinstance(entries, list) or len(entries) != count:
+        return None
+
+    out: List[Optional[str]] = [None] * count
+    for i, entry in enumerate(entries):
+        if isinstance(entry, str):
+            idx, value = i, entry
+        elif isinstance(entry, dict) and isinstance(entry.get("text"), str):
+            try:
+                idx = int(entry.get("n", i + 1)) - 1
+            except (TypeError, ValueError):
+                return None
+            value = entry["text"]
+        else:
+            return None
+        if not 0 <= idx < count or out[idx] is not None:
+            return None
+        out[idx] = value.strip()
+    return out  # type: ignore[return-value]
+
+
+def transcribe_line_batch(client, images_base64: List[str], language: str = "German",
+                          layout: str = "images") -> tuple[List[Optional[str]], bool]:
+    """
+    Transcribe several lines with a single request, falling back to one call per line.
+
+    Works with anything exposing generate() and transcribe_line() (OllamaClient, OllamaPool).
+
+    Returns:
+        Tuple of (per-line results in input order, batched) where batched is False
+        if the answer could not be parsed and the lines were sent one by one
+    """
+    count = len(images_base64)
+    if count == 0:
+        return [], True
+    if count > 1:
+        _, prompt = build_batch_prompt(count, language, layout)
+        if layout == "stacked":
+            from .line_image import stack_line_images
+            stacked = stack_line_images([base64.b64decode(img) for img in images_base64])
+            images = [base64.b64encode(stacked).decode("utf-8")]
+        else:
+            images = list(images_base64)
+        raw = client.generate(prompt=prompt, images=images, temperature=0.1, format="json")
+        parsed = parse_batch_response(raw, count)
+        if parsed is not None:
+            return parsed, True
+        logger.warning(f"Could not parse batch answer for {count} lines; falling back to single-line calls")
+    return [client.transcribe_line(image_base64=img, language=language) for img in images_base64], count == 1
+
 
 class OllamaClient:
     """Client for interacting with Ollama API."""
@@ -58,7 +194,8 @@ class OllamaClient:
             return []
 
     def generate(self, prompt: str, system_prompt: Optional[str] = None,
-                 image_base64: Optional[str] = None, **kwargs) -> Optional[str]:
+                 image_base64: Optional[str] = None, images: Optional[List[str]] = None,
+                 **kwargs) -> Optional[str]:
         """
         Generate text using Ollama.
 
@@ -66,23 +203,96 @@ class OllamaClient:
             prompt: User prompt
             system_prompt: Optional system prompt
             image_base64: Optional base64-encoded image for vision models
-            **kwargs: Additional parameters (temperature, top_p, etc.)
+            images: Optional list of base64-encoded images (instead of image_base64)
+            **kwargs: Additional parameters (temperature, top_p, format, etc.)
 
         Returns:
             Generated text or None if failed
         """
+        payload = self._build_payload(prompt, system_prompt, image_base64, stream=False, images=images, **kwargs)
+
+        try:
+            response = requests.post(
+                f"{self.base_url}/api/generate",
+                json=payload,
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            result = response.json()
+            return result.get("response", "").strip()
+        except requests.exceptions.Timeout:
+            logger.error("Ollama request timed out")
+            return None
+        except Exception as e:
+            logger.error(f"Ollama generation failed: {e}")
+            return None
+
+    def generate_stream(self, prompt: str, system_prompt: Optional[str] = None,
+                        image_base64: Optional[str] = None, **kwargs) -> Iterator[str]:
+        """
+        Generate text using Ollama, yielding response fragments as they arrive.
+
+        Consumes Ollama's NDJSON stream (one JSON object per line) until the
+        final object with "done": true.
+
+        Args:
+            prompt: User prompt
+            system_prompt: Optional system prompt
+            image_base64: Optional base64-encoded image for vision models
+            **kwargs: Additional parameters (temperature, top_p, etc.)
+
+        Yields:
+            Text fragments in generation order
+
+        Raises:
+            requests.RequestException: If Ollama cannot be reached or times out
+            RuntimeError: If Ollama reports an error inside the stream
+        """
+        payload = self._build_payload(prompt, system_prompt, image_base64, stream=True, **kwargs)
+
+        with requests.post(
+                f"{self.base_url}/api/generate",
+                json=payload,
+                timeout=self.timeout,
+                stream=True
+        ) as response:
+            response.raise_for_status()
+            for raw in response.iter_lines():
+                if not raw:
+                    continue
+                try:
+                    chunk = json.loads(raw)
+                except ValueError:
+                    logger.debug(f"Skipping malformed stream line: {raw!r}")
+                    continue
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                fragment = chunk.get("response", "")
+                if fragment:
+                    yield fragment
+                if chunk.get("done"):
+                    break
+
+    def _build_payload(self, prompt: str, system_prompt: Optional[str], image_base64: Optional[str],
+                       stream: bool, images: Optional[List[str]] = None, **kwargs) -> Dict[str, Any]:
         payload: Dict[str, Any] = {
             "model": self.model,
             "prompt": prompt,
-            "stream": False
+            "stream": stream
         }
 
         if system_prompt:
             payload["system"] = system_prompt
 
-        if image_base64:
+        if images:
+            payload["images"] = list(images)
+        elif image_base64:
             payload["images"] = [image_base64]
 
+        # "json" (or a JSON schema) constrains the output to valid JSON
+        if kwargs.get("format"):
+            payload["format"] = kwargs["format"]
+
         # Add optional parameters
         options = {}
         if "temperature" in kwargs:
@@ -91,22 +301,7 @@ class OllamaClient:
             options["top_p"] = kwargs["top_p"]
         if options:
             payload["options"] = options
-
-        try:
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result.get("response", "").strip()
-        except requests.exceptions.Timeout:
-            logger.error("Ollama request timed out")
-            return None
-        except Exception as e:
-            logger.error(f"Ollama generation failed: {e}")
-            return None
+        return payload
 
     def transcribe_line(self, image_base64: str, existing_text: Optional[str] = None,
                        language: str = "German") -> Optional[str]:
@@ -121,26 +316,38 @@ class OllamaClient:
         Returns:
             Transcribed/corrected text or None if failed
         """
-        if existing_text:
-            # Correction mode
-            prompt = f"""You are an expert historical document transcription corrector.
-
-The current transcription is:
-"{existing_text}"
-
-Please review the image and correct any transcription errors.
-Output ONLY the corrected text, nothing else. Keep the original text if it's already correct.
-The text is in {language}."""
-        else:
-            # Transcription mode
-            prompt = f"""You are an expert historical document transcription specialist.
-
-Please transcribe the text shown in this image exactly as it appears.
-Output ONLY the transcribed text, nothing else. No explanations or commentary.
-The text is in {language}."""
+        _, prompt = build_line_prompt(existing_text, language)
 
         return self.generate(
             prompt=prompt,
             image_base64=image_base64,
             temperature=0.1  # Low temperature for accuracy
         )
+
+    def transcribe_line_stream(self, image_base64: str, existing_text: Optional[str] = None,
+                               language: str = "German") -> Iterator[str]:
+        """
+        Streaming variant of transcribe_line(); yields text fragments as they arrive.
+        """
+        _, prompt = build_line_prompt(existing_text, language)
+
+        return self.generate_stream(
+            prompt=prompt,
+            image_base64=image_base64,
+            temperature=0.1
+        )
+
+    def transcribe_lines(self, images_base64: List[str], language: str = "German",
+                         layout: str = "images") -> tuple[List[Optional[str]], bool]:
+        """
+        Transcribe several text lines in one request (see transcribe_line_batch()).
+
+        Args:
+            images_base64: Base64-encoded line images in reading order
+            language: Language of the text (default: German)
+            layout: "images" (one image entry per line) or "stacked" (one numbered composite image)
+
+        Returns:
+            Tuple of (per-line transcriptions, batched)
+        """
+        return transcribe_line_batch(self, images_base64, language=language, layout=layout)
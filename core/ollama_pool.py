@@ -0,0 +1,261 @@
+"""
+Ollama Backend Pool
+
+Routes LLM requests across several Ollama instances. Each backend declares the
+models it serves and a weight; requests go to the eligible backend with the
+fewest outstanding requests relative to its weight. Backends that fail
+repeatedly are ejected for a cool-down period and re-admitted after a
+successful health check or request.
+
+The pool exposes the same interface as OllamaClient, so callers do not need
+to know how many boxes are behind it.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional
+
+from .ollama_client import OllamaClient, build_line_prompt, transcribe_line_batch
+
+logger = logging.getLogger(__name__)
+
+EJECT_AFTER = int(os.getenv("OLLAMA_EJECT_AFTER", "3"))  # consecutive failures
+EJECT_SECONDS = float(os.getenv("OLLAMA_EJECT_SECONDS", "30"))
+HEALTH_TTL = 5.0  # seconds a health probe result is reused
+
+
+def parse_backends(raw: Optional[str] = None, default_url: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Read backend definitions.
+
+    OLLAMA_BACKENDS may be a JSON list:
+        [{"url": "http://box1:11434", "models": ["llama3.2-vision"], "weight": 2}, ...]
+    or a comma-separated list of URLs (weight 1, any model).
+    Falls back to a single OLLAMA_BASE_URL backend.
+    """
+    raw = (raw if raw is not None else os.getenv("OLLAMA_BACKENDS", "")).strip()
+    default_url = default_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    if not raw:
+        return [{"url": default_url, "models": [], "weight": 1.0}]
+
+    if raw.startswith("["):
+        entries = json.loads(raw)
+    else:
+        entries = [{"url": u.strip()} for u in raw.split(",") if u.strip()]
+
+    out = []
+    for e in entries:
+        if isinstance(e, str):
+            e = {"url": e}
+        url = (e.get("url") or "").strip()
+        if not url:
+            continue
+        out.append({
+            "url": url,
+            "models": [str(m) for m in (e.get("models") or [])],
+            "weight": max(float(e.get("weight", 1.0) or 1.0), 0.01),
+        })
+    return out or [{"url": default_url, "models": [], "weight": 1.0}]
+
+
+def _model_key(name: str) -> str:
+    return name[:-len(":latest")] if name.endswith(":latest") else name
+
+
+class _Backend:
+    """One Ollama instance plus its routing and health counters."""
+
+    def __init__(self, url: str, model: str, models: List[str], weight: float):
+        self.client = OllamaClient(base_url=url, model=model)
+        self.models = models
+        self.weight = weight
+        self.outstanding = 0
+        self.requests = 0
+        self.completed = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.total_latency = 0.0
+        self.last_latency: Optional[float] = None
+        self.ejected_until = 0.0
+        self.last_error: Optional[str] = None
+        self.last_probe = 0.0
+        self.last_probe_ok = False
+        self.recent = deque()  # completion timestamps for the throughput window
+
+    def serves(self, model: str) -> bool:
+        return not self.models or _model_key(model) in {_model_key(m) for m in self.models}
+
+    def ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        while self.recent and self.recent[0] < now - 60:
+            self.recent.popleft()
+        return {
+            "url": self.client.base_url,
+            "models": self.models,
+            "weight": self.weight,
+            "healthy": not self.ejected(now),
+            "ejected_for_s": round(max(0.0, self.ejected_until - now), 1),
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "completed": self.completed,
+            "failures": self.failures,
+            "avg_latency_ms": round(1000 * self.total_latency / self.completed) if self.completed else None,
+            "last_latency_ms": round(1000 * self.last_latency) if self.last_latency is not None else None,
+            "throughput_per_min": len(self.recent),
+            "last_error": self.last_error,
+        }
+
+
+class OllamaPool:
+    """Least-outstanding-requests load balancer over several Ollama backends."""
+
+    def __init__(self, backends: List[Dict[str, Any]], model: str = "llama3.2-vision"):
+        self.model = model
+        self.backends = [_Backend(b["url"], model, b.get("models") or [], b.get("weight", 1.0)) for b in backends]
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return ", ".join(b.client.base_url for b in self.backends)
+
+    @property
+    def timeout(self) -> int:
+        return self.backends[0].client.timeout
+
+    # ----- health -----
+
+    def _probe(self, b: _Backend) -> bool:
+        now = time.time()
+        if now - b.last_probe < HEALTH_TTL:
+            return b.last_probe_ok
+        ok = b.client.is_available()
+        with self._lock:
+            b.last_probe, b.last_probe_ok = now, ok
+            if ok and b.ejected(now):
+                # Re-admit early: the box answers again
+                logger.info(f"Re-admitting Ollama backend {b.client.base_url}")
+                b.ejected_until = 0.0
+                b.consecutive_failures = 0
+            elif not ok:
+                b.last_error = "health check failed"
+                if not b.ejected(now):
+                    logger.warning(f"Ejecting unreachable Ollama backend {b.client.base_url}")
+                    b.ejected_until = now + EJECT_SECONDS
+        return ok
+
+    def is_available(self) -> bool:
+        """True if at least one backend serving the pool's model answers (probes all, to re-admit)."""
+        results = [self._probe(b) for b in self.backends if b.serves(self.model)]
+        return any(results)
+
+    def list_models(self) -> list[str]:
+        seen: Dict[str, None] = {}
+        for b in self.backends:
+            if self._probe(b):
+                for m in b.client.list_models():
+                    seen.setdefault(m, None)
+        return list(seen)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return [b.stats(now) for b in self.backends]
+
+    # ----- routing -----
+
+    def _acquire(self, model: str, exclude: Optional[set] = None) -> Optional[_Backend]:
+        now = time.time()
+        with self._lock:
+            eligible = [b for b in self.backends
+                        if b.serves(model) and not b.ejected(now) and id(b) not in (exclude or set())]
+            if not eligible:
+                return None
+            best = min(eligible, key=lambda b: ((b.outstanding + 1) / b.weight, b.requests))
+            best.outstanding += 1
+            best.requests += 1
+            return best
+
+    def _release(self, b: _Backend, ok: Optional[bool], started: float, error: Optional[str] = None) -> None:
+        """Hand a request slot back; ok None means it was abandoned and counts neither way."""
+        now = time.time()
+        with self._lock:
+            b.outstanding -= 1
+            if ok is None:
+                return
+            if ok:
+                latency = now - started
+                b.completed += 1
+                b.total_latency += latency
+                b.last_latency = latency
+                b.consecutive_failures = 0
+                b.recent.append(now)
+                return
+            b.failures += 1
+            b.consecutive_failures += 1
+            b.last_error = error or "generation failed"
+            if b.consecutive_failures >= EJECT_AFTER and not b.ejected(now):
+                logger.warning(f"Ejecting Ollama backend {b.client.base_url} for {EJECT_SECONDS:.0f}s")
+                b.ejected_until = now + EJECT_SECONDS
+
+    # ----- OllamaClient interface -----
+
+    def generate(self, prompt: str, system_prompt: Optional[str] = None,
+                 image_base64: Optional[str] = None, **kwargs) -> Optional[str]:
+        """Generate on the least loaded backend, failing over to the others."""
+        tried: set = set()
+        while True:
+            b = self._acquire(self.model, exclude=tried)
+            if b is None:
+                return None
+            tried.add(id(b))
+            started = time.time()
+            out = None
+            try:
+                out = b.client.generate(prompt, system_prompt=system_prompt, image_base64=image_base64, **kwargs)
+            finally:
+                self._release(b, out is not None, started)
+            if out is not None:
+                return out
+
+    def generate_stream(self, prompt: str, system_prompt: Optional[str] = None,
+                        image_base64: Optional[str] = None, **kwargs) -> Iterator[str]:
+        b = self._acquire(self.model)
+        if b is None:
+            raise RuntimeError(f"No healthy Ollama backend serves model '{self.model}'")
+        started = time.time()
+        ok: Optional[bool] = False
+        error = None
+        try:
+            yield from b.client.generate_stream(prompt, system_prompt=system_prompt,
+                                                image_base64=image_base64, **kwargs)
+            ok = True
+        except GeneratorExit:
+            ok = None  # client went away: neither a completion nor the backend's fault
+            raise
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            self._release(b, ok, started, error)
+
+    def transcribe_line(self, image_base64: str, existing_text: Optional[str] = None,
+                        language: str = "German") -> Optional[str]:
+        _, prompt = build_line_prompt(existing_text, language)
+        return self.generate(prompt=prompt, image_base64=image_base64, temperature=0.1)
+
+    def transcribe_line_stream(self, image_base64: str, existing_text: Optional[str] = None,
+                               language: str = "German") -> Iterator[str]:
+        _, prompt = build_line_prompt(existing_text, language)
+        return self.generate_stream(prompt=prompt, image_base64=image_base64, temperature=0.1)
+
+    def transcribe_lines(self, images_base64: List[str], language: str = "German",
+                         layout: str = "images") -> tuple[List[Optional[str]], bool]:
+        return transcribe_line_batch(self, images_base64, language=language, layout=layout)
@@ -54,7 +54,50 @@ def load_page(page_xml_path: str, image_override: Optional[str] = None) -> Dict:
 
 
 def quick_meta(page_xml_path: str) -> Dict:
-    pass
+    """
+    Cheap summary of a PAGE-XML for page listings, without the object model:
+    {"image": imageFilename or None, "lines": int, "transcribed_lines": int}
+
+    The file is streamed and each TextLine is discarded once counted. A line
+    counts as transcribed if one of its own TextEquiv/Unicode is non-empty.
+    """
+    def local(el) -> str:
+        tag = el.tag
+        return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+    image = None
+    lines = transcribed = 0
+    line_has_text = False
+    for event, el in etree.iterparse(str(page_xml_path), events=("start", "end")):
+        name = local(el)
+        if event == "start":
+            if name == "Page" and image is None:
+                image = (el.get("imageFilename") or "").strip() or None
+            elif name == "TextLine":
+                lines += 1
+                line_has_text = False
+            continue
+
+        if name == "Unicode" and (el.text or "").strip():
+            equiv = el.getparent()
+            owner = equiv.getparent() if equiv is not None else None
+            if owner is not None and local(equiv) == "TextEquiv" and local(owner) == "TextLine":
+                line_has_text = True
+        elif name == "TextLine":
+            transcribed += line_has_text
+            el.clear(keep_tail=True)
+
+    return {"image": image, "lines": lines, "transcribed_lines": transcribed}
+
+
+def page_image_filename(page_xml_path: Union[str, Path]) -> Optional[str]:
+    """Page/@imageFilename of a PAGE-XML (None if unset); stops reading at the Page element."""
+    with open(page_xml_path, "rb") as fh:
+        for _, el in etree.iterparse(fh, events=("start",)):
+            tag = el.tag
+            if isinstance(tag, str) and tag.rsplit("}", 1)[-1] == "Page":
+                return (el.get("imageFilename") or "").strip() or None
+    return None
 
 
 def parse_pcgts(page_xml_path: Union[str, Path]) -> PcGtsType:
@@ -0,0 +1,330 @@
+"""
+Transcription Search
+
+Full-text index over the TextLine texts of every workspace (see /api/search).
+Each line is a row of `text_lines` in data/workspaces.db, keyed by
+(workspace, page, line id) with its region, polygon and bounding box;
+`text_lines_fts` is an external-content FTS5 index over the text, kept in
+step by triggers.
+
+Pages are indexed from the file the editor works on (normalized/ copy if
+there is one) when they are registered, and updated line by line by the
+editing endpoints. `text_pages` remembers the mtime of the file each page
+was indexed from, so sync_workspace(), which the workspace reconciler runs for
+every workspace on each pass, only re-reads pages that changed behind the
+index's back (hand edits, or workspaces older than the index).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from lxml import etree
+
+from core.db import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+def init_search():
+    with get_connection() as con:
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS text_lines (
+              id INTEGER PRIMARY KEY,
+              workspace_id TEXT NOT NULL,
+              page TEXT NOT NULL,
+              line_id TEXT NOT NULL,
+              region_id TEXT,
+              text TEXT NOT NULL DEFAULT '',
+              points TEXT,
+              bbox TEXT,
+              UNIQUE (workspace_id, page, line_id)
+            )
+            """
+        )
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS text_pages (
+              workspace_id TEXT NOT NULL,
+              page TEXT NOT NULL,
+              path TEXT,
+              mtime_ns INTEGER,
+              PRIMARY KEY (workspace_id, page)
+            )
+            """
+        )
+        con.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS text_lines_fts USING fts5(
+              text, content='text_lines', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            )
+            """
+        )
+        con.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS text_lines_ai AFTER INSERT ON text_lines BEGIN
+              INSERT INTO text_lines_fts (rowid, text) VALUES (new.id, new.text);
+            END
+            """
+        )
+        con.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS text_lines_ad AFTER DELETE ON text_lines BEGIN
+              INSERT INTO text_lines_fts (text_lines_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            END
+            """
+        )
+        con.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS text_lines_au AFTER UPDATE OF text ON text_lines BEGIN
+              INSERT INTO text_lines_fts (text_lines_fts, rowid, text) VALUES ('delete', old.id, old.text);
+              INSERT INTO text_lines_fts (rowid, text) VALUES (new.id, new.text);
+            END
+            """
+        )
+
+
+# ---------- reading PAGE-XML ----------
+
+def _local(el) -> str:
+    tag = el.tag
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _parse_points(raw: Optional[str]) -> List[List[float]]:
+    points = []
+    for pair in (raw or "").split():
+        x, _, y = pair.partition(",")
+        try:
+            points.append([float(x), float(y)])
+        except ValueError:
+            continue
+    return points
+
+
+def _bbox(points: List[List[float]]) -> Optional[List[int]]:
+    if not points:
+        return None
+    xs, ys = [p[0] for p in points], [p[1] for p in points]
+    return [int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys))]
+
+
+def _line_text(line) -> str:
+    """The line's own TextEquiv/Unicode (lowest index first); word and glyph texts are ignored."""
+    equivs = [el for el in line if _local(el) == "TextEquiv"]
+    equivs.sort(key=lambda el: int(el.get("index")) if (el.get("index") or "").lstrip("-").isdigit() else 0)
+    for te in equivs:
+        for child in te:
+            if _local(child) == "Unicode" and child.text:
+                return child.text
+    return ""
+
+
+def read_lines(page_xml_path) -> List[Dict]:
+    """
+    The text lines of a PAGE-XML, streamed like quick_meta():
+    [{"line_id", "region_id", "text", "points": [[x, y], ...], "bbox": [x0, y0, x1, y1] or None}, ...]
+    """
+    lines = []
+    for _, el in etree.iterparse(str(page_xml_path), events=("end",)):
+        if _local(el) != "TextLine":
+            continue
+        region = el.getparent()
+        while region is not None and not _local(region).endswith("Region"):
+            region = region.getparent()
+        coords = next((c for c in el if _local(c) == "Coords"), None)
+        points = _parse_points(coords.get("points") if coords is not None else None)
+        lines.append({
+            "line_id": el.get("id") or "",
+            "region_id": region.get("id") if region is not None else None,
+            "text": _line_text(el),
+            "points": points,
+            "bbox": _bbox(points),
+        })
+        el.clear(keep_tail=True)
+    return [ln for ln in lines if ln["line_id"]]
+
+
+# ---------- keeping the index current ----------
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _mark_page(con: sqlite3.Connection, ws_id: str, page: str, path: Optional[Path]) -> None:
+    con.execute(
+        "INSERT OR REPLACE INTO text_pages (workspace_id, page, path, mtime_ns) VALUES (?, ?, ?, ?)",
+        (ws_id, page, str(path) if path else None, _mtime(path) if path else None)
+    )
+
+
+def _insert_lines(con: sqlite3.Connection, ws_id: str, page: str, lines: Iterable[Dict]) -> None:
+    con.executemany(
+        """
+        INSERT OR REPLACE INTO text_lines (workspace_id, page, line_id, region_id, text, points, bbox)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        [(ws_id, page, ln["line_id"], ln.get("region_id"), ln.get("text") or "",
+          json.dumps(ln.get("points") or []), json.dumps(ln["bbox"]) if ln.get("bbox") else None)
+         for ln in lines]
+    )
+
+
+def index_page(ws_id: str, page: str, path: Path) -> int:
+    """(Re)index all lines of one page from its PAGE-XML file. Returns the number of lines."""
+    lines = read_lines(path)
+    with get_connection() as con:
+        con.execute("DELETE FROM text_lines WHERE workspace_id=? AND page=?", (ws_id, page))
+        _insert_lines(con, ws_id, page, lines)
+        _mark_page(con, ws_id, page, path)
+    return len(lines)
+
+
+def update_line_texts(ws_id: str, page: str, texts: Dict[str, str], path: Optional[Path] = None) -> None:
+    """New texts of existing lines (after the page was saved to path)."""
+    with get_connection() as con:
+        con.executemany(
+            "UPDATE text_lines SET text=? WHERE workspace_id=? AND page=? AND line_id=?",
+            [(text or "", ws_id, page, line_id) for line_id, text in texts.items()]
+        )
+        if path is not None:
+            _mark_page(con, ws_id, page, path)
+
+
+def upsert_line(ws_id: str, page: str, line_id: str, region_id: Optional[str], text: str,
+                points: Optional[List[List[float]]] = None, path: Optional[Path] = None) -> None:
+    """Add a line or update it; its polygon is kept if points is empty."""
+    points = [[float(x), float(y)] for x, y in (points or [])]
+    with get_connection() as con:
+        con.execute(
+            """
+            INSERT INTO text_lines (workspace_id, page, line_id, region_id, text, points, bbox)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (workspace_id, page, line_id) DO UPDATE SET
+              region_id=excluded.region_id,
+              text=excluded.text,
+              points=COALESCE(excluded.points, text_lines.points),
+              bbox=COALESCE(excluded.bbox, text_lines.bbox)
+            """,
+            (ws_id, page, line_id, region_id, text or "",
+             json.dumps(points) if points else None, json.dumps(_bbox(points)) if points else None)
+        )
+        if path is not None:
+            _mark_page(con, ws_id, page, path)
+
+
+def remove_lines(ws_id: str, page: Optional[str] = None, line_ids: Optional[Iterable[str]] = None,
+                 path: Optional[Path] = None) -> None:
+    """
+    Drop lines from the index: the given lines of a page, a whole page (line_ids None)
+    or a whole workspace (page None).
+    """
+    with get_connection() as con:
+        if page is None:
+            con.execute("DELETE FROM text_lines WHERE workspace_id=?", (ws_id,))
+            con.execute("DELETE FROM text_pages WHERE workspace_id=?", (ws_id,))
+        elif line_ids is None:
+            con.execute("DELETE FROM text_lines WHERE workspace_id=? AND page=?", (ws_id, page))
+            con.execute("DELETE FROM text_pages WHERE workspace_id=? AND page=?", (ws_id, page))
+        else:
+            con.executemany(
+                "DELETE FROM text_lines WHERE workspace_id=? AND page=? AND line_id=?",
+                [(ws_id, page, line_id) for line_id in line_ids]
+            )
+            if path is not None:
+                _mark_page(con, ws_id, page, path)
+
+
+def sync_workspace(ws_id: str, files: Dict[str, Path]) -> int:
+    """
+    Bring a workspace's index in line with its pages ({page name: PAGE-XML file}):
+    pages whose file changed since they were indexed are re-read, pages not in files
+    are dropped. Returns the number of pages re-read.
+    """
+    with get_connection() as con:
+        indexed = {r["page"]: (r["path"], r["mtime_ns"]) for r in con.execute(
+            "SELECT page, path, mtime_ns FROM text_pages WHERE workspace_id=?", (ws_id,))}
+    for page in set(indexed) - set(files):
+        remove_lines(ws_id, page)
+    reread = 0
+    for page, path in files.items():
+        if indexed.get(page) == (str(path), _mtime(path)):
+            continue
+        try:
+            index_page(ws_id, page, path)
+            reread += 1
+        except (OSError, etree.XMLSyntaxError) as e:
+            # e.g. the editor is writing the file right now; retried on the next sync
+            logger.warning(f"indexing {ws_id}/{page} failed: {e}")
+    return reread
+
+
+# ---------- querying ----------
+
+def _match_expr(q: str) -> Optional[str]:
+    """
+    FTS5 query for user input: every word must occur (as a word prefix), "quoted words"
+    as a phrase. None if there are no words.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\w+)', q):
+        if phrase:
+            words = re.findall(r"\w+", phrase)
+            if words:
+                terms.append('"' + " ".join(words) + '"')
+        elif word:
+            terms.append(f'"{word}"*')
+    return " ".join(terms) if terms else None
+
+
+def search_lines(q: str, workspace_id: Optional[str] = None, limit: int = 50, offset: int = 0) -> Dict:
+    """
+    Lines matching q, best first (bm25). Returns {"total": int, "hits": [...]}; a hit is
+    {workspace_id, workspace_label, page, line_id, region_id, text, points, bbox, score}.
+    """
+    match = _match_expr(q or "")
+    if match is None:
+        return {"total": 0, "hits": []}
+    where, args = "text_lines_fts MATCH ?", [match]
+    if workspace_id:
+        where += " AND l.workspace_id=?"
+        args.append(workspace_id)
+    with get_connection() as con:
+        total = con.execute(
+            f"SELECT COUNT(*) FROM text_lines_fts JOIN text_lines l ON l.id = text_lines_fts.rowid WHERE {where}",
+            args
+        ).fetchone()[0]
+        rows = con.execute(
+            f"""
+            SELECT l.workspace_id, w.label AS workspace_label, l.page, l.line_id, l.region_id, l.text,
+                   l.points, l.bbox, text_lines_fts.rank AS score
+            FROM text_lines_fts
+            JOIN text_lines l ON l.id = text_lines_fts.rowid
+            LEFT JOIN workspaces w ON w.id = l.workspace_id
+            WHERE {where}
+            ORDER BY text_lines_fts.rank, l.id
+            LIMIT ? OFFSET ?
+            """,
+            (*args, int(limit), int(offset))
+        ).fetchall()
+    hits = []
+    for r in rows:
+        hit = dict(r)
+        hit["points"] = json.loads(hit["points"]) if hit["points"] else []
+        hit["bbox"] = json.loads(hit["bbox"]) if hit["bbox"] else None
+        hit["score"] = -hit["score"]  # bm25: lower is better; report higher = better
+        hits.append(hit)
+    return {"total": total, "hits": hits}
+
+
+# Ensure the tables exist on import
+init_search()
@@ -0,0 +1,63 @@
+"""
+Workspace State
+
+Access to a workspace's state (pages, images, required files, fileGrps,
+normalization records; see load_workspace_state in core/db.py for its shape).
+The state lives in indexed tables of data/workspaces.db; workspaces created
+before that still have a state.json, which api/upload.py migrates on first
+access.
+
+  - read_state() builds a fresh dict from the tables; callers may modify it
+    freely. Reading never writes.
+  - write_state() persists only the collections that differ from what is
+    stored (dirty tracking), in one transaction. Errors are raised.
+  - state_lock() is a per-workspace re-entrant lock; hold it around a
+    read-modify-write so concurrent requests do not lose each other's
+    updates (edit_state() does exactly that).
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+from core.db import load_workspace_state, save_workspace_state
+
+_locks: Dict[str, threading.RLock] = {}
+_locks_guard = threading.Lock()
+
+
+def state_lock(ws_id: str) -> threading.RLock:
+    """The lock guarding one workspace's state."""
+    with _locks_guard:
+        lock = _locks.get(ws_id)
+        if lock is None:
+            lock = _locks[ws_id] = threading.RLock()
+        return lock
+
+
+def read_state(ws_id: str) -> Optional[Dict]:
+    """The stored state of ws_id; None if it has none yet."""
+    return load_workspace_state(ws_id)
+
+
+def write_state(ws_id: str, state: Dict) -> bool:
+    """Persist `state` unless it matches what is stored; True if anything was written."""
+    with state_lock(ws_id):
+        return save_workspace_state(ws_id, state, previous=load_workspace_state(ws_id))
+
+
+@contextmanager
+def edit_state(ws_id: str, load: Callable[[], Dict]) -> Iterator[Dict]:
+    """
+    Read-modify-write under the workspace lock:
+        with edit_state(ws_id, lambda: ...) as state:
+            state["label"] = "..."
+    `load` returns the current state (with defaults applied); it is saved on
+    exit if it changed, and not saved if the block raises.
+    """
+    with state_lock(ws_id):
+        state = load()
+        yield state
+        write_state(ws_id, state)
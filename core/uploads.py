@@ -0,0 +1,102 @@
+"""
+Resumable Uploads
+
+Bookkeeping for tus-style chunked uploads (see /api/uploads in api/upload.py).
+One row per upload session in the `uploads` table of data/workspaces.db;
+the bytes themselves go to <workspace>/uploads/<id>.part and are moved into
+place by the finalize step once `offset` reaches `length`.
+
+Rows survive restarts, so a client can ask for the current offset and resume
+after a dropped connection.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from core.db import get_connection
+
+
+def init_uploads():
+    with get_connection() as con:
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS uploads (
+              id TEXT PRIMARY KEY,
+              workspace_id TEXT NOT NULL,
+              kind TEXT NOT NULL,
+              filename TEXT NOT NULL,
+              length INTEGER NOT NULL,
+              offset INTEGER NOT NULL DEFAULT 0,
+              created_at TEXT,
+              updated_at TEXT
+            )
+            """
+        )
+        con.execute("CREATE INDEX IF NOT EXISTS idx_uploads_ws ON uploads(workspace_id)")
+        # sha256: set when the content is already in the blob store (no bytes to upload)
+        if "sha256" not in {r["name"] for r in con.execute("PRAGMA table_info(uploads)")}:
+            con.execute("ALTER TABLE uploads ADD COLUMN sha256 TEXT")
+
+
+def create_upload(ws_id: str, kind: str, filename: str, length: int, sha256: Optional[str] = None) -> Dict:
+    """New session at offset 0; with sha256 (a known blob) it starts out complete."""
+    now = datetime.utcnow().isoformat()
+    upload_id = uuid.uuid4().hex
+    with get_connection() as con:
+        con.execute(
+            """
+            INSERT INTO uploads (id, workspace_id, kind, filename, length, offset, sha256, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (upload_id, ws_id, kind, filename, length, length if sha256 else 0, sha256, now, now)
+        )
+    return get_upload(upload_id)
+
+
+def get_upload(upload_id: str) -> Optional[Dict]:
+    with get_connection() as con:
+        row = con.execute("SELECT * FROM uploads WHERE id=?", (upload_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def list_uploads(ws_id: str) -> List[Dict]:
+    with get_connection() as con:
+        rows = con.execute(
+            "SELECT * FROM uploads WHERE workspace_id=? ORDER BY created_at", (ws_id,)
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def advance_offset(upload_id: str, expected: int, new_offset: int) -> bool:
+    """Move the offset forward; False if another request changed it meanwhile."""
+    with get_connection() as con:
+        cur = con.execute(
+            "UPDATE uploads SET offset=?, updated_at=? WHERE id=? AND offset=?",
+            (new_offset, datetime.utcnow().isoformat(), upload_id, expected)
+        )
+        return cur.rowcount == 1
+
+
+def delete_upload(upload_id: str) -> None:
+    with get_connection() as con:
+        con.execute("DELETE FROM uploads WHERE id=?", (upload_id,))
+
+
+def delete_uploads(ws_id: str) -> None:
+    with get_connection() as con:
+        con.execute("DELETE FROM uploads WHERE workspace_id=?", (ws_id,))
+
+
+def stale_uploads(max_age_hours: float) -> List[Dict]:
+    """Sessions without progress for max_age_hours (abandoned by their client)."""
+    cutoff = (datetime.utcnow() - timedelta(hours=max_age_hours)).isoformat()
+    with get_connection() as con:
+        rows = con.execute("SELECT * FROM uploads WHERE updated_at < ?", (cutoff,)).fetchall()
+    return [dict(r) for r in rows]
+
+
+# Ensure the table exists on import
+init_uploads()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Line Image Benchmark
+
+Compares line preprocessing settings (see core/line_image.py): payload size of
+the base64 image and end-to-end latency of OllamaClient.transcribe_line
+against the mock server in scripts/mock_ollama.py.
+
+Usage:
+    python scripts/bench_line_images.py [--lines 20] [--dpi-scale 1.5]
+"""
+
+import argparse
+import base64
+import io
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from core.line_image import LineImageOptions, prepare_line_image  # noqa: E402
+from core.ollama_client import OllamaClient  # noqa: E402
+from mock_ollama import start_mock_server  # noqa: E402
+
+
+def synthetic_page(n_lines: int, scale: float):
+    """A noisy, slightly skewed 'scan' with n_lines text-like lines; returns (image, [(points, baseline)])."""
+    rnd = random.Random(42)
+    width, line_h = int(2400 * scale), int(90 * scale)
+    height = int(200 * scale) + n_lines * line_h
+    img = Image.new("RGB", (width, height), (236, 228, 210))
+    draw = ImageDraw.Draw(img)
+    lines = []
+    for i in range(n_lines):
+        x0, x1 = int(150 * scale), width - int(150 * scale)
+        y = int(150 * scale) + i * line_h
+        skew = rnd.uniform(-0.02, 0.02) * (x1 - x0)
+        x = x0
+        while x < x1:
+            w = rnd.randint(int(10 * scale), int(60 * scale))
+            yy = y + skew * (x - x0) / (x1 - x0)
+            draw.rectangle([x, yy - int(30 * scale), x + w, yy], fill=(40, 30, 25))
+            x += w + rnd.randint(int(8 * scale), int(25 * scale))
+        top, bottom = y - int(40 * scale), y + int(12 * scale)
+        points = [(x0, top), (x1, top + skew), (x1, bottom + skew), (x0, bottom)]
+        baseline = [(x0, y), (x1, y + skew)]
+        lines.append((points, baseline))
+    # Paper grain and scanner noise; a flat background would flatter PNG
+    noise = Image.effect_noise((width, height), 24).convert("RGB")
+    img = Image.blend(img.filter(ImageFilter.GaussianBlur(0.8)), noise, 0.15)
+    return img, lines
+
+
+CONFIGS = [
+    ("png full-res (legacy)", LineImageOptions.lossless()),
+    ("jpeg h=64 q=80", LineImageOptions(target_height=64, quality=80)),
+    ("jpeg h=96 q=85 (default)", LineImageOptions()),
+    ("jpeg h=128 q=90", LineImageOptions(target_height=128, quality=90)),
+    ("jpeg h=96 masked", LineImageOptions(mask=True)),
+    ("webp h=96 q=80", LineImageOptions(format="WEBP", quality=80)),
+    ("webp h=64 q=75", LineImageOptions(target_height=64, format="WEBP", quality=75)),
+    ("jpeg h=96 color, no deskew", LineImageOptions(grayscale=False, deskew=False)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark line image preprocessing")
+    parser.add_argument("--lines", type=int, default=20, help="Lines per configuration")
+    parser.add_argument("--dpi-scale", type=float, default=1.5, help="Scale of the synthetic scan (1.5 ~ 400 dpi)")
+    parser.add_argument("--base-ms", type=float, default=50.0, help="Mock base latency")
+    parser.add_argument("--per-mpx-ms", type=float, default=2000.0, help="Mock latency per image megapixel")
+    args = parser.parse_args()
+
+    server = start_mock_server(0, base_ms=args.base_ms, per_mpx_ms=args.per_mpx_ms)
+    client = OllamaClient(base_url=f"http://127.0.0.1:{server.server_address[1]}")
+    page, lines = synthetic_page(args.lines, args.dpi_scale)
+    print(f"Synthetic page {page.width}x{page.height}, {len(lines)} lines\n")
+
+    header = f"{'config':<28} {'prep ms':>8} {'avg b64 KB':>11} {'avg px':>12} {'p50 ms':>8} {'max ms':>8}"
+    print(header)
+    print("-" * len(header))
+    baseline_kb = None
+    for name, opts in CONFIGS:
+        prep, sizes, dims, latencies = [], [], [], []
+        for points, baseline in lines:
+            t0 = time.perf_counter()
+            raw = prepare_line_image(page, points, baseline, opts)
+            b64 = base64.b64encode(raw).decode("utf-8")
+            prep.append(time.perf_counter() - t0)
+            sizes.append(len(b64))
+            with Image.open(io.BytesIO(raw)) as im:
+                dims.append(im.width * im.height)
+            t0 = time.perf_counter()
+            client.transcribe_line(b64)
+            latencies.append(time.perf_counter() - t0)
+        avg_kb = statistics.mean(sizes) / 1024
+        baseline_kb = baseline_kb or avg_kb
+        print(f"{name:<28} {1000 * statistics.mean(prep):>8.1f} {avg_kb:>11.1f} "
+              f"{statistics.mean(dims):>12,.0f} {1000 * statistics.median(latencies):>8.0f} "
+              f"{1000 * max(latencies):>8.0f}"
+              + (f"   ({avg_kb / baseline_kb:.1%} of legacy payload)" if avg_kb != baseline_kb else ""))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+LLM Endpoint Benchmark
+
+Drives the viewer's LLM endpoints at a given concurrency and reports latency
+percentiles (p50/p95/p99) and throughput:
+
+- transcribe  POST /api/llm/transcribe         (one line per request)
+- stream      POST /api/llm/transcribe/stream  (also time to first token)
+- batch       POST /api/llm/transcribe-batch   (--batch-size lines per request; the
+              queued jobs are polled until all have finished)
+
+Either point it at a running viewer and workspace:
+    python scripts/bench_llm.py --url http://localhost:5000 --workspace WS_ID --path page.xml
+
+or let it start everything in-process (mock Ollama from scripts/mock_ollama.py,
+the Flask app in a temporary data directory and a synthetic workspace):
+    python scripts/bench_llm.py --serve --mode batch --concurrency 4 --latency lognormal --jitter-ms 200
+
+Results are bypassed in the LLM cache (force=1) unless --use-cache is given.
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+SCRIPTS = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS.parent))
+sys.path.insert(0, str(SCRIPTS))
+
+PAGE_NS = "http://schema.primaresearch.org/PAGE/gts/pagecontent/2019-07-15"
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), int(round(pct / 100 * len(ordered) + 0.5))))
+    return ordered[rank - 1]
+
+
+# ---------- in-process setup (--serve) ----------
+
+def write_fixture_workspace(root: Path, n_lines: int) -> tuple[str, str]:
+    """Write a synthetic page image + PAGE-XML into data/workspaces/<id>; returns (ws_id, path)."""
+    from bench_line_images import synthetic_page
+
+    ws_id = "bench-llm"
+    base = root / "data" / "workspaces" / ws_id
+    (base / "images").mkdir(parents=True, exist_ok=True)
+    (base / "pages").mkdir(parents=True, exist_ok=True)
+
+    page, lines = synthetic_page(n_lines, 1.5)
+    page.save(base / "images" / "bench.png")
+
+    def pts(points):
+        return " ".join(f"{int(x)},{int(y)}" for x, y in points)
+
+    text_lines = "".join(
+        f'<TextLine id="l{i}"><Coords points="{pts(p)}"/><Baseline points="{pts(b)}"/></TextLine>'
+        for i, (p, b) in enumerate(lines)
+    )
+    (base / "pages" / "bench.xml").write_text(
+        f'<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<PcGts xmlns="{PAGE_NS}"><Metadata><Creator>bench</Creator>'
+        f'<Created>2024-01-01T00:00:00</Created><LastChange>2024-01-01T00:00:00</LastChange></Metadata>'
+        f'<Page imageFilename="bench.png" imageWidth="{page.width}" imageHeight="{page.height}">'
+        f'<TextRegion id="r0"><Coords points="0,0 {page.width},0 {page.width},{page.height} 0,{page.height}"/>'
+        f'{text_lines}</TextRegion></Page></PcGts>\n',
+        encoding="utf-8",
+    )
+    return ws_id, "bench.xml"
+
+
+def serve_in_process(args) -> tuple[str, str, str]:
+    """Start mock Ollama + the app on free ports in a temp directory; returns (url, ws_id, path)."""
+    from mock_ollama import start_mock_server
+
+    mock = start_mock_server(
+        0, latency=args.latency, base_ms=args.base_ms, jitter_ms=args.jitter_ms,
+        tokens_per_s=args.tokens_per_s, parallel=args.parallel, error_rate=args.error_rate,
+        max_batch=args.max_batch, seed=args.seed,
+    )
+    tmp = Path(tempfile.mkdtemp(prefix="bench-llm-"))
+    ws_id, path = write_fixture_workspace(tmp, args.lines)
+
+    # The app resolves data/ relative to the working directory at import time
+    os.chdir(tmp)
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{mock.server_address[1]}"
+    os.environ.pop("OLLAMA_BACKENDS", None)
+    os.environ.setdefault("LLM_CACHE_PATH", str(tmp / "data" / "llm_cache.db"))
+
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving app on http://127.0.0.1:{server.server_port} (data in {tmp}), "
+          f"mock Ollama on {os.environ['OLLAMA_BASE_URL']}")
+    return f"http://127.0.0.1:{server.server_port}", ws_id, path
+
+
+# ---------- load generation ----------
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def wait_for_jobs(args, url: str, job_ids: list, started: float) -> list:
+    """Poll queued LLM jobs until all have finished; returns their final rows."""
+    pending, finished = list(job_ids), []
+    while pending:
+        if time.perf_counter() - started > args.timeout:
+            raise requests.Timeout("jobs did not finish in time")
+        job = _session().get(f"{url}/api/llm/jobs/{pending[0]}", timeout=args.timeout).json()
+        if job["status"] in ("done", "failed", "cancelled"):
+            finished.append(job)
+            pending.pop(0)
+        else:
+            time.sleep(0.05)
+    return finished
+
+
+def call(args, url: str, body: dict) -> dict:
+    """Issue one request; returns {"ok", "status", "latency", "ttft", "lines"}."""
+    endpoint = {"transcribe": "/api/llm/transcribe",
+                "stream": "/api/llm/transcribe/stream",
+                "batch": "/api/llm/transcribe-batch"}[args.mode]
+    started = time.perf_counter()
+    ttft = None
+    try:
+        if args.mode == "stream":
+            with _session().post(url + endpoint, json=body, stream=True, timeout=args.timeout) as r:
+                ok = r.status_code == 200
+                event = None
+                for raw in r.iter_lines(decode_unicode=True):
+                    if raw.startswith("event:"):
+                        event = raw[6:].strip()
+                        if event == "token" and ttft is None:
+                            ttft = time.perf_counter() - started
+                        if event == "error":
+                            ok = False
+                    elif raw.startswith("data:") and event == "done" and ttft is None:
+                        ttft = time.perf_counter() - started  # cached answer
+                status = r.status_code if ok or r.status_code != 200 else "stream-error"
+        else:
+            r = _session().post(url + endpoint, json=body, timeout=args.timeout)
+            ok = r.status_code == (202 if args.mode == "batch" else 200)
+            status = r.status_code
+            if ok and args.mode == "batch":
+                jobs = wait_for_jobs(args, url, [j["job_id"] for j in r.json()["jobs"]], started)
+                ok = all(job["status"] == "done" for job in jobs)
+                if ok:
+                    ok = all(res.get("transcription") for job in jobs for res in job["result"]["results"])
+                    status = 200 if ok else "empty-lines"
+                else:
+                    status = next(job["status"] for job in jobs if job["status"] != "done")
+    except requests.RequestException as e:
+        ok, status = False, type(e).__name__
+    return {
+        "ok": ok,
+        "status": status,
+        "latency": time.perf_counter() - started,
+        "ttft": ttft,
+        "lines": len(body.get("line_ids") or [1]),
+    }
+
+
+def build_bodies(args, ws_id: str, path: str, line_ids: list) -> list:
+    common = {"workspace_id": ws_id, "path": path, "language": args.language}
+    if not args.use_cache:
+        common["force"] = True
+    bodies = []
+    for i in range(args.requests):
+        if args.mode == "batch":
+            start = (i * args.batch_size) % len(line_ids)
+            chunk = [line_ids[(start + k) % len(line_ids)] for k in range(args.batch_size)]
+            bodies.append({**common, "line_ids": chunk, "batch_size": args.batch_size, "layout": args.layout})
+        else:
+            bodies.append({**common, "line_id": line_ids[i % len(line_ids)]})
+    return bodies
+
+
+def report(args, results: list, elapsed: float) -> None:
+    ok = [r for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+    print(f"\nmode={args.mode} concurrency={args.concurrency} requests={len(results)} "
+          f"ok={len(ok)} failed={len(failed)} wall={elapsed:.2f}s")
+    if failed:
+        by_status = {}
+        for r in failed:
+            by_status[str(r["status"])] = by_status.get(str(r["status"]), 0) + 1
+        print("failures: " + ", ".join(f"{k}={v}" for k, v in sorted(by_status.items())))
+    if not ok:
+        return
+
+    def row(name, values):
+        ms = [1000 * v for v in values]
+        print(f"{name:<12} {percentile(ms, 50):>8.0f} {percentile(ms, 95):>8.0f} {percentile(ms, 99):>8.0f} "
+              f"{statistics.mean(ms):>8.0f} {max(ms):>8.0f}")
+
+    print(f"\n{'ms':<12} {'p50':>8} {'p95':>8} {'p99':>8} {'mean':>8} {'max':>8}")
+    row("latency", [r["latency"] for r in ok])
+    ttfts = [r["ttft"] for r in ok if r["ttft"] is not None]
+    if ttfts:
+        row("first token", ttfts)
+    lines = sum(r["lines"] for r in ok)
+    print(f"\nthroughput: {len(ok) / elapsed:.2f} req/s, {lines / elapsed:.2f} lines/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the LLM endpoints")
+    parser.add_argument("--url", default="http://localhost:5000", help="Viewer base URL")
+    parser.add_argument("--workspace", help="Workspace id (not needed with --serve)")
+    parser.add_argument("--path", help="PAGE-XML path within the workspace (not needed with --serve)")
+    parser.add_argument("--mode", choices=("transcribe", "stream", "batch"), default="transcribe")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--layout", choices=("images", "stacked"), default="images")
+    parser.add_argument("--language", default="German")
+    parser.add_argument("--use-cache", action="store_true", help="Do not send force=1")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--warmup", type=int, default=1, help="Requests sent before measuring")
+
+    serve = parser.add_argument_group("in-process mode")
+    serve.add_argument("--serve", action="store_true", help="Start mock Ollama + app locally")
+    serve.add_argument("--lines", type=int, default=24, help="Lines on the synthetic page")
+    serve.add_argument("--latency", default="lognormal", help="Mock latency distribution")
+    serve.add_argument("--base-ms", type=float, default=500.0)
+    serve.add_argument("--jitter-ms", type=float, default=150.0)
+    serve.add_argument("--tokens-per-s", type=float, default=60.0)
+    serve.add_argument("--parallel", type=int, default=2, help="Requests the mock processes at once")
+    serve.add_argument("--error-rate", type=float, default=0.0)
+    serve.add_argument("--max-batch", type=int, default=0)
+    serve.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.serve:
+        url, ws_id, path = serve_in_process(args)
+    else:
+        if not args.workspace or not args.path:
+            parser.error("--workspace and --path are required unless --serve is given")
+        url, ws_id, path = args.url.rstrip("/"), args.workspace, args.path
+
+    r = requests.get(f"{url}/api/page", params={"workspace_id": ws_id, "path": path}, timeout=60)
+    r.raise_for_status()
+    line_ids = [ln["id"] for ln in r.json().get("lines", []) if ln.get("id")]
+    if not line_ids:
+        sys.exit("Page has no text lines")
+    status = requests.get(f"{url}/api/llm/status", timeout=30).json()
+    print(f"{len(line_ids)} lines; LLM available={status.get('available')} backends={len(status.get('backends', []))}")
+
+    bodies = build_bodies(args, ws_id, path, line_ids)
+    for body in bodies[:args.warmup]:
+        call(args, url, body)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda b: call(args, url, b), bodies))
+    report(args, results, time.perf_counter() - started)
+
+    if args.serve:
+        mock_url = os.environ["OLLAMA_BASE_URL"]
+        print("mock: " + json.dumps(requests.get(f"{mock_url}/mock/stats", timeout=5).json()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+LLM Batch Size Benchmark
+
+Transcribes the lines of a synthetic page with OllamaClient.transcribe_lines
+at different batch sizes and layouts against scripts/mock_ollama.py, and
+reports throughput (lines/s) to find the best LLM_BATCH_SIZE.
+
+The mock's cost model (fixed per-request overhead, per-image cost, token
+rate, limited parallel slots, truncated answers above --max-batch) decides
+the outcome, so tune it to what a real backend measures.
+
+Usage:
+    python scripts/bench_llm_batch.py [--lines 48] [--sizes 1,2,4,8,16] [--max-batch 12]
+"""
+
+import argparse
+import base64
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from core.line_image import LineImageOptions, prepare_line_image  # noqa: E402
+from core.ollama_client import OllamaClient  # noqa: E402
+from mock_ollama import start_mock_server  # noqa: E402
+from bench_line_images import synthetic_page  # noqa: E402
+
+
+def run(client: OllamaClient, images: list, batch_size: int, layout: str, concurrency: int) -> dict:
+    chunks = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda chunk: client.transcribe_lines(chunk, layout=layout), chunks))
+    elapsed = time.perf_counter() - started
+    fallbacks = sum(1 for _, batched in outcomes if not batched)
+    requests = sum(1 if batched else 1 + len(chunk) for chunk, (_, batched) in zip(chunks, outcomes))
+    missing = sum(1 for texts, _ in outcomes for t in texts if not t)
+    return {
+        "elapsed": elapsed,
+        "lines_per_s": len(images) / elapsed,
+        "requests": requests,
+        "fallbacks": fallbacks,
+        "missing": missing,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the LLM batch size with the best throughput")
+    parser.add_argument("--lines", type=int, default=48)
+    parser.add_argument("--sizes", default="1,2,4,8,12,16")
+    parser.add_argument("--layouts", default="images,stacked")
+    parser.add_argument("--concurrency", type=int, default=2, help="Client threads (LLM_WORKERS)")
+    parser.add_argument("--base-ms", type=float, default=400.0, help="Mock fixed cost per request")
+    parser.add_argument("--per-image-ms", type=float, default=60.0)
+    parser.add_argument("--per-mpx-ms", type=float, default=600.0)
+    parser.add_argument("--tokens-per-s", type=float, default=250.0)
+    parser.add_argument("--parallel", type=int, default=1, help="Requests the mock processes at once")
+    parser.add_argument("--max-batch", type=int, default=12, help="Mock truncates answers above this many lines")
+    args = parser.parse_args()
+
+    server = start_mock_server(0, base_ms=args.base_ms, per_image_ms=args.per_image_ms,
+                               per_mpx_ms=args.per_mpx_ms, tokens_per_s=args.tokens_per_s,
+                               parallel=args.parallel, max_batch=args.max_batch)
+    client = OllamaClient(base_url=f"http://127.0.0.1:{server.server_address[1]}")
+
+    page, lines = synthetic_page(args.lines, 1.5)
+    opts = LineImageOptions()
+    images = [base64.b64encode(prepare_line_image(page, pts, bl, opts)).decode("utf-8") for pts, bl in lines]
+    print(f"{len(images)} lines, concurrency {args.concurrency}, mock parallel {args.parallel}\n")
+
+    header = f"{'layout':<8} {'batch':>5} {'seconds':>8} {'lines/s':>8} {'requests':>9} {'fallbacks':>9}"
+    print(header)
+    print("-" * len(header))
+    best = None
+    for layout in [x.strip() for x in args.layouts.split(",") if x.strip()]:
+        for size in [int(x) for x in args.sizes.split(",") if x.strip()]:
+            r = run(client, images, size, layout, args.concurrency)
+            print(f"{layout:<8} {size:>5} {r['elapsed']:>8.2f} {r['lines_per_s']:>8.2f} "
+                  f"{r['requests']:>9} {r['fallbacks']:>9}" + (f"  ({r['missing']} empty)" if r["missing"] else ""))
+            if best is None or r["lines_per_s"] > best[2]:
+                best = (layout, size, r["lines_per_s"])
+
+    server.shutdown()
+    if best:
+        print(f"\nBest: LLM_BATCH_LAYOUT={best[0]} LLM_BATCH_SIZE={best[1]} ({best[2]:.2f} lines/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+METS Index Benchmark
+
+Builds the METS index (see core/mets.py) of synthetic METS files with 1k, 10k
+and 50k pages using the full-tree reader and the iterparse reader, and reports
+wall time and peak memory (ru_maxrss) of each. Every measurement runs in its
+own subprocess so peak memory is not shared between runs; the reported delta
+is relative to a process that only imported the module. Also checks that both
+readers produce the same index.
+
+Usage:
+    python scripts/bench_mets_index.py [--pages 1000,10000,50000] [--keep DIR]
+"""
+
+import argparse
+import hashlib
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+GROUPS = [
+    ("OCR-D-IMG", "image/tiff", "tif"),
+    ("OCR-D-IMG-BIN", "image/png", "png"),
+    ("OCR-D-OCR", "application/vnd.prima.page+xml", "xml"),
+    ("OCR-D-GT-PAGE", "application/vnd.prima.page+xml", "xml"),
+]
+
+
+def write_synthetic_mets(path: Path, pages: int) -> None:
+    """Write a serial-like METS: MODS header, four fileGrps, PHYSICAL + LOGICAL structMaps, structLink."""
+    with open(path, "w", encoding="utf-8") as out:
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                  '<mets:mets xmlns:mets="http://www.loc.gov/METS/" xmlns:xlink="http://www.w3.org/1999/xlink" '
+                  'xmlns:mods="http://www.loc.gov/mods/v3">\n'
+                  '<mets:metsHdr CREATEDATE="2024-01-01T00:00:00"><mets:agent ROLE="CREATOR" TYPE="OTHERTYPE" '
+                  'OTHERTYPE="SOFTWARE"><mets:name>bench</mets:name></mets:agent></mets:metsHdr>\n'
+                  '<mets:dmdSec ID="DMDLOG_0000"><mets:mdWrap MDTYPE="MODS"><mets:xmlData><mods:mods>'
+                  '<mods:titleInfo><mods:title>Synthetic serial</mods:title></mods:titleInfo>'
+                  '</mods:mods></mets:xmlData></mets:mdWrap></mets:dmdSec>\n<mets:fileSec>\n')
+        for grp, mimetype, ext in GROUPS:
+            out.write(f'<mets:fileGrp USE="{grp}">\n')
+            for i in range(1, pages + 1):
+                out.write(f'<mets:file ID="{grp}_{i:05d}" MIMETYPE="{mimetype}"><mets:FLocat LOCTYPE="OTHER" '
+                          f'OTHERLOCTYPE="FILE" xlink:href="{grp}/{grp}_{i:05d}.{ext}"/></mets:file>\n')
+            out.write('</mets:fileGrp>\n')
+        out.write('</mets:fileSec>\n<mets:structMap TYPE="PHYSICAL"><mets:div TYPE="physSequence" ID="PHYS_0000">\n')
+        for i in range(1, pages + 1):
+            out.write(f'<mets:div TYPE="page" ID="PHYS_{i:05d}" ORDER="{i}">')
+            out.write("".join(f'<mets:fptr FILEID="{grp}_{i:05d}"/>' for grp, _, _ in GROUPS))
+            out.write('</mets:div>\n')
+        out.write('</mets:div></mets:structMap>\n<mets:structMap TYPE="LOGICAL"><mets:div TYPE="periodical" '
+                  'ID="LOG_0000">\n')
+        for issue in range(0, pages, 20):
+            out.write(f'<mets:div TYPE="issue" ID="LOG_{issue // 20 + 1:05d}" LABEL="Issue {issue // 20 + 1}"/>\n')
+        out.write('</mets:div></mets:structMap>\n<mets:structLink>\n')
+        for i in range(1, pages + 1):
+            out.write(f'<mets:smLink xlink:from="LOG_{(i - 1) // 20 + 1:05d}" xlink:to="PHYS_{i:05d}"/>\n')
+        out.write('</mets:structLink>\n</mets:mets>\n')
+
+
+def child(mode: str, mets_path: str) -> None:
+    """Run one measurement in this (fresh) process and print it as JSON."""
+    from core.mets import build_mets_index
+
+    started = time.perf_counter()
+    index = build_mets_index(mets_path, streaming=(mode == "iterparse")) if mode != "baseline" else None
+    elapsed = time.perf_counter() - started
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # before hashing inflates it
+    digest = ""
+    if index is not None:
+        digest = hashlib.sha1(json.dumps(index.to_dict(), sort_keys=True).encode("utf-8")).hexdigest()
+    if sys.platform == "darwin":
+        maxrss //= 1024  # bytes on macOS, KiB on Linux
+    print(json.dumps({"seconds": elapsed, "maxrss_kb": maxrss, "digest": digest}))
+
+
+def measure(mode: str, mets_path: Path) -> dict:
+    out = subprocess.run([sys.executable, __file__, "--child", mode, str(mets_path)],
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full-tree vs. iterparse METS indexing")
+    parser.add_argument("--pages", default="1000,10000,50000", help="Comma-separated page counts")
+    parser.add_argument("--keep", help="Write the synthetic METS files here instead of a temp dir")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "METS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    workdir = Path(args.keep or tempfile.mkdtemp(prefix="bench-mets-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    base_kb = measure("baseline", Path(__file__))["maxrss_kb"]
+    print(f"Interpreter + lxml baseline: {base_kb / 1024:.1f} MiB\n")
+
+    header = f"{'pages':>7} {'METS MiB':>9} {'reader':<10} {'seconds':>8} {'peak MiB':>9} {'+ MiB':>8}"
+    print(header)
+    print("-" * len(header))
+    for pages in [int(x) for x in args.pages.split(",") if x.strip()]:
+        mets_path = workdir / f"mets_{pages}.xml"
+        if not mets_path.exists():
+            write_synthetic_mets(mets_path, pages)
+        size_mb = mets_path.stat().st_size / (1024 * 1024)
+        digests = set()
+        for mode in ("tree", "iterparse"):
+            r = measure(mode, mets_path)
+            digests.add(r["digest"])
+            print(f"{pages:>7} {size_mb:>9.1f} {mode:<10} {r['seconds']:>8.2f} {r['maxrss_kb'] / 1024:>9.1f} "
+                  f"{(r['maxrss_kb'] - base_kb) / 1024:>8.1f}")
+        if len(digests) != 1:
+            print(f"{pages:>7} MISMATCH: the readers built different indexes")
+
+    if not args.keep:
+        for p in workdir.glob("mets_*.xml"):
+            p.unlink()
+        workdir.rmdir()
+
+
+if __name__ == "__main__":
+    main()
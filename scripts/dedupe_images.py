@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Move Existing Workspace Images into the Blob Store
+
+Workspaces created before the blob store (see core/blobstore.py) hold their
+own copy of every image. This adopts them: each images/<name> is hashed and
+replaced by a link to its blob, so identical scans across workspaces end up
+stored once. Safe to run repeatedly; images already linked are skipped
+quickly by the hash lookup.
+
+Images linked in by a server-side import (/api/import-path) are left alone:
+symlinks, and hardlinks that are not a blob. Adopting a hardlink would make
+the blob another name of the pipeline's source file, so editing either one
+would change the other.
+
+Run from the application directory (data/ is resolved relative to it):
+    python scripts/dedupe_images.py [--dry-run]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+WORKSPACES = Path("data/workspaces")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adopt existing workspace images into the blob store")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the images")
+    args = parser.parse_args()
+
+    from core.blobstore import linked_blob, store_file
+    from core.imports import IMAGE_EXTS
+
+    files = saved = skipped = 0
+    for images in sorted(WORKSPACES.glob("*/images")):
+        ws_id = images.parent.name
+        for path in sorted(images.iterdir()):
+            if path.is_symlink() or not path.is_file() or not path.name.lower().endswith(IMAGE_EXTS):
+                continue  # symlinks point into an ingest root (server-side import); leave them
+            if path.stat().st_nlink > 1 and not linked_blob(ws_id, path.name, path):
+                skipped += 1  # a hardlink into an ingest root
+                continue
+            files += 1
+            if args.dry_run:
+                continue
+            result = store_file(path, ws_id, path.name, path)
+            if result["deduplicated"]:
+                saved += result["size"]
+        print(f"{ws_id}: done")
+    action = "found" if args.dry_run else "adopted"
+    print(f"{files} images {action}; {saved / (1024 * 1024):.1f} MiB freed by deduplication; "
+          f"{skipped} linked images from server-side imports left alone")
+
+
+if __name__ == "__main__":
+    main()
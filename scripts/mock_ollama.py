@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Mock Ollama Server
+
+Offline stand-in for an Ollama instance, so api/llm.py and OllamaClient can
+be exercised and load-tested without a model. Implements:
+
+- GET  /api/tags      - one fake model
+- GET  /api/version
+- POST /api/generate  - streaming (NDJSON, the Ollama default) and non-streaming
+- GET  /mock/stats    - request/error counters of the mock itself
+
+Timing model per request:
+    time to first token = latency sample (fixed | uniform | normal | lognormal | exponential,
+                          mean base_ms, spread jitter_ms)
+                          + per_kb * payload_kb + per_image * images + per_mpx * image_megapixels
+    generation          = output_tokens / tokens_per_s
+At most `parallel` requests are processed at once (like OLLAMA_NUM_PARALLEL);
+the others wait for a slot, as they would on a single GPU.
+
+Failure injection (probabilities per request):
+    error_rate        - HTTP 500 with {"error": ...}
+    stream_error_rate - streaming only: an {"error": ...} chunk halfway through
+    timeout_rate      - hold the connection for hang_s seconds, then drop it
+    malformed_rate    - answer with text that is not the requested JSON
+
+Requests with "format": "json" get a batch answer {"lines": [...]} with one
+entry per line (counted from the prompt); above max_batch the answer is
+truncated, as a model losing track of long batches would.
+
+Usage:
+    python scripts/mock_ollama.py [--port 11435] [--latency lognormal --base-ms 800 --jitter-ms 300]
+                                  [--tokens-per-s 30] [--error-rate 0.02] [--parallel 1]
+"""
+
+import argparse
+import base64
+import io
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+try:
+    from PIL import Image
+except ImportError:  # image cost is then ignored
+    Image = None
+
+
+DEFAULTS = {
+    "model": "llama3.2-vision",
+    "reply": "Lorem ipsum dolor sit amet",
+    "latency": "fixed",
+    "base_ms": 300.0,
+    "jitter_ms": 0.0,
+    "per_kb_ms": 0.5,
+    "per_image_ms": 150.0,
+    "per_mpx_ms": 2000.0,
+    "tokens_per_s": 50.0,
+    "parallel": 1,
+    "max_batch": 0,  # 0 = no limit
+    "error_rate": 0.0,
+    "stream_error_rate": 0.0,
+    "timeout_rate": 0.0,
+    "malformed_rate": 0.0,
+    "hang_s": 30.0,
+    "seed": None,
+}
+
+LATENCY_MODELS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+
+def sample_latency_ms(rnd: random.Random, model: str, mean: float, spread: float) -> float:
+    """Draw one base latency (ms) from the configured distribution."""
+    if model == "uniform":
+        value = rnd.uniform(mean - spread, mean + spread)
+    elif model == "normal":
+        value = rnd.gauss(mean, spread)
+    elif model == "lognormal":
+        # Parameterized so that the distribution has the given mean and standard deviation
+        if mean <= 0:
+            return 0.0
+        sigma2 = math.log(1 + (spread / mean) ** 2)
+        mu = math.log(mean) - sigma2 / 2
+        value = rnd.lognormvariate(mu, sigma2 ** 0.5)
+    elif model == "exponential":
+        value = rnd.expovariate(1 / mean) if mean > 0 else 0.0
+    else:
+        value = mean
+    return max(0.0, value)
+
+
+def _image_megapixels(images) -> float:
+    if Image is None:
+        return 0.0
+    total = 0.0
+    for b64 in images or []:
+        try:
+            with Image.open(io.BytesIO(base64.b64decode(b64))) as im:
+                total += im.width * im.height / 1e6
+        except Exception:
+            continue
+    return total
+
+
+def _batch_count(req: dict) -> int:
+    m = re.search(r"(\d+) (?:images|lines)", req.get("prompt", ""))
+    return int(m.group(1)) if m else len(req.get("images") or []) or 1
+
+
+def _reply(req: dict, cfg: dict) -> str:
+    if req.get("format") != "json":
+        return cfg["reply"]
+    count = _batch_count(req)
+    entries = [{"n": i + 1, "text": f"{cfg['reply']} {i + 1}"} for i in range(count)]
+    if cfg["max_batch"] and count > cfg["max_batch"]:
+        entries = entries[:cfg["max_batch"]]
+    return json.dumps({"lines": entries})
+
+
+def _tokens(text: str) -> list:
+    """Split into pseudo tokens (words and JSON punctuation), keeping all characters."""
+    return re.findall(r"\s*[\w']+|\s*[^\w\s]|\s+", text) or [text]
+
+
+class MockStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "streamed": 0, "ok": 0, "errors": 0, "stream_errors": 0,
+                       "timeouts": 0, "malformed": 0, "in_flight": 0, "max_in_flight": 0}
+
+    def bump(self, key: str, delta: int = 1):
+        with self.lock:
+            self.counts[key] += delta
+            if key == "in_flight":
+                self.counts["max_in_flight"] = max(self.counts["max_in_flight"], self.counts["in_flight"])
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return dict(self.counts)
+
+
+def make_handler(cfg: dict, stats: MockStats):
+    slots = threading.Semaphore(max(1, int(cfg["parallel"])))
+    rnd = random.Random(cfg.get("seed"))
+    rnd_lock = threading.Lock()
+
+    def chance(p: float) -> bool:
+        if p <= 0:
+            return False
+        with rnd_lock:
+            return rnd.random() < p
+
+    class MockOllamaHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status: int, obj: dict):
+            body = json.dumps(obj).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split("?")[0].rstrip("/")
+            if path == "/api/tags":
+                self._json(200, {"models": [{"name": cfg["model"], "model": cfg["model"], "size": 0}]})
+            elif path == "/api/version":
+                self._json(200, {"version": "0.0.0-mock"})
+            elif path == "/mock/stats":
+                self._json(200, stats.snapshot())
+            else:
+                self._json(404, {"error": "not found"})
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+            if self.path.split("?")[0].rstrip("/") != "/api/generate":
+                self._json(404, {"error": "not found"})
+                return
+            try:
+                req = json.loads(raw or b"{}")
+            except ValueError:
+                self._json(400, {"error": "invalid JSON"})
+                return
+
+            stats.bump("requests")
+            stats.bump("in_flight")
+            try:
+                with slots:
+                    self._generate(req, len(raw))
+            finally:
+                stats.bump("in_flight", -1)
+
+        def _generate(self, req: dict, payload_bytes: int):
+            stream = req.get("stream", True)
+            images = req.get("images") or []
+            with rnd_lock:
+                ttft_ms = sample_latency_ms(rnd, cfg["latency"], cfg["base_ms"], cfg["jitter_ms"])
+            ttft_ms += (cfg["per_kb_ms"] * payload_bytes / 1024
+                        + cfg["per_image_ms"] * len(images)
+                        + cfg["per_mpx_ms"] * _image_megapixels(images))
+
+            if chance(cfg["timeout_rate"]):
+                stats.bump("timeouts")
+                time.sleep(cfg["hang_s"])
+                self.close_connection = True
+                return
+            time.sleep(ttft_ms / 1000)
+            if chance(cfg["error_rate"]):
+                stats.bump("errors")
+                self._json(500, {"error": "mock: model runner has unexpectedly stopped"})
+                return
+
+            text = _reply(req, cfg)
+            if chance(cfg["malformed_rate"]):
+                stats.bump("malformed")
+                text = "Sure! Here is the transcription you asked for:\n" + text[: len(text) // 2]
+            tokens = _tokens(text)
+            per_token = 1.0 / cfg["tokens_per_s"] if cfg["tokens_per_s"] > 0 else 0.0
+            model = req.get("model", cfg["model"])
+
+            if not stream:
+                time.sleep(per_token * len(tokens))
+                stats.bump("ok")
+                self._json(200, self._final(model, text, len(tokens), ttft_ms, per_token))
+                return
+
+            stats.bump("streamed")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            fail_at = len(tokens) // 2 if chance(cfg["stream_error_rate"]) else -1
+            try:
+                for i, tok in enumerate(tokens):
+                    if i == fail_at:
+                        stats.bump("stream_errors")
+                        self._chunk({"error": "mock: generation aborted"})
+                        break
+                    time.sleep(per_token)
+                    self._chunk({"model": model, "created_at": _now(), "response": tok, "done": False})
+                else:
+                    stats.bump("ok")
+                    self._chunk(self._final(model, "", len(tokens), ttft_ms, per_token))
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client went away
+
+        def _chunk(self, obj: dict):
+            data = (json.dumps(obj) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        @staticmethod
+        def _final(model: str, text: str, n_tokens: int, ttft_ms: float, per_token: float) -> dict:
+            eval_ns = int(n_tokens * per_token * 1e9)
+            return {
+                "model": model,
+                "created_at": _now(),
+                "response": text,
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": int(ttft_ms * 1e6) + eval_ns,
+                "prompt_eval_duration": int(ttft_ms * 1e6),
+                "eval_count": n_tokens,
+                "eval_duration": eval_ns,
+            }
+
+    return MockOllamaHandler
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def start_mock_server(port: int = 0, **overrides) -> ThreadingHTTPServer:
+    """Start the mock in a daemon thread; returns the server (see server.server_address)."""
+    cfg = {**DEFAULTS, **overrides}
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(cfg, MockStats()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Ollama server for LLM load tests")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--model", default=DEFAULTS["model"])
+    parser.add_argument("--reply", default=DEFAULTS["reply"])
+    parser.add_argument("--latency", choices=LATENCY_MODELS, default=DEFAULTS["latency"],
+                        help="Distribution of the time to first token")
+    parser.add_argument("--base-ms", type=float, default=DEFAULTS["base_ms"], help="Mean time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULTS["jitter_ms"],
+                        help="Spread: half-width (uniform) or standard deviation (normal, lognormal)")
+    parser.add_argument("--per-kb-ms", type=float, default=DEFAULTS["per_kb_ms"])
+    parser.add_argument("--per-image-ms", type=float, default=DEFAULTS["per_image_ms"])
+    parser.add_argument("--per-mpx-ms", type=float, default=DEFAULTS["per_mpx_ms"])
+    parser.add_argument("--tokens-per-s", type=float, default=DEFAULTS["tokens_per_s"])
+    parser.add_argument("--parallel", type=int, default=DEFAULTS["parallel"])
+    parser.add_argument("--max-batch", type=int, default=DEFAULTS["max_batch"])
+    parser.add_argument("--error-rate", type=float, default=DEFAULTS["error_rate"])
+    parser.add_argument("--stream-error-rate", type=float, default=DEFAULTS["stream_error_rate"])
+    parser.add_argument("--timeout-rate", type=float, default=DEFAULTS["timeout_rate"])
+    parser.add_argument("--malformed-rate", type=float, default=DEFAULTS["malformed_rate"])
+    parser.add_argument("--hang-s", type=float, default=DEFAULTS["hang_s"])
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    cfg = {k: getattr(args, k) for k in DEFAULTS}
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(cfg, MockStats()))
+    server.daemon_threads = True
+    print(f"Mock Ollama listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
 $(function () {
   let workspaceId = null;
   let pages = [];
+  let pageCount = 0; // pages in the workspace according to the server (page list is loaded lazily)
+  const PAGE_CHUNK = 100;
+  const WS_CHUNK = 50;
+  const SEARCH_CHUNK = 50;
+  let pageList = { offset: 0, done: true, loading: false, seq: 0 };
+  let wsList = { cursor: null, shown: 0, done: true, loading: false, seq: 0 };
+  let wsSearchTimer = null;
+  let searchState = { next: null, seq: 0 };
   let missingImages = [];
   let missingPageXML = [];
   let fileGrps = null;
@@ -8,6 +16,8 @@ $(function () {
   let currentLines = [];
   let currentRegions = [];
   let lineModalState = { lineId: null };
+  let currentSuggestions = {}; // line id -> background LLM transcription (not saved)
+  let suggestionTimer = null;
   let hasPendingChanges = false;
   const sectionIds = ['workspace', 'uploads', 'files', 'viewer'];
   let workspaceLabel = null;
@@ -125,6 +135,7 @@ $(function () {
     });
     $('.section-tab').parent().removeClass('is-active');
     $(`.section-tab[data-target="${id}"]`).parent().addClass('is-active');
+    if (id === 'files') maybeLoadMorePages();
   }
 
   function updateDownloadButton() {
@@ -201,19 +212,79 @@ $(function () {
     updateCommitUI(false);
   }
 
+  // --- Page list: fetched in chunks from /api/workspaces/<id>/pages while scrolling ---
   function renderPages() {
-    const tb = $('#pagesTableBody').empty();
-    if (!pages.length) {
-      tb.append('<tr><td><em>No PAGE-XML uploaded yet</em></td></tr>');
-    } else {
-      pages.forEach(name => {
-        const $a = $(`<a href="#" class="pageLink" data-name="${name}">${name}</a>`);
-        tb.append($('<tr>').append($('<td>').append($a)));
-      });
-    }
+    $('#pagesTableBody').empty();
+    $('#pagesCount').text('');
+    pageList = { offset: 0, done: false, loading: false, seq: pageList.seq + 1 };
     $('#files').show();
+    if (!workspaceId) {
+      pageList.done = true;
+      $('#pagesTableBody').append('<tr><td colspan="2"><em>No PAGE-XML uploaded yet</em></td></tr>');
+      return;
+    }
+    loadMorePages();
   }
 
+  function pageListFilter() {
+    switch ($('#selPageFilter').val()) {
+      case 'transcribed': return { transcribed: 1 };
+      case 'untranscribed': return { has_page: 1, transcribed: 0 };
+      case 'no-image': return { has_page: 1, has_image: 0 };
+      case 'no-page': return { has_page: 0 };
+      default: return {};
+    }
+  }
+
+  function pageRow(pg) {
+    const $a = $('<a href="#" class="pageLink"></a>').attr('data-name', pg.name).text(pg.name);
+    const $name = $('<td>').append($a);
+    if (!pg.has_page) $name.append(' <span class="tag is-light">not uploaded</span>');
+    else if (!pg.has_image) $name.append(' <span class="tag is-warning is-light">image missing</span>');
+    const $lines = $('<td class="has-text-right has-text-grey">')
+      .text(pg.has_page ? `${pg.transcribed_lines}/${pg.lines}` : '');
+    return $('<tr>').append($name, $lines);
+  }
+
+  function loadMorePages() {
+    if (!workspaceId || pageList.loading || pageList.done) return;
+    const seq = pageList.seq;
+    pageList.loading = true;
+    $.getJSON(`/api/workspaces/${encodeURIComponent(workspaceId)}/pages`,
+      Object.assign({ offset: pageList.offset, limit: PAGE_CHUNK }, pageListFilter()))
+      .done(function (resp) {
+        if (seq !== pageList.seq) return; // list was reset meanwhile
+        const tb = $('#pagesTableBody');
+        pageCount = resp.unfiltered_total || 0;
+        if (!resp.total) {
+          const msg = pageCount ? 'No pages match the filter' : 'No PAGE-XML uploaded yet';
+          tb.append(`<tr><td colspan="2"><em>${msg}</em></td></tr>`);
+        }
+        (resp.pages || []).forEach(pg => tb.append(pageRow(pg)));
+        pageList.offset += (resp.pages || []).length;
+        pageList.done = resp.next_offset === null;
+        $('#pagesCount').text(resp.total ? `(${pageList.offset} of ${resp.total})` : '');
+        updateCommitUI(false);
+      })
+      .fail(function () {
+        if (seq === pageList.seq) pageList.done = true;
+      })
+      .always(function () {
+        if (seq !== pageList.seq) return;
+        pageList.loading = false;
+        maybeLoadMorePages(); // keep going until the list fills its scroll area
+      });
+  }
+
+  function maybeLoadMorePages() {
+    const el = document.getElementById('pagesScroll');
+    if (!el || !$(el).is(':visible')) return;
+    if (el.scrollTop + el.clientHeight >= el.scrollHeight - 200) loadMorePages();
+  }
+
+  $('#pagesScroll').on('scroll', maybeLoadMorePages);
+  $('#selPageFilter').on('change', renderPages);
+
   function getRegionById(rid) {
     return currentRegions.find(r => r.id === rid);
   }
@@ -245,7 +316,7 @@ $(function () {
   }
 
   function canCommit() {
-    return workspaceId && pages.length > 0;
+    return workspaceId && (pages.length > 0 || pageCount > 0);
   }
 
   function updateCommitUI(committed = false) {
@@ -281,44 +352,102 @@ $(function () {
     }
   }
 
+  // --- Workspace list: fetched in chunks from /api/workspaces while scrolling ---
   function fetchWorkspaceList() {
     $('#workspaceTableBody').html('<tr><td colspan="4"><em>Loading...</em></td></tr>');
-    $.getJSON('/api/workspaces')
+    $('#wsCount').text('');
+    wsList = { cursor: null, shown: 0, done: false, loading: false, seq: wsList.seq + 1 };
+    loadMoreWorkspaces();
+  }
+
+  function workspaceListQuery() {
+    const [sort, order] = ($('#selWsSort').val() || 'updated_at:desc').split(':');
+    const params = { limit: WS_CHUNK, sort: sort, order: order };
+    const q = ($('#inpWsSearch').val() || '').trim();
+    if (q) params.q = q;
+    if (wsList.cursor) params.cursor = wsList.cursor;
+    return params;
+  }
+
+  function loadMoreWorkspaces() {
+    if (wsList.loading || wsList.done) return;
+    const seq = wsList.seq;
+    wsList.loading = true;
+    $.getJSON('/api/workspaces', workspaceListQuery())
       .done(function (resp) {
-        renderWorkspaceList(resp.workspaces || []);
+        if (seq !== wsList.seq) return; // list was reset meanwhile
+        const list = resp.workspaces || [];
+        if (!wsList.shown) renderWorkspaceList(list, resp.unfiltered_total > 0);
+        else appendWorkspaceRows(list);
+        wsList.shown += list.length;
+        wsList.cursor = resp.next_cursor;
+        wsList.done = !resp.next_cursor;
+        $('#wsCount').text(resp.total ? `${wsList.shown} of ${resp.total}` : '');
       })
       .fail(function () {
-        $('#workspaceTableBody').html('<tr><td colspan="4"><em>Failed to load workspaces</em></td></tr>');
+        if (seq !== wsList.seq) return;
+        wsList.done = true;
+        if (!wsList.shown) {
+          $('#workspaceTableBody').html('<tr><td colspan="4"><em>Failed to load workspaces</em></td></tr>');
+        }
+      })
+      .always(function () {
+        if (seq !== wsList.seq) return;
+        wsList.loading = false;
+        maybeLoadMoreWorkspaces(); // keep going until the list fills its scroll area
       });
   }
 
-  function renderWorkspaceList(list) {
+  function maybeLoadMoreWorkspaces() {
+    const el = document.getElementById('wsScroll');
+    if (!el || !$(el).is(':visible')) return;
+    if (el.scrollTop + el.clientHeight >= el.scrollHeight - 200) loadMoreWorkspaces();
+  }
+
+  $('#wsScroll').on('scroll', maybeLoadMoreWorkspaces);
+  $('#selWsSort').on('change', fetchWorkspaceList);
+  $('#inpWsSearch').on('input', function () {
+    clearTimeout(wsSearchTimer);
+    wsSearchTimer = setTimeout(fetchWorkspaceList, 300);
+  });
+
+  function workspaceRow(ws) {
+    const updated = ws.updated_at ? new Date(ws.updated_at).toLocaleString() : '-';
+    const row = $('<tr>');
+    const $label = $('<td>').append($('<strong>').text(ws.label || ws.id), '<br>',
+      $('<span class="is-size-7 has-text-grey">').text(ws.id));
+    row.append($label);
+    row.append($('<td>').text(ws.page_count != null ? ws.page_count : 0));
+    row.append($('<td>').text(updated));
+    const actions = $('<div class="buttons are-small"></div>');
+    actions.append($('<button class="button is-link is-light btn-load-ws">Load</button>').attr('data-id', ws.id));
+    actions.append($('<button class="button is-info is-light btn-download-ws">Download</button>').attr('data-id', ws.id));
+    actions.append($('<button class="button is-danger is-light btn-delete-ws">Delete</button>').attr('data-id', ws.id));
+    row.append($('<td>').append(actions));
+    return row;
+  }
+
+  function appendWorkspaceRows(list) {
+    const tb = $('#workspaceTableBody');
+    list.forEach(ws => tb.append(workspaceRow(ws)));
+  }
+
+  function renderWorkspaceList(list, anyWorkspaces) {
     const tb = $('#workspaceTableBody').empty();
     if (!list.length) {
-      tb.append('<tr><td colspan="4"><em>No workspaces yet</em></td></tr>');
+      const msg = anyWorkspaces ? 'No workspaces match the search' : 'No workspaces yet';
+      tb.append(`<tr><td colspan="4"><em>${msg}</em></td></tr>`);
       return;
     }
-    list.forEach(ws => {
-      const updated = ws.updated_at ? new Date(ws.updated_at).toLocaleString() : '-';
-      const label = ws.label || ws.id;
-      const row = $('<tr>');
-      row.append(`<td><strong>${label}</strong><br><span class="is-size-7 has-text-grey">${ws.id}</span></td>`);
-      row.append(`<td>${(ws.page_count != null ? ws.page_count : 0)}</td>`);
-      row.append(`<td>${updated}</td>`);
-      const actions = $('<div class="buttons are-small"></div>');
-      actions.append(`<button class="button is-link is-light btn-load-ws" data-id="${ws.id}">Load</button>`);
-      actions.append(`<button class="button is-info is-light btn-download-ws" data-id="${ws.id}">Download</button>`);
-      actions.append(`<button class="button is-danger is-light btn-delete-ws" data-id="${ws.id}">Delete</button>`);
-      row.append($('<td>').append(actions));
-      tb.append(row);
-    });
+    appendWorkspaceRows(list);
   }
 
-  function loadWorkspace(id) {
-    $.getJSON(`/api/workspaces/${encodeURIComponent(id)}`)
+  function loadWorkspace(id, onLoaded) {
+    $.getJSON(`/api/workspaces/${encodeURIComponent(id)}`, { pages: 0 })
       .done(function (resp) {
         setWs(resp.workspace_id, resp.label || (resp.state && resp.state.label));
-        pages = resp.pages || (resp.state && resp.state.pages) || [];
+        pages = [];
+        pageCount = resp.page_count || 0;
         missingImages = resp.missing_images || [];
         missingPageXML = resp.missing_pagexml || [];
         renderFileGrps(resp.file_grps || null);
@@ -330,6 +459,7 @@ $(function () {
         setPendingChanges(false);
         $('#wsLabelStatus').text('').removeClass('is-danger is-success');
         $('#wsStatus').text('').removeClass('is-danger is-success');
+        if (onLoaded) onLoaded();
       })
       .fail(function (xhr) {
         alert(`Failed to load workspace: ${xhr.responseText || xhr.status}`);
@@ -363,6 +493,98 @@ $(function () {
   $('#metsInput').on('change', function () { updateFileName(this, '#metsInputName'); });
   $('#pagesInput').on('change', function () { updateFileName(this, '#pagesInputName'); });
   $('#imagesInput').on('change', function () { updateFileName(this, '#imagesInputName'); });
+  $('#zipInput').on('change', function () { updateFileName(this, '#zipInputName'); });
+
+  // --- Background jobs (/api/jobs): imports, commits, exports ---
+  function pollJob(jobId, onFinished, onProgress, onError) {
+    $.getJSON(`/api/jobs/${encodeURIComponent(jobId)}`)
+      .done(function (job) {
+        if (['done', 'failed', 'cancelled'].includes(job.status)) {
+          onFinished(job);
+          return;
+        }
+        if (onProgress) onProgress(job);
+        setTimeout(() => pollJob(jobId, onFinished, onProgress, onError), 1000);
+      })
+      .fail(onError);
+  }
+
+  function exportWorkspace(id) {
+    $.post(`/api/workspaces/${encodeURIComponent(id)}/export`)
+      .done(function (resp) {
+        pollJob(resp.job_id, function (job) {
+          if (job.status === 'done') {
+            window.location = job.result.download_url;
+          } else {
+            alert(`Download failed: ${job.message || job.status}`);
+          }
+        }, null, function (xhr) {
+          alert(`Download failed: ${xhr.responseText || xhr.status}`);
+        });
+      })
+      .fail(function (xhr) {
+        alert(`Download failed: ${xhr.responseText || xhr.status}`);
+      });
+  }
+
+  // --- Whole-workspace import from a ZIP / OCRD-ZIP (/api/import-zip) ---
+  const IMPORT_PHASES = { upload: 'Uploading', extract: 'Extracting', register: 'Reading METS', normalize: 'Normalizing', done: 'Done' };
+
+  function pollZipImport(jobId, wsId) {
+    pollJob(jobId, function (job) {
+      $('#zipProgress').hide();
+      if (job.status !== 'done') {
+        $('#zipImportMsg').text(`Import ${job.status}: ${job.message || 'unknown error'}`).removeClass('is-success').addClass('is-danger');
+        return;
+      }
+      const r = job.result || {};
+      let msg = `Imported ${(r.pages || []).length} page(s) and ${r.images || 0} image(s)${r.mets ? ' with METS' : ''}.`;
+      if ((r.skipped || []).length) msg += ` Skipped ${r.skipped.length} duplicate name(s).`;
+      $('#zipImportMsg').text(msg).removeClass('is-danger').addClass('is-success');
+      loadWorkspace(wsId);
+      fetchWorkspaceList();
+    }, function (job) {
+      const pct = job.total ? Math.round(100 * job.done / job.total) : 0;
+      $('#zipProgress').val(pct).show();
+      $('#zipImportMsg').text(`${IMPORT_PHASES[job.phase] || job.phase || 'Queued'}… ${job.total ? `${job.done}/${job.total}` : ''}`)
+        .removeClass('is-danger is-success');
+    }, function (xhr) {
+      $('#zipProgress').hide();
+      $('#zipImportMsg').text(`Lost track of the import: ${xhr.responseText || xhr.status}`).addClass('is-danger');
+    });
+  }
+
+  $('#formZip').on('submit', function (e) {
+    e.preventDefault();
+    const f = $('#zipInput')[0].files[0];
+    if (!f) {
+      $('#zipImportMsg').text('Please choose a ZIP archive.').addClass('is-danger');
+      return;
+    }
+    $('#zipProgress').val(0).show();
+    $('#zipImportMsg').text('Uploading…').removeClass('is-danger is-success');
+
+    $.ajax({
+      url: '/api/import-zip',
+      type: 'POST',
+      data: f, // raw body: streamed to disk by the server, no multipart parsing
+      processData: false,
+      contentType: 'application/zip',
+      xhr: function () {
+        const xhr = $.ajaxSettings.xhr();
+        xhr.upload.addEventListener('progress', function (ev) {
+          if (ev.lengthComputable) $('#zipProgress').val(Math.round(100 * ev.loaded / ev.total));
+        });
+        return xhr;
+      }
+    }).done(function (resp) {
+      setWs(resp.workspace_id);
+      pollZipImport(resp.job_id, resp.workspace_id);
+    }).fail(function (xhr) {
+      $('#zipProgress').hide();
+      $('#zipImportMsg').text(`Import failed: ${xhr.responseText || xhr.status}`).removeClass('is-success').addClass('is-danger');
+    });
+  });
 
   $('#formMETS').on('submit', function (e) {
     e.preventDefault();
@@ -429,49 +651,171 @@ $(function () {
     });
   });
 
-  $('#formImages').on('submit', function (e) {
+  // --- Resumable image uploads (tus-style, see /api/uploads) ---
+  // Files go up in chunks; a dropped connection only repeats the current chunk, and
+  // submitting the same files again (even after a reload) resumes where they stopped.
+  const UPLOAD_RETRIES = 5;
+  const IMAGE_EXT_RE = /\.(tif|tiff|png|jpg|jpeg|bmp|webp|gif|jp2)$/i;
+
+  function uploadKey(wsId, kind, file) {
+    return `upload:${wsId}:${kind}:${file.name}:${file.size}:${file.lastModified}`;
+  }
+
+  async function chunkChecksum(blob) {
+    if (!(window.crypto && crypto.subtle)) return null; // not a secure context: send without checksum
+    const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', await blob.arrayBuffer()));
+    let bin = '';
+    digest.forEach(b => { bin += String.fromCharCode(b); });
+    return `sha256 ${btoa(bin)}`;
+  }
+
+  // Whole-file hash for images up to this size (crypto.subtle cannot hash a stream), so the
+  // server can skip uploads of images it already stores
+  const PREHASH_MAX = 256 * 1024 * 1024;
+
+  async function fileSha256Hex(file) {
+    if (!(window.crypto && crypto.subtle) || file.size > PREHASH_MAX) return null;
+    const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', await file.arrayBuffer()));
+    return Array.from(digest, b => b.toString(16).padStart(2, '0')).join('');
+  }
+
+  async function uploadFileResumable(wsId, kind, file, onProgress) {
+    const key = uploadKey(wsId, kind, file);
+    let session = null;
+    const known = localStorage.getItem(key);
+    if (known) {
+      const r = await fetch(`/api/uploads/${encodeURIComponent(known)}`);
+      if (r.ok) session = await r.json();
+    }
+    if (!session) {
+      const sha256 = kind === 'images' ? await fileSha256Hex(file) : null;
+      const r = await fetch('/api/uploads', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ workspace_id: wsId, kind: kind, filename: file.name, length: file.size, sha256: sha256 })
+      });
+      if (!r.ok) throw new Error(`${file.name}: ${await r.text()}`);
+      session = await r.json();
+      localStorage.setItem(key, session.upload_id);
+    }
+
+    const url = `/api/uploads/${encodeURIComponent(session.upload_id)}`;
+    let offset = session.offset;
+    let failures = 0;
+    onProgress(offset);
+    while (offset < file.size) {
+      const blob = file.slice(offset, offset + session.chunk_size);
+      const headers = { 'Content-Type': 'application/offset+octet-stream', 'Upload-Offset': String(offset), 'Tus-Resumable': '1.0.0' };
+      const checksum = await chunkChecksum(blob);
+      if (checksum) headers['Upload-Checksum'] = checksum;
+
+      let r = null;
+      try {
+        r = await fetch(url, { method: 'PATCH', headers: headers, body: blob });
+      } catch (err) {
+        r = null; // network error: ask the server for the offset below
+      }
+      if (r && r.status === 204) {
+        offset = parseInt(r.headers.get('Upload-Offset'), 10);
+        failures = 0;
+        onProgress(offset);
+        continue;
+      }
+      if (r && (r.status === 404 || r.status === 410)) {
+        localStorage.removeItem(key);
+        throw new Error(`${file.name}: upload expired, please submit again`);
+      }
+      if (r && r.status < 500 && ![409, 460].includes(r.status)) {
+        throw new Error(`${file.name}: ${await r.text()}`);
+      }
+      if (++failures > UPLOAD_RETRIES) throw new Error(`${file.name}: upload keeps failing`);
+      await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+      const head = await fetch(url, { method: 'HEAD' }).catch(() => null);
+      if (head && head.ok) offset = parseInt(head.headers.get('Upload-Offset'), 10);
+    }
+    return { id: session.upload_id, key: key };
+  }
+
+  $('#formImages').on('submit', async function (e) {
     e.preventDefault();
     if (!workspaceId) { $('#imagesUploadMsg').text('Upload PAGE-XML or METS first.').addClass('is-danger'); return; }
-    const files = $('#imagesInput')[0].files;
+    const files = Array.from($('#imagesInput')[0].files).filter(f => IMAGE_EXT_RE.test(f.name));
     if (!files.length) { $('#imagesUploadMsg').text('Choose image files.').addClass('is-danger'); return; }
 
-    const fd = new FormData();
-    for (const f of files) fd.append('files[]', f, f.name);
+    const wsId = workspaceId;
+    const total = files.reduce((n, f) => n + f.size, 0) || 1;
+    const sent = {};
+    const $bar = $('#imagesProgress').val(0).show();
+    const $btn = $(this).find('button[type="submit"]').prop('disabled', true);
+    const report = (i) => {
+      const done = Object.values(sent).reduce((n, v) => n + v, 0);
+      $bar.val(Math.round(100 * done / total));
+      $('#imagesUploadMsg').text(`Uploading ${i + 1}/${files.length}: ${files[i].name} (${Math.round(100 * done / total)}%)`)
+        .removeClass('is-danger is-success');
+    };
 
-    $.ajax({
-      url: `/api/upload-images?workspace_id=${encodeURIComponent(workspaceId)}`,
-      type: 'POST',
-      data: fd,
-      processData: false,
-      contentType: false
-    }).done(function (resp) {
+    try {
+      const uploaded = [];
+      for (let i = 0; i < files.length; i++) {
+        uploaded.push(await uploadFileResumable(wsId, 'images', files[i], off => { sent[i] = off; report(i); }));
+      }
+      const resp = await $.ajax({
+        url: '/api/uploads/finalize',
+        type: 'POST',
+        contentType: 'application/json',
+        data: JSON.stringify({ workspace_id: wsId, upload_ids: uploaded.map(u => u.id) })
+      });
+      uploaded.forEach(u => localStorage.removeItem(u.key));
       missingImages = resp.still_missing || [];
       $('#imagesUploadMsg').text(`Added ${resp.added.length} image(s). Still missing: ${missingImages.length}.`).removeClass('is-danger').addClass('is-success');
       renderMissing();
       fetchWorkspaceList();
       setPendingChanges(true);
       showSection('uploads');
-    }).fail(function (xhr) {
-      $('#imagesUploadMsg').text(`Upload failed: ${xhr.responseText || xhr.status}`).removeClass('is-success').addClass('is-danger');
-    });
+    } catch (err) {
+      const msg = err.responseText || err.message || err.status || err;
+      $('#imagesUploadMsg').text(`Upload interrupted: ${msg}. Submit the same files again to resume.`).removeClass('is-success').addClass('is-danger');
+    } finally {
+      $bar.hide();
+      $btn.prop('disabled', false);
+    }
   });
 
   $('#btnCommit').on('click', function () {
     if (!canCommit()) return;
+    const $btn = $(this).prop('disabled', true);
+    const commitFailed = function (msg) {
+      $btn.prop('disabled', false);
+      alert(`Commit failed: ${msg}`);
+    };
     $.post(`/api/commit-import?workspace_id=${encodeURIComponent(workspaceId)}`)
-      .done(function () {
-        setPendingChanges(false);
-        updateCommitUI(true);
-        fetchWorkspaceList();
+      .done(function (resp) {
+        pollJob(resp.job_id, function (job) {
+          $btn.prop('disabled', false);
+          if (job.status !== 'done') {
+            commitFailed(job.message || job.status);
+            return;
+          }
+          setPendingChanges(false);
+          updateCommitUI(true);
+          fetchWorkspaceList();
+          const errors = (job.result && job.result.errors) || [];
+          if (errors.length) {
+            alert(`Committed, but ${errors.length} PAGE-XML file(s) could not be normalized:\n` +
+              errors.slice(0, 20).map(e => `${e.file}: ${e.error}`).join('\n'));
+          }
+        }, null, function (xhr) {
+          commitFailed(xhr.responseText || xhr.status);
+        });
       })
       .fail(function (xhr) {
-        alert(`Commit failed: ${xhr.responseText || xhr.status}`);
+        commitFailed(xhr.responseText || xhr.status);
       });
   });
 
   $('#btnDownloadWorkspace').on('click', function () {
     if (!workspaceId) return;
-    window.location = `/api/workspaces/${encodeURIComponent(workspaceId)}/download`;
+    exportWorkspace(workspaceId);
   });
 
   $('#btnRenameWs').on('click', function () {
@@ -501,6 +845,8 @@ $(function () {
   $('#btnReset').on('click', function () {
     workspaceId = null;
     pages = [];
+    pageCount = 0;
+    pageList = { offset: 0, done: true, loading: false, seq: pageList.seq + 1 };
     missingImages = [];
     missingPageXML = [];
     fileGrps = null;
@@ -553,10 +899,10 @@ $(function () {
 
   $(document).on('click', '.btn-download-ws', function () {
     const id = $(this).data('id');
-    window.location = `/api/workspaces/${encodeURIComponent(id)}/download`;
+    exportWorkspace(id);
   });
 
-  function openPage(wsId, pageName) {
+  function openPage(wsId, pageName, onLoaded) {
     $('#curPage').text(pageName);
     $('#viewer').show();
     showSection('viewer');
@@ -565,6 +911,8 @@ $(function () {
     if (viewer.clearTempShape) viewer.clearTempShape();
     setMode('select');
     clearUndoStack(); // Clear undo history when changing pages
+    currentSuggestions = {};
+    clearTimeout(suggestionTimer);
 
     $.getJSON('/api/page', { workspace_id: wsId, path: pageName })
       .done(function (data) {
@@ -579,13 +927,49 @@ $(function () {
         renderStats(data.stats);
         renderTranscriptions();
         if (viewer.setSelection) viewer.setSelection({});
+        loadSuggestions(wsId, pageName);
+        if ($('#cbPrefetch').is(':checked')) prefetchNextPages(wsId, pageName);
         console.debug('[main] page loaded', { page: pageName, lines: currentLines.length, regions: currentRegions.length });
+        if (onLoaded) onLoaded();
       })
       .fail(function (xhr) {
         alert(`Failed to load PAGE: ${xhr.responseText || xhr.status}`);
       });
   }
 
+  // --- Background pre-transcription (opt-in) ---
+  function loadSuggestions(wsId, pageName) {
+    clearTimeout(suggestionTimer);
+    $.getJSON('/api/llm/suggestions', { workspace_id: wsId, path: pageName })
+      .done(function (resp) {
+        if (wsId !== workspaceId || pageName !== currentPage) return;
+        currentSuggestions = resp.suggestions || {};
+        // Lines of this page are still being worked on in the background
+        if (resp.pending > 0) {
+          suggestionTimer = setTimeout(() => loadSuggestions(wsId, pageName), 5000);
+        }
+      });
+  }
+
+  function prefetchNextPages(wsId, pageName) {
+    $.ajax({
+      url: '/api/llm/prefetch',
+      type: 'POST',
+      contentType: 'application/json',
+      data: JSON.stringify({ workspace_id: wsId, path: pageName, language: 'German' })
+    }).done(function (resp) {
+      console.debug('[main] prefetch', resp);
+    });
+  }
+
+  $('#cbPrefetch')
+    .prop('checked', localStorage.getItem('llmPrefetch') === '1')
+    .on('change', function () {
+      const on = $(this).is(':checked');
+      localStorage.setItem('llmPrefetch', on ? '1' : '0');
+      if (on && workspaceId && currentPage) prefetchNextPages(workspaceId, currentPage);
+    });
+
   $('#cbRegions, #cbLines').on('change', function () {
     viewer.setToggles({
       regions: $('#cbRegions').is(':checked'),
@@ -599,6 +983,84 @@ $(function () {
 
   $('#btnRefreshWs').on('click', fetchWorkspaceList);
 
+  // --- Transcription search across workspaces (/api/search) ---
+  function escapeHtml(text) {
+    return $('<div>').text(text == null ? '' : String(text)).html();
+  }
+
+  function highlightTerms(text, query) {
+    const words = (query.match(/[\p{L}\p{N}_]+/gu) || []).map(w => w.replace(/[.*+?^${}()|[\]\\]/g, '\\$&'));
+    if (!words.length) return escapeHtml(text);
+    // split() keeps the captured matches at the odd positions
+    return String(text || '').split(new RegExp(`(${words.join('|')})`, 'giu'))
+      .map((part, i) => (i % 2 ? `<mark>${escapeHtml(part)}</mark>` : escapeHtml(part)))
+      .join('');
+  }
+
+  function searchRow(hit, query) {
+    const $a = $('<a href="#" class="searchHit"></a>')
+      .attr('data-ws', hit.workspace_id)
+      .attr('data-page', hit.page)
+      .attr('data-line', hit.line_id)
+      .html(highlightTerms(hit.text, query));
+    const where = `${hit.workspace_label || hit.workspace_id} · ${hit.page} · ${hit.line_id}`;
+    return $('<tr>').append($('<td>').append($a, '<br>',
+      $('<span class="is-size-7 has-text-grey">').text(where)));
+  }
+
+  function runSearch(offset) {
+    const q = ($('#inpSearch').val() || '').trim();
+    if (!q) return;
+    const seq = ++searchState.seq;
+    const params = { q: q, offset: offset || 0, limit: SEARCH_CHUNK };
+    if ($('#cbSearchCurrent').is(':checked') && workspaceId) params.workspace_id = workspaceId;
+    if (!offset) $('#searchTableBody').html('<tr><td><em>Searching...</em></td></tr>');
+    $('#btnSearchMore').hide();
+    $.getJSON('/api/search', params)
+      .done(function (resp) {
+        if (seq !== searchState.seq) return;
+        const tb = $('#searchTableBody');
+        if (!offset) tb.empty();
+        if (!resp.total) tb.append('<tr><td><em>No matching lines</em></td></tr>');
+        (resp.hits || []).forEach(hit => tb.append(searchRow(hit, q)));
+        searchState.next = resp.next_offset;
+        $('#searchCount').text(resp.total ? `${tb.find('a.searchHit').length} of ${resp.total}` : '');
+        $('#btnSearchMore').toggle(resp.next_offset !== null);
+      })
+      .fail(function (xhr) {
+        if (seq !== searchState.seq) return;
+        $('#searchTableBody').html(`<tr><td><em>Search failed: ${escapeHtml(xhr.responseText || xhr.status)}</em></td></tr>`);
+      });
+  }
+
+  function showSearchHit(wsId, pageName, lineId) {
+    const focus = function () {
+      const line = getLineById(lineId);
+      if (!line) return;
+      selectedLineId = line.id;
+      selectedRegionId = line.region_id || null;
+      if (viewer.setSelection) viewer.setSelection({ lineId: selectedLineId });
+      const pts = line.points || [];
+      if (pts.length && viewer.focusRect) {
+        const xs = pts.map(p => p[0]), ys = pts.map(p => p[1]);
+        viewer.focusRect([Math.min(...xs), Math.min(...ys), Math.max(...xs), Math.max(...ys)]);
+      }
+    };
+    const open = () => openPage(wsId, pageName, focus);
+    if (workspaceId === wsId) open();
+    else loadWorkspace(wsId, open);
+  }
+
+  $('#btnSearch').on('click', () => runSearch(0));
+  $('#inpSearch').on('keydown', function (e) {
+    if (e.key === 'Enter') runSearch(0);
+  });
+  $('#btnSearchMore').on('click', () => runSearch(searchState.next));
+  $(document).on('click', 'a.searchHit', function (e) {
+    e.preventDefault();
+    showSearchHit($(this).attr('data-ws'), $(this).attr('data-page'), $(this).attr('data-line'));
+  });
+
   $(document).on('click', '.section-tab', function (e) {
     e.preventDefault();
     if ($(this).parent().hasClass('is-disabled')) return;
@@ -1617,11 +2079,17 @@ $(function () {
   }
 
   function showLineModal(line, click) {
+    cancelPendingLlmJob();
     lineModalState = { lineId: line.id };
     $('#linePopoverTitle').text(`TextLine ${line.id || ''}`.trim());
     $('#linePopoverLabel').text(line.region_id ? `Region: ${line.region_id}` : 'TextLine');
     $('#linePopoverInput').val(line.text || '');
-    $('#linePopoverStatus').text('').removeClass('is-danger is-success');
+    $('#linePopoverStatus').text('').removeClass('is-danger is-success is-info');
+    const suggestion = !line.text && currentSuggestions[line.id];
+    if (suggestion) {
+      $('#linePopoverInput').val(suggestion);
+      $('#linePopoverStatus').text('LLM suggestion (not saved yet).').addClass('is-info');
+    }
     $('#linePopover').show();
     placePopover(click);
     console.debug('[main] showLinePopover', line, click);
@@ -1638,8 +2106,19 @@ $(function () {
     setTimeout(() => $('#linePopoverInput').trigger('focus'), 30);
   }
 
+  function cancelPendingLlmJob() {
+    if (!lineModalState.llmJobId && !lineModalState.llmStream) return;
+    // Nobody is waiting for the answer any more
+    if (lineModalState.llmStream) lineModalState.llmStream.abort();
+    if (lineModalState.llmJobId) {
+      $.ajax({ url: `/api/llm/jobs/${encodeURIComponent(lineModalState.llmJobId)}`, type: 'DELETE' });
+    }
+    $('#linePopoverAutoTranscribe').prop('disabled', false).removeClass('is-loading');
+  }
+
   function hideLineModal() {
     $('#linePopover').hide();
+    cancelPendingLlmJob();
     lineModalState = { lineId: null };
   }
 
@@ -1698,21 +2177,7 @@ $(function () {
       language: 'German'  // TODO: Make this configurable
     };
 
-    $.ajax({
-      url: '/api/llm/transcribe',
-      type: 'POST',
-      contentType: 'application/json',
-      data: JSON.stringify(payload),
-      timeout: 120000  // 2 minutes timeout for LLM
-    }).done(function (resp) {
-      if (resp.ok && resp.transcription) {
-        $('#linePopoverInput').val(resp.transcription);
-        const mode = resp.mode === 'correct' ? 'corrected' : 'transcribed';
-        $status.text(`AI ${mode} the text successfully.`).removeClass('is-danger is-info').addClass('is-success');
-      } else {
-        $status.text('LLM returned empty result.').removeClass('is-success is-info').addClass('is-danger');
-      }
-    }).fail(function (xhr) {
+    const failLlm = function (xhr) {
       let errorMsg = 'LLM transcription failed.';
       if (xhr.status === 503) {
         errorMsg = 'LLM service not available. Please start Ollama first.';
@@ -1725,11 +2190,140 @@ $(function () {
         }
       }
       $status.text(errorMsg).removeClass('is-success is-info').addClass('is-danger');
-    }).always(function () {
       $btn.prop('disabled', false).removeClass('is-loading');
-    });
+    };
+
+    // Preferred: stream tokens into the editor as the model produces them.
+    if (window.ReadableStream && window.TextDecoder && window.AbortController) {
+      streamLlmTranscription(payload, $btn, $status);
+      return;
+    }
+
+    // Fallback: queue the request; the server answers immediately with a job id we poll.
+    $.ajax({
+      url: '/api/llm/jobs',
+      type: 'POST',
+      contentType: 'application/json',
+      data: JSON.stringify(payload)
+    }).done(function (resp) {
+      const lineId = lineModalState.lineId;
+      lineModalState.llmJobId = resp.job_id;
+      pollLlmJob(resp.job_id, function (job) {
+        if (lineModalState.lineId !== lineId) return;  // popover moved on
+        lineModalState.llmJobId = null;
+        $btn.prop('disabled', false).removeClass('is-loading');
+        const res = job.result || {};
+        if (job.status === 'done' && res.transcription) {
+          $('#linePopoverInput').val(res.transcription);
+          const mode = res.mode === 'correct' ? 'corrected' : 'transcribed';
+          $status.text(`AI ${mode} the text successfully${res.cached ? ' (cached)' : ''}.`).removeClass('is-danger is-info').addClass('is-success');
+        } else if (job.status === 'done') {
+          $status.text('LLM returned empty result.').removeClass('is-success is-info').addClass('is-danger');
+        } else if (job.status === 'cancelled') {
+          $status.text('LLM request cancelled.').removeClass('is-success is-danger').addClass('is-info');
+        } else {
+          $status.text(job.error || 'LLM transcription failed.').removeClass('is-success is-info').addClass('is-danger');
+        }
+      }, function (job) {
+        if (lineModalState.lineId !== lineId) return;
+        const queued = job.status === 'queued' && job.attempts > 0 ? ` (retry ${job.attempts})` : '';
+        $status.text(job.status === 'running' ? 'LLM is working...' : `Waiting for LLM${queued}...`);
+      }, failLlm);
+    }).fail(failLlm);
   });
 
+  function parseSseEvent(block) {
+    let event = 'message';
+    const data = [];
+    block.split('\n').forEach(line => {
+      if (line.startsWith('event:')) event = line.slice(6).trim();
+      else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+    });
+    if (!data.length) return null;
+    try {
+      return { event, data: JSON.parse(data.join('\n')) };
+    } catch (e) {
+      return null;
+    }
+  }
+
+  function streamLlmTranscription(payload, $btn, $status) {
+    const lineId = lineModalState.lineId;
+    const controller = new AbortController();
+    lineModalState.llmStream = controller;
+    let partial = '';
+
+    const finish = function (msg, cls) {
+      if (lineModalState.lineId !== lineId) return;  // popover moved on
+      lineModalState.llmStream = null;
+      $btn.prop('disabled', false).removeClass('is-loading');
+      $status.text(msg).removeClass('is-success is-info is-danger').addClass(cls);
+    };
+
+    const handleEvent = function (evt) {
+      if (!evt || lineModalState.lineId !== lineId) return;
+      if (evt.event === 'token') {
+        partial += evt.data.text || '';
+        $('#linePopoverInput').val(partial.trimStart());
+        $status.text('LLM is writing...');
+      } else if (evt.event === 'done') {
+        const res = evt.data || {};
+        if (res.transcription) {
+          $('#linePopoverInput').val(res.transcription);
+          const mode = res.mode === 'correct' ? 'corrected' : 'transcribed';
+          finish(`AI ${mode} the text successfully${res.cached ? ' (cached)' : ''}.`, 'is-success');
+        } else {
+          finish('LLM returned empty result.', 'is-danger');
+        }
+      } else if (evt.event === 'error') {
+        finish((evt.data && evt.data.message) || 'LLM transcription failed.', 'is-danger');
+      }
+    };
+
+    fetch('/api/llm/transcribe/stream', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(payload),
+      signal: controller.signal
+    }).then(async function (resp) {
+      if (!resp.ok) {
+        const text = await resp.text();
+        finish(resp.status === 503 ? 'LLM service not available. Please start Ollama first.' : (text || 'LLM transcription failed.'), 'is-danger');
+        return;
+      }
+      const reader = resp.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let sep;
+        while ((sep = buffer.indexOf('\n\n')) >= 0) {
+          handleEvent(parseSseEvent(buffer.slice(0, sep)));
+          buffer = buffer.slice(sep + 2);
+        }
+      }
+      if (lineModalState.llmStream === controller) finish('LLM stream ended unexpectedly.', 'is-danger');
+    }).catch(function (err) {
+      if (err.name === 'AbortError') return;
+      finish(`LLM transcription failed: ${err.message || err}`, 'is-danger');
+    });
+  }
+
+  function pollLlmJob(jobId, onFinished, onProgress, onError) {
+    $.getJSON(`/api/llm/jobs/${encodeURIComponent(jobId)}`)
+      .done(function (job) {
+        if (['done', 'failed', 'cancelled'].includes(job.status)) {
+          onFinished(job);
+          return;
+        }
+        if (onProgress) onProgress(job);
+        setTimeout(() => pollLlmJob(jobId, onFinished, onProgress, onError), 1000);
+      })
+      .fail(onError);
+  }
+
   // --- Region modal helpers ---
   let regionModalState = { regionId: null };
 
@@ -122,6 +122,7 @@ class OSDViewer {
 
   setImage(url, w, h) {
     // Single image. OSD still handles smooth pan/zoom
+    this.item = null; // set again once the new image has opened
     this.viewer.open({ type: 'image', url, buildPyramid: false });
     // Prepare overlay coordinate space now
     this._ensureSvg();
@@ -278,6 +279,17 @@ class OSDViewer {
   fit() {
     this.viewer.viewport.goHome(true);
   }
+
+  // Zoom to an image-space rectangle [x0, y0, x1, y1] (with some margin); waits for the image to open
+  focusRect([x0, y0, x1, y1]) {
+    if (!this.item) {
+      this.viewer.addOnceHandler('open', () => this.focusRect([x0, y0, x1, y1]));
+      return;
+    }
+    const pad = Math.max(x1 - x0, y1 - y0) * 0.3 + 20;
+    const rect = this.item.imageToViewportRectangle(x0 - pad, y0 - pad, (x1 - x0) + 2 * pad, (y1 - y0) + 2 * pad);
+    this.viewer.viewport.fitBoundsWithConstraints(rect);
+  }
   zoomIn()  { this.viewer.viewport.zoomBy(1.2).applyConstraints(); }
   zoomOut() { this.viewer.viewport.zoomBy(1/1.2).applyConstraints(); }
 
@@ -0,0 +1,81 @@
+"""
+scripts/dedupe_images.py must not adopt images hardlinked in by /api/import-path:
+the blob would become another name of the pipeline's source file.
+
+Every step runs in its own interpreter with a temporary working directory,
+since the app resolves data/ relative to the current directory on import.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+
+METS = """<?xml version="1.0" encoding="UTF-8"?>
+<mets:mets xmlns:mets="http://www.loc.gov/METS/" xmlns:xlink="http://www.w3.org/1999/xlink">
+<mets:fileSec>
+<mets:fileGrp USE="OCR-D-IMG"><mets:file ID="OCR-D-IMG_0001" MIMETYPE="image/png">
+<mets:FLocat LOCTYPE="URL" xlink:href="OCR-D-IMG/OCR-D-IMG_0001.png"/></mets:file></mets:fileGrp>
+<mets:fileGrp USE="OCR-D-GT-PAGE"><mets:file ID="OCR-D-GT-PAGE_0001" MIMETYPE="application/vnd.prima.page+xml">
+<mets:FLocat LOCTYPE="URL" xlink:href="OCR-D-GT-PAGE/OCR-D-GT-PAGE_0001.xml"/></mets:file></mets:fileGrp>
+</mets:fileSec>
+<mets:structMap TYPE="PHYSICAL"><mets:div TYPE="physSequence"><mets:div TYPE="page" ID="PHYS_0001" ORDER="1">
+<mets:fptr FILEID="OCR-D-IMG_0001"/><mets:fptr FILEID="OCR-D-GT-PAGE_0001"/></mets:div></mets:div></mets:structMap>
+</mets:mets>
+"""
+
+PAGE = """<?xml version="1.0" encoding="UTF-8"?>
+<PcGts xmlns="http://schema.primaresearch.org/PAGE/gts/pagecontent/2019-07-15">
+  <Metadata><Creator>test</Creator><Created>2020-01-01T00:00:00</Created><LastChange>2020-01-01T00:00:00</LastChange></Metadata>
+  <Page imageFilename="OCR-D-IMG/OCR-D-IMG_0001.png" imageWidth="100" imageHeight="100"/>
+</PcGts>
+"""
+
+IMPORT = textwrap.dedent("""
+    import json, sys
+    from app import app
+    r = app.test_client().post("/api/import-path", json={"path": sys.argv[1], "link": "hardlink"})
+    assert r.status_code == 201, r.data
+    print(json.dumps(r.get_json()))
+""")
+
+
+def _run(cwd: Path, *args: str) -> str:
+    env = {**os.environ, "PYTHONPATH": str(REPO), "INGEST_ROOTS": str(cwd / "ingest"), "RECONCILE_INTERVAL": "0"}
+    proc = subprocess.run([sys.executable, *args], cwd=cwd, env=env, capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr
+    return proc.stdout
+
+
+def test_hardlink_ingest_is_not_adopted(tmp_path):
+    src = tmp_path / "ingest" / "book"
+    (src / "OCR-D-IMG").mkdir(parents=True)
+    (src / "OCR-D-GT-PAGE").mkdir()
+    (src / "mets.xml").write_text(METS, encoding="utf-8")
+    (src / "OCR-D-GT-PAGE" / "OCR-D-GT-PAGE_0001.xml").write_text(PAGE, encoding="utf-8")
+    source_image = src / "OCR-D-IMG" / "OCR-D-IMG_0001.png"
+    source_image.write_bytes(b"pipeline scan")
+
+    result = json.loads(_run(tmp_path, "-c", IMPORT, str(src)).strip().splitlines()[-1])
+    assert result["link"] == ["hardlink"]
+    ws_image = tmp_path / "data" / "workspaces" / result["workspace_id"] / "images" / "OCR-D-IMG_0001.png"
+    assert os.path.samefile(ws_image, source_image)
+
+    # An ordinary image of another workspace, to show the script still adopts those
+    plain = tmp_path / "data" / "workspaces" / "plain" / "images" / "scan.png"
+    plain.parent.mkdir(parents=True)
+    plain.write_bytes(b"uploaded scan")
+
+    out = _run(tmp_path, str(REPO / "scripts" / "dedupe_images.py"))
+    assert "1 linked images from server-side imports left alone" in out
+
+    blobs = [f for f in (tmp_path / "data" / "blobs").glob("??/*") if f.is_file()]
+    assert len(blobs) == 1 and os.path.samefile(blobs[0], plain)
+    # The source file gained no further names and is untouched
+    assert os.path.samefile(ws_image, source_image)
+    assert source_image.stat().st_nlink == 2
+    assert source_image.read_bytes() == b"pipeline scan"